@@ -35,6 +35,18 @@ class Config:
     def upload(self):
         return self._cfg['upload']
 
+    @property
+    def oss(self):
+        return self._cfg.get('oss') or {}
+
+    @property
+    def tracing(self):
+        return self._cfg.get('tracing') or {}
+
+    @property
+    def rate_limit(self):
+        return self._cfg.get('rate_limit') or {}
+
     @property
     def sql_log_enable(self):
         return self._cfg['sqlalchemy'].get('sql_log_enable', False)
@@ -1,5 +1,13 @@
 from loguru import logger
 import sys
+from common.core.tracing import get_trace_id
+
+
+def _inject_trace_id(record):
+    # 请求内由 TracingMiddleware 通过 contextualize 注入，其余场景取上下文中的 trace id
+    record["extra"].setdefault("trace_id", get_trace_id() or "-")
+
 
 logger.remove()
-logger.add(sys.stdout, level="INFO", format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>") 
\ No newline at end of file
+logger.configure(patcher=_inject_trace_id)
+logger.add(sys.stdout, level="INFO", format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <magenta>{extra[trace_id]}</magenta> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>") 
\ No newline at end of file
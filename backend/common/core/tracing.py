@@ -0,0 +1,213 @@
+"""
+请求级链路追踪与延迟指标
+
+- TracingMiddleware：为每个请求生成/透传 trace id（X-Trace-Id），记录按路由的延迟直方图
+- SQLAlchemy 事件：统计每个请求的 SQL 次数与耗时
+- Redis：统计每个请求的 Redis 调用次数与耗时（见 common.utils.redis_client）
+- outbound_span：统计外部调用（embedding、向量库等）耗时
+- trace id 通过 ParseFileTaskParams.trace_id 传递到 Celery worker
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from sqlalchemy import event
+
+TRACE_HEADER = "x-trace-id"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "knowra_http_request_duration_seconds",
+    "HTTP 请求耗时",
+    ["service", "method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_DB_QUERIES = Histogram(
+    "knowra_http_db_queries_per_request",
+    "每个请求执行的 SQL 次数",
+    ["service", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+HTTP_DB_TIME = Histogram(
+    "knowra_http_db_time_seconds",
+    "每个请求的 SQL 总耗时",
+    ["service", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REDIS_CALLS = Histogram(
+    "knowra_http_redis_calls_per_request",
+    "每个请求的 Redis 调用次数",
+    ["service", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+REDIS_CALL_DURATION = Histogram(
+    "knowra_redis_call_duration_seconds",
+    "Redis 命令耗时",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+OUTBOUND_CALL_DURATION = Histogram(
+    "knowra_outbound_call_duration_seconds",
+    "外部调用（embedding、向量库等）耗时",
+    ["target"],
+    buckets=LATENCY_BUCKETS,
+)
+OUTBOUND_CALL_ERRORS = Counter(
+    "knowra_outbound_call_errors_total",
+    "外部调用失败次数",
+    ["target"],
+)
+
+
+class RequestStats:
+    """单个请求内累计的 DB / Redis / 外部调用统计"""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.redis_calls = 0
+        self.redis_time = 0.0
+        self.outbound: Dict[str, float] = {}
+
+    def summary(self) -> str:
+        outbound = ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in self.outbound.items())
+        return (
+            f"db={self.db_queries}次/{self.db_time * 1000:.1f}ms "
+            f"redis={self.redis_calls}次/{self.redis_time * 1000:.1f}ms"
+            + (f" outbound[{outbound}]" if outbound else "")
+        )
+
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_trace_id() -> Optional[str]:
+    """当前上下文的 trace id（请求内或 worker 任务内），不存在时返回 None"""
+    return _trace_id.get()
+
+
+def set_trace_id(trace_id: Optional[str]):
+    """设置当前上下文的 trace id，返回可用于 reset_trace_id 的 token"""
+    return _trace_id.set(trace_id)
+
+
+def reset_trace_id(token) -> None:
+    _trace_id.reset(token)
+
+
+def record_redis_call(command: str, elapsed: float) -> None:
+    REDIS_CALL_DURATION.labels(command=command).observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.redis_calls += 1
+        stats.redis_time += elapsed
+
+
+@contextmanager
+def outbound_span(target: str):
+    """记录一次外部调用耗时，计入直方图和当前请求统计"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OUTBOUND_CALL_ERRORS.labels(target=target).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        OUTBOUND_CALL_DURATION.labels(target=target).observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.outbound[target] = stats.outbound.get(target, 0.0) + elapsed
+
+
+def instrument_engine(engine) -> None:
+    """在 SQLAlchemy engine 上注册游标事件，统计当前请求的 SQL 次数与耗时"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("knowra_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("knowra_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += elapsed
+
+
+class TracingMiddleware:
+    """
+    ASGI 中间件：trace id 透传、按路由模板的延迟直方图、每请求 DB/Redis 统计。
+    超过 slow_request_ms 的请求输出 WARNING 日志。
+    """
+
+    def __init__(self, app, service: str, slow_request_ms: int = 1000):
+        self.app = app
+        self.service = service
+        self.slow_request_s = slow_request_ms / 1000.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(TRACE_HEADER.encode())
+        trace_id = incoming.decode("latin-1") if incoming else new_trace_id()
+        trace_token = _trace_id.set(trace_id)
+        stats = RequestStats()
+        stats_token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(TRACE_HEADER.encode(), trace_id.encode())]
+            await send(message)
+
+        try:
+            with logger.contextualize(trace_id=trace_id):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.labels(self.service, method, route_path, str(status_code)).observe(elapsed)
+            HTTP_DB_QUERIES.labels(self.service, route_path).observe(stats.db_queries)
+            HTTP_DB_TIME.labels(self.service, route_path).observe(stats.db_time)
+            HTTP_REDIS_CALLS.labels(self.service, route_path).observe(stats.redis_calls)
+            message = (
+                f"[trace] trace_id={trace_id} {method} {route_path} status={status_code} "
+                f"duration={elapsed * 1000:.1f}ms {stats.summary()}"
+            )
+            if elapsed >= self.slow_request_s:
+                logger.warning(message)
+            else:
+                logger.debug(message)
+            _request_stats.reset(stats_token)
+            _trace_id.reset(trace_token)
+
+
+def metrics_response():
+    """Prometheus 抓取接口的响应体"""
+    from starlette.responses import Response
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Table, Index, JSON, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Boolean, Table, Index, JSON, ForeignKey
 from sqlalchemy.orm import declarative_base, relationship, foreign
 from sqlalchemy.ext.hybrid import hybrid_property
+import json
 from datetime import datetime
 
 Base = declarative_base()
@@ -169,6 +170,8 @@ class Document(Base):
     last_parsed_config = Column(JSON, nullable=True)
     parse_offset = Column(Integer, default=0)
     chunk_count = Column(Integer, default=0)
+    content_hash = Column(String(64), nullable=True, index=True)  # 文件内容sha256
+    file_size = Column(BigInteger, nullable=True)  # 文件字节数
 
     knowledge_base = relationship(
         "KnowledgeBase",
@@ -261,6 +264,8 @@ class Connection(Base):
     api_key = Column(String(255), nullable=True, comment="API 密钥")
     status = Column(String(20), default='enabled', comment="状态")
     description = Column(Text, comment="描述")
+    rate_limit_rpm = Column(Integer, nullable=True, comment="每分钟请求数上限（所有worker与检索服务共享）")
+    rate_limit_tpm = Column(Integer, nullable=True, comment="每分钟token数上限（所有worker与检索服务共享）")
     maintainer_id = Column(Integer, comment="维护人ID")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -304,6 +309,17 @@ class Model(Base):
         primaryjoin="Connection.id == foreign(Model.connection_id)",
         back_populates="models"
     )
+
+    @property
+    def extra_config_dict(self) -> dict:
+        """extra_config（JSON 文本）解析为字典，为空或格式错误时返回空字典"""
+        if not self.extra_config:
+            return {}
+        try:
+            extra = json.loads(self.extra_config)
+        except (TypeError, ValueError):
+            return {}
+        return extra if isinstance(extra, dict) else {}
     maintainer = relationship(
         "User",
         primaryjoin="User.id == foreign(Model.maintainer_id)"
@@ -3,6 +3,7 @@ from sqlalchemy.orm import sessionmaker
 from common.core.log import logger
 import logging
 from common.core.config import config
+from common.core.tracing import instrument_engine
 
 SQLALCHEMY_DATABASE_URL = config.sqlalchemy_url
 
@@ -19,4 +20,5 @@ if config.sql_log_enable:
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, echo=config.sql_log_enable
 )
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
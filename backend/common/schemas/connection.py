@@ -11,6 +11,8 @@ class ConnectionBase(BaseModel):
     api_key: Optional[SecretStr] = Field(None, description="API Key")
     status: Optional[str] = Field("enabled", description="状态")
     description: Optional[str] = None
+    rate_limit_rpm: Optional[int] = Field(None, ge=1, description="每分钟请求数上限，为空不限")
+    rate_limit_tpm: Optional[int] = Field(None, ge=1, description="每分钟token数上限，为空不限")
     maintainer_id: Optional[int] = None
 
 
@@ -58,4 +58,5 @@ class ModelConfig(BaseModel):
     provider: str
     api_base: str
     api_key: Optional[str] = None
-    extra_config: Optional[Dict[str, Any]] = None  # 额外模型参数 
\ No newline at end of file
+    extra_config: Optional[Dict[str, Any]] = None  # 额外模型参数
+    connection_id: Optional[int] = None  # 所属 Connection，同一 Connection 共用连接池 
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 
 
 
@@ -52,6 +52,12 @@ class EmbeddingParams(BaseModel):
     model_type: str
     embedding_dim: int
     provider: str
+    max_input_tokens: Optional[int] = None  # 单条输入 token 上限（模型 extra_config），未设置时按模型名推断
+    max_batch_tokens: Optional[int] = None  # 单次请求 token 上限（模型 extra_config），未设置时按服务商取默认值
+    connection_id: Optional[int] = None  # 限流令牌桶按 Connection 共享
+    rate_limit_rpm: Optional[int] = None
+    rate_limit_tpm: Optional[int] = None
+    extra_config: Optional[Dict[str, Any]] = None  # 模型的 extra_config，检索服务使用同一份配置
 
 class VectorDBCollectionConfig(BaseModel):
     collection_name: str
@@ -63,6 +69,12 @@ class VectorDBCollectionConfig(BaseModel):
 class ParseParams(BaseModel):
     chunk_size: int = 1000
     overlap: int = 100
+    length_unit: Literal["char", "token"] = "char"  # chunk_size/overlap 的单位：char（字符）| token（embedding 模型的 token）
+
+class CopySourceParams(BaseModel):
+    """内容相同、分块参数与向量模型一致的已解析文档，worker 直接复制其向量"""
+    doc_id: str
+    vdb: VectorDBCollectionConfig
 
 class ParseFileTaskParams(BaseModel):
     task_id: str
@@ -77,6 +89,8 @@ class ParseFileTaskParams(BaseModel):
     uploader_id: Optional[str] = None
     parallel: Optional[int] = 3
     parse_offset: int = 0
+    trace_id: Optional[str] = None
+    copy_from: Optional[CopySourceParams] = None
 
 class ChunkMetadata(BaseModel):
     doc_id: int
@@ -92,4 +106,7 @@ class ChunkMetadata(BaseModel):
     chunk_size: int
     overlap: int
     embedding_model_name: str
-    embedding_dim: int 
\ No newline at end of file
+    embedding_dim: int 
+    page_number: Optional[int] = None  # PDF 分块所在页码（从1开始）
+    length_unit: Literal["char", "token"] = "char"
+    chunker_version: Optional[str] = None  # 分块算法版本（common.utils.text_splitter.CHUNKER_VERSION）
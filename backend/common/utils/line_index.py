@@ -0,0 +1,151 @@
+"""
+文本预览用的稀疏行偏移索引
+
+每 stride 行记录一次该行起始的字节偏移（offsets[i] 为第 i*stride 行的起始位置）。
+预览第 N 行时从最近的检查点开始读取，最多跳过 stride-1 行，读取量与展示的页大小成正比。
+索引在读取过程中增量扩展，不需要预先扫描整个文件。
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_STRIDE = 1000
+
+
+@dataclass
+class LineIndex:
+    stride: int = DEFAULT_STRIDE
+    offsets: List[int] = field(default_factory=lambda: [0])
+    version: str = ""  # 文件版本标识（OSS ETag / 本地 mtime+size），不一致时索引作废
+    total_lines: Optional[int] = None  # 已读到文件末尾时记录总行数
+
+    def checkpoint(self, line: int) -> Tuple[int, int]:
+        """返回不超过 line 的最近检查点 (行号, 字节偏移)"""
+        block = min(line // self.stride, len(self.offsets) - 1)
+        return block * self.stride, self.offsets[block]
+
+    def record(self, line: int, byte_offset: int) -> bool:
+        """读取过程中遇到第 line 行的起点时调用，正好是下一个检查点时追加，返回是否有更新"""
+        if line % self.stride == 0 and line // self.stride == len(self.offsets):
+            self.offsets.append(byte_offset)
+            return True
+        return False
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "stride": self.stride, "offsets": self.offsets,
+            "version": self.version, "total_lines": self.total_lines
+        })
+
+    @classmethod
+    def from_json(cls, data) -> "LineIndex":
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        raw = json.loads(data)
+        return cls(
+            stride=int(raw["stride"]), offsets=[int(x) for x in raw["offsets"]],
+            version=raw.get("version", ""), total_lines=raw.get("total_lines")
+        )
+
+
+def read_lines_page(
+    open_stream: Callable[[int], Iterable[bytes]],
+    index: LineIndex,
+    offset: int,
+    max_lines: int,
+    max_chars: int,
+    encoding: str = "utf-8",
+    translate_crlf: bool = False
+) -> Tuple[Dict, bool]:
+    """
+    从 offset 行开始读取一页文本，并顺带扩展索引
+
+    Args:
+        open_stream: 给定起始字节偏移，返回从该位置开始的字节块迭代器（OSS Range GET 或本地 seek）
+        index: 行偏移索引（原地更新）
+        offset: 起始行号（从0开始）
+        max_lines: 每页最大行数
+        max_chars: 每页最大字符数，超出时截断当前行
+        translate_crlf: 行尾 \r\n 按 \n 返回（与文本模式读取本地文件的结果一致）
+
+    Returns:
+        (与原预览接口一致的结果字典, 索引是否有更新)
+    """
+    line_no, byte_pos = index.checkpoint(offset)
+    # 超长行只保留开头部分（足够截断到 max_chars），其余只计字节数，避免整行进内存
+    keep_bytes = max_chars * 4 + 4
+    updated = False
+    lines: List[str] = []
+    total_chars = 0
+    has_more = False
+    truncated = False
+    buffer = b""
+    dropped = 0  # 当前行已丢弃的字节数
+    stream = open_stream(byte_pos)
+    iterator = iter(stream)
+    try:
+        eof = False
+        scanned = 0  # buffer 中已确认不含换行符的前缀长度
+        while True:
+            newline = buffer.find(b"\n", scanned)
+            if newline < 0:
+                scanned = len(buffer)
+                if not eof:
+                    try:
+                        buffer += next(iterator)
+                    except StopIteration:
+                        eof = True
+                    if len(buffer) > keep_bytes and buffer.find(b"\n", scanned) < 0:
+                        dropped += len(buffer) - keep_bytes
+                        buffer = buffer[:keep_bytes]
+                        scanned = len(buffer)
+                    continue
+                if not buffer and not dropped:
+                    break
+                raw, buffer = buffer, b""
+            else:
+                raw, buffer = buffer[:newline + 1], buffer[newline + 1:]
+            raw_len = dropped + len(raw)
+            dropped = 0
+            scanned = 0
+
+            # raw 为第 line_no 行（含换行符）的开头部分，该行起始于 byte_pos
+            if line_no >= offset:
+                if len(lines) >= max_lines:
+                    has_more = True
+                    break
+                text = raw.decode(encoding, errors="replace")
+                if translate_crlf and text.endswith("\r\n"):
+                    text = text[:-2] + "\n"
+                if total_chars + len(text) > max_chars:
+                    lines.append(text[:max_chars - total_chars])
+                    total_chars = max_chars
+                    truncated = True
+                else:
+                    lines.append(text)
+                    total_chars += len(text)
+            byte_pos += raw_len
+            line_no += 1
+            updated = index.record(line_no, byte_pos) or updated
+            if truncated:
+                # 因字符数截断结束：确认后面是否还有内容
+                has_more = bool(buffer) or any(chunk for chunk in iterator)
+                break
+
+        if not has_more and not truncated and index.total_lines is None:
+            index.total_lines = line_no
+            updated = True
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+    actual_lines = len(lines)
+    return {
+        "content": "".join(lines),
+        "lines": actual_lines,
+        "chars": total_chars,
+        "has_more": has_more,
+        "next_offset": offset + actual_lines if has_more else None
+    }, updated
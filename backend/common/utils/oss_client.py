@@ -1,23 +1,50 @@
 import boto3
-from typing import BinaryIO, List
+import hashlib
+import threading
+from collections import OrderedDict
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from typing import BinaryIO, List, Optional, Dict, Any, Tuple
 from botocore.exceptions import BotoCoreError, ClientError
 
+MB = 1024 * 1024
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_CLIENT_CACHE_SIZE = 32
+
+
+def build_transfer_config(upload_cfg: Optional[Dict[str, Any]] = None) -> TransferConfig:
+    """
+    根据 upload 配置构造分片上传参数：
+    multipart_threshold_mb 超过该大小走分片上传，multipart_chunksize_mb 分片大小，
+    multipart_concurrency 并发上传的分片数。单次上传的内存占用约为 分片大小 × 并发数。
+    """
+    upload_cfg = upload_cfg or {}
+    return TransferConfig(
+        multipart_threshold=int(upload_cfg.get('multipart_threshold_mb', 8)) * MB,
+        multipart_chunksize=int(upload_cfg.get('multipart_chunksize_mb', 16)) * MB,
+        max_concurrency=int(upload_cfg.get('multipart_concurrency', 4)),
+        use_threads=True
+    )
+
 class OSSClient:
-    def __init__(self, endpoint_url: str, access_key: str, secret_key: str, region: str | None):
-        self.s3 = boto3.client(
+    def __init__(self, endpoint_url: str, access_key: str, secret_key: str, region: str | None, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+        # 每个客户端使用独立 Session：默认 Session 创建客户端不是线程安全的
+        self.s3 = boto3.session.Session().client(
             's3',
             endpoint_url=endpoint_url,
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            region_name=region
+            region_name=region,
+            config=BotoConfig(max_pool_connections=max_pool_connections)
         )
 
-    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str) -> str:
+    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str, transfer_config: Optional[TransferConfig] = None) -> str:
         """
         上传文件对象到指定 bucket/key，返回文件的 OSS 路径（key）。
+        transfer_config 用于指定分片大小与并发数，见 build_transfer_config。
         """
         try:
-            self.s3.upload_fileobj(fileobj, bucket, key)
+            self.s3.upload_fileobj(fileobj, bucket, key, Config=transfer_config)
             return key
         except (BotoCoreError, ClientError) as e:
             raise Exception(f"OSS 上传失败: {e}")
@@ -40,6 +67,27 @@ class OSSClient:
         except (BotoCoreError, ClientError) as e:
             raise Exception(f"OSS 获取对象失败: {e}")
 
+    def head_object(self, bucket: str, key: str):
+        """
+        获取 OSS 文件元信息（ETag、ContentLength 等），不下载内容。
+        """
+        try:
+            return self.s3.head_object(Bucket=bucket, Key=key)
+        except (BotoCoreError, ClientError) as e:
+            raise Exception(f"OSS 获取对象信息失败: {e}")
+
+    def get_object_range(self, bucket: str, key: str, start: int, end: Optional[int] = None, if_match: Optional[str] = None):
+        """
+        按字节范围获取 OSS 文件内容（HTTP Range，end 为闭区间，不传表示到文件末尾）。
+        if_match 为 ETag 时，对象已被覆盖则请求失败（HTTP 412），不会读到新旧版本混合的内容。
+        """
+        byte_range = f"bytes={start}-{end if end is not None else ''}"
+        kwargs = {"IfMatch": if_match} if if_match else {}
+        try:
+            return self.s3.get_object(Bucket=bucket, Key=key, Range=byte_range, **kwargs)
+        except (BotoCoreError, ClientError) as e:
+            raise Exception(f"OSS 获取对象失败: {e}") from e
+
     def delete_object(self, bucket: str, key: str):
         """
         删除 OSS 文件对象。
@@ -57,4 +105,62 @@ class OSSClient:
             response = self.s3.list_buckets()
             return [b['Name'] for b in response.get('Buckets', [])]
         except (BotoCoreError, ClientError) as e:
-            raise Exception(f"OSS 列举 bucket 失败: {e}") 
\ No newline at end of file
+            raise Exception(f"OSS 列举 bucket 失败: {e}") 
+
+
+# (endpoint, access_key, region) -> (secret 指纹, OSSClient)，按最近使用淘汰
+_client_cache: "OrderedDict[Tuple[str, str, Optional[str]], Tuple[str, OSSClient]]" = OrderedDict()
+_client_cache_lock = threading.Lock()
+
+
+def _secret_fingerprint(secret_key: str) -> str:
+    return hashlib.sha256((secret_key or "").encode("utf-8")).hexdigest()
+
+
+def _oss_settings() -> Dict[str, Any]:
+    try:
+        from common.core.config import config
+        return config.oss
+    except Exception:
+        return {}
+
+
+def get_oss_client(endpoint_url: str, access_key: str, secret_key: str, region: str | None) -> OSSClient:
+    """
+    获取缓存的 OSSClient（boto3 客户端及其连接池可跨请求、跨线程复用）。
+    以 (endpoint, access_key, region) 为键；secret 变化（凭证轮换）时重建客户端。
+    """
+    key = (endpoint_url, access_key, region)
+    fingerprint = _secret_fingerprint(secret_key)
+    with _client_cache_lock:
+        entry = _client_cache.get(key)
+        if entry and entry[0] == fingerprint:
+            _client_cache.move_to_end(key)
+            return entry[1]
+    settings = _oss_settings()
+    client = OSSClient(
+        endpoint_url, access_key, secret_key, region,
+        max_pool_connections=int(settings.get('max_pool_connections', DEFAULT_MAX_POOL_CONNECTIONS))
+    )
+    max_size = max(int(settings.get('client_cache_size', DEFAULT_CLIENT_CACHE_SIZE)), 1)
+    with _client_cache_lock:
+        _client_cache[key] = (fingerprint, client)
+        _client_cache.move_to_end(key)
+        while len(_client_cache) > max_size:
+            _client_cache.popitem(last=False)
+    return client
+
+
+def invalidate_oss_client(endpoint_url: Optional[str] = None, access_key: Optional[str] = None) -> int:
+    """
+    使缓存的客户端失效（OSS 连接更新、删除或凭证轮换时调用）。
+    不传参数时清空全部缓存，返回移除的客户端数。
+    """
+    with _client_cache_lock:
+        keys = [
+            k for k in _client_cache
+            if (endpoint_url is None or k[0] == endpoint_url) and (access_key is None or k[1] == access_key)
+        ]
+        for k in keys:
+            del _client_cache[k]
+    return len(keys)
@@ -0,0 +1,142 @@
+"""
+按模型连接（Connection）共享的分布式令牌桶限流
+
+所有 worker 进程/线程与检索服务对同一 Connection 的 embedding 请求从同一个 Redis 令牌桶取令牌，
+桶内同时维护每分钟请求数（RPM）与每分钟 token 数（TPM）两个预算，补充与扣减在一个 Lua 脚本中原子完成，
+时间取自 Redis 服务器，不受各主机时钟偏差影响。
+
+优先级：后台（worker 解析）请求只能使用预算中超出保留比例的部分，保留的部分留给交互（检索查询）请求，
+因此批量入库把预算用尽时，检索查询仍能立即拿到令牌。
+Redis 不可用时放行请求（只记录告警），限流不应成为入库和检索的单点故障。
+"""
+
+import random
+import time
+from typing import Optional
+
+import redis
+from loguru import logger
+
+from common.utils.redis_client import get_redis
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+DEFAULT_RESERVE_RATIO = 0.2
+KEY_PREFIX = "ratelimit:conn"
+
+# KEYS[1]: 桶 key；ARGV: rpm, tpm, 本次请求数, 本次 token 数, 保留比例（交互请求为 0）
+# 返回 0 表示已扣减，否则为还需等待的毫秒数
+_TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local req_cost = tonumber(ARGV[3])
+local tok_cost = tonumber(ARGV[4])
+local reserve = tonumber(ARGV[5])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(state[1]) or rpm
+local tok = tonumber(state[2]) or tpm
+local elapsed = math.max(now - (tonumber(state[3]) or now), 0)
+local wait = 0
+if rpm > 0 then
+  req = math.min(rpm, req + elapsed * rpm / 60000)
+  local need = req_cost + reserve * rpm - req
+  if need > 0 then wait = math.max(wait, need * 60000 / rpm) end
+end
+if tpm > 0 then
+  tok = math.min(tpm, tok + elapsed * tpm / 60000)
+  local need = tok_cost + reserve * tpm - tok
+  if need > 0 then wait = math.max(wait, need * 60000 / tpm) end
+end
+if wait == 0 then
+  req = req - req_cost
+  tok = tok - tok_cost
+end
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+
+class RateLimitExceeded(Exception):
+    """在超时时间内未能取得令牌"""
+
+
+class RedisTokenBucket:
+    """
+    单个 Connection 的令牌桶，桶容量为一分钟的预算（RPM/TPM 为空或 0 表示该维度不限）
+
+    Args:
+        key: 桶标识（通常为 Connection id）
+        requests_per_minute: 每分钟请求数预算
+        tokens_per_minute: 每分钟 token 数预算
+        reserve_ratio: 后台请求不可使用的预算比例，留给交互请求
+    """
+
+    def __init__(
+        self,
+        key: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        reserve_ratio: float = DEFAULT_RESERVE_RATIO,
+        redis_client=None
+    ):
+        self.key = f"{KEY_PREFIX}:{key}"
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+        self.reserve_ratio = min(max(reserve_ratio, 0.0), 0.9)
+        self._redis = redis_client or get_redis()
+        self._script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+
+    def try_acquire(self, tokens: int = 0, priority: str = PRIORITY_BACKGROUND) -> float:
+        """尝试扣减一次请求与 tokens 个 token，成功返回 0，否则返回需等待的秒数"""
+        reserve = self.reserve_ratio if priority == PRIORITY_BACKGROUND else 0.0
+        if self.tokens_per_minute:
+            # 单次请求超过可用预算时按可用预算计，否则永远无法满足
+            tokens = min(tokens, int(self.tokens_per_minute * (1 - reserve)))
+        try:
+            wait_ms = self._script(
+                keys=[self.key],
+                args=[self.requests_per_minute, self.tokens_per_minute, 1, tokens, reserve]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"限流令牌桶不可用，放行请求: key={self.key}, 错误={e}")
+            return 0.0
+        return int(wait_ms) / 1000.0
+
+    def acquire(self, tokens: int = 0, priority: str = PRIORITY_BACKGROUND, timeout: Optional[float] = None) -> float:
+        """
+        阻塞直到取得令牌，返回等待的秒数
+
+        Raises:
+            RateLimitExceeded: timeout 秒内未取得令牌
+        """
+        start = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens, priority)
+            waited = time.monotonic() - start
+            if wait <= 0:
+                if waited >= 1:
+                    logger.debug(f"限流等待 {waited:.2f}s: key={self.key}, priority={priority}, tokens={tokens}")
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                raise RateLimitExceeded(
+                    f"{timeout}s 内未取得限流令牌: key={self.key}, priority={priority}, 还需等待 {wait:.2f}s"
+                )
+            # 加少量抖动，避免多个进程在同一时刻醒来争抢
+            time.sleep(wait + random.uniform(0, min(wait, 0.1)))
+
+
+def get_connection_limiter(
+    connection_id: Optional[int],
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+    reserve_ratio: float = DEFAULT_RESERVE_RATIO
+) -> Optional[RedisTokenBucket]:
+    """Connection 配置了 RPM 或 TPM 预算时返回其令牌桶，否则返回 None（不限流）"""
+    if connection_id is None or not (requests_per_minute or tokens_per_minute):
+        return None
+    return RedisTokenBucket(str(connection_id), requests_per_minute, tokens_per_minute, reserve_ratio)
@@ -1,5 +1,18 @@
 import redis
 import threading
+import time
+from common.core.tracing import record_redis_call
+
+
+class InstrumentedRedis(redis.StrictRedis):
+    """记录每条命令耗时，并计入当前请求的 Redis 调用统计"""
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            record_redis_call(str(args[0]) if args else "unknown", time.perf_counter() - start)
 
 class RedisPool:
     _instance = None
@@ -23,7 +36,7 @@ def get_redis():
     获取全局Redis连接实例，线程安全单例连接池，默认127.0.0.1:6379, db=0。
     后续如需支持配置可扩展。
     """
-    return redis.StrictRedis(connection_pool=RedisPool.get_pool())
+    return InstrumentedRedis(connection_pool=RedisPool.get_pool())
 
 # 实用工具方法
 
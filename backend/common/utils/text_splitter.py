@@ -1,35 +1,171 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
-from typing import List, Dict, Any
+import re
+from itertools import accumulate
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 from langchain_community.document_loaders import PyPDFLoader
 
+from common.utils.tokenizer import get_length_function
+
 # 通用文本切割工具
 
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+# 分块算法版本，写入分块元数据；任何切割器（递归/Markdown/纯文本/docx 结构化）的输出变化时递增，
+# 内容去重复制已有向量时要求版本一致，旧版本分块不会被复用
+CHUNKER_VERSION = "5"
+
+
+class FastRecursiveSplitter:
+    """
+    与 langchain RecursiveCharacterTextSplitter 输出逐字节一致的递归切割器（仅支持字面量分隔符）
+
+    - 用 str.find 在原文的 [start, end) 区间内选择分隔符，各层递归只传递下标
+    - 片段以起止下标表示；keep_separator 时相邻片段在原文中连续，合并结果直接按下标切片，不再逐层 join
+    - 片段长度只计算一次；length_function 为 len 时由下标相减得到
+    - iter_split 以生成器方式产出 chunk，split_text 返回列表
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 4000,
+        chunk_overlap: int = 200,
+        length_function: Callable[[str], int] = len,
+        separators: Optional[List[str]] = None,
+        keep_separator: Union[bool, str] = True,
+        strip_whitespace: bool = True
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) 不能大于 chunk_size ({chunk_size})")
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._length_function = length_function
+        self._separators = tuple(separators or DEFAULT_SEPARATORS)
+        self._keep_separator = keep_separator
+        self._strip_whitespace = strip_whitespace
+
+    def split_text(self, text: str) -> List[str]:
+        return list(self.iter_split(text))
+
+    def iter_split(self, text: str) -> Iterator[str]:
+        yield from self._split(text, 0, len(text), 0)
+
+    def _split(self, text: str, start: int, end: int, level: int) -> Iterator[str]:
+        separators = self._separators
+        separator = separators[-1]
+        next_level = len(separators)
+        for i in range(level, len(separators)):
+            if separators[i] == "":
+                separator = ""
+                break
+            if text.find(separators[i], start, end) != -1:
+                separator = separators[i]
+                next_level = i + 1
+                break
+
+        starts, ends = self._split_spans(text, start, end, separator)
+        if self._length_function is len:
+            lengths = [e - s for s, e in zip(starts, ends)]
+        else:
+            lengths = [self._length_function(text[s:e]) for s, e in zip(starts, ends)]
+        merge_separator = "" if self._keep_separator else separator
+        # 长度不小于 chunk_size 的片段继续递归（或原样输出），其间的片段合并
+        lo = 0
+        for i in [i for i, length in enumerate(lengths) if length >= self._chunk_size]:
+            if lo < i:
+                yield from self._merge(text, starts, ends, lengths, lo, i, merge_separator)
+            if next_level >= len(separators):
+                yield text[starts[i]:ends[i]]
+            else:
+                yield from self._split(text, starts[i], ends[i], next_level)
+            lo = i + 1
+        if lo < len(lengths):
+            yield from self._merge(text, starts, ends, lengths, lo, len(lengths), merge_separator)
+
+    def _split_spans(self, text: str, start: int, end: int, separator: str) -> Tuple[List[int], List[int]]:
+        """按分隔符把 [start, end) 切成非空片段，返回各片段的起止下标；分隔符按 keep_separator 归到片段开头或结尾"""
+        if not separator:
+            return list(range(start, end)), list(range(start + 1, end + 1))
+        size = len(separator)
+        # str.split 与 map(len) 均在 C 中完成，只需据此推算片段下标
+        sizes = list(map(len, text[start:end].split(separator)))
+        if not self._keep_separator:
+            ends = list(accumulate(sizes, lambda pos, n: pos + size + n, initial=start - size))[1:]
+            return [e - n for e, n in zip(ends, sizes) if n], [e for e, n in zip(ends, sizes) if n]
+        if self._keep_separator == "end":
+            sizes = [n + size for n in sizes[:-1]] + sizes[-1:]
+        else:
+            sizes = sizes[:1] + [n + size for n in sizes[1:]]
+        bounds = list(accumulate(sizes, initial=start))
+        starts, ends = bounds[:-1], bounds[1:]
+        if sizes[0] == 0:
+            starts, ends = starts[1:], ends[1:]
+        elif sizes[-1] == 0:
+            starts, ends = starts[:-1], ends[:-1]
+        return starts, ends
+
+    def _merge(
+        self, text: str, starts: List[int], ends: List[int], lengths: List[int], lo: int, hi: int, separator: str
+    ) -> Iterator[str]:
+        """把第 [lo, hi) 个片段合并为不超过 chunk_size 的 chunk，相邻 chunk 保留不超过 chunk_overlap 的重叠"""
+        chunk_size, chunk_overlap = self._chunk_size, self._chunk_overlap
+        separator_len = self._length_function(separator)
+        first = lo
+        total = 0
+        for i in range(lo, hi):
+            length = lengths[i]
+            if total + length + (separator_len if i > first else 0) > chunk_size:
+                if i > first:
+                    doc = self._join(text, starts, ends, first, i, separator)
+                    if doc is not None:
+                        yield doc
+                    while i > first and (total > chunk_overlap or (
+                        total + length + separator_len > chunk_size and total > 0
+                    )):
+                        total -= lengths[first] + (separator_len if i - first > 1 else 0)
+                        first += 1
+            total += length + (separator_len if i > first else 0)
+        doc = self._join(text, starts, ends, first, hi, separator)
+        if doc is not None:
+            yield doc
+
+    def _join(self, text: str, starts: List[int], ends: List[int], first: int, last: int, separator: str) -> Optional[str]:
+        if first >= last:
+            return None
+        if self._keep_separator:
+            # 保留分隔符时片段在原文中首尾相接，直接切片
+            doc = text[starts[first]:ends[last - 1]]
+        else:
+            doc = separator.join(text[s:e] for s, e in zip(starts[first:last], ends[first:last]))
+        if self._strip_whitespace:
+            doc = doc.strip()
+        return doc or None
+
+
 def split_text(
     text: str,
     splitter_type: str = 'recursive',
     chunk_size: int = 500,
     chunk_overlap: int = 50,
+    length_unit: str = 'char',
+    model_name: Optional[str] = None,
     **kwargs
 ) -> List[str]:
     """
     支持多种切割方式和参数配置
-    splitter_type: 'recursive' | 'markdown' | ...
+    splitter_type: 'recursive' | 'markdown'（按 split_markdown_stream 切割）
     chunk_size: 每个chunk最大长度
     chunk_overlap: chunk重叠部分
+    length_unit: chunk_size/overlap 的单位，'char' | 'token'（按 model_name 对应的分词器计数）
     kwargs: 其他切割器支持的参数
     """
-    if splitter_type == 'markdown':
-        splitter = MarkdownHeaderTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            **kwargs
-        )
-    else:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            **kwargs
-        )
+    if splitter_type in ('markdown', 'md'):
+        length_function = kwargs.get('length_function') or get_length_function(length_unit, model_name)
+        return [chunk for chunk, _ in split_markdown_stream([text], chunk_size, chunk_overlap, length_function)]
+    kwargs.setdefault('length_function', get_length_function(length_unit, model_name))
+    splitter = FastRecursiveSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        **kwargs
+    )
     return splitter.split_text(text)
 
 def split_text_iter(
@@ -37,25 +173,279 @@ def split_text_iter(
     splitter_type: str = 'recursive',
     chunk_size: int = 500,
     chunk_overlap: int = 50,
+    length_unit: str = 'char',
+    model_name: Optional[str] = None,
     **kwargs
 ):
     """
     生成器方式切割文本，边切边yield chunk
     """
-    if splitter_type == 'markdown':
-        splitter = MarkdownHeaderTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            **kwargs
-        )
-    else:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            **kwargs
-        )
-    for chunk in splitter.split_text(text):
-        yield chunk
+    if splitter_type in ('markdown', 'md'):
+        length_function = kwargs.get('length_function') or get_length_function(length_unit, model_name)
+        for chunk, _ in split_markdown_stream([text], chunk_size, chunk_overlap, length_function):
+            yield chunk
+        return
+    kwargs.setdefault('length_function', get_length_function(length_unit, model_name))
+    splitter = FastRecursiveSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        **kwargs
+    )
+    yield from splitter.iter_split(text)
+
+STREAM_CUT_SEPARATORS = ("\n\n", "\n", " ")
+
+
+def _find_stream_cut(buffer: str, window: int) -> int:
+    """在 buffer[:window] 的后半段找最后一个段落/行/空格边界，返回截断位置（分隔符之后）"""
+    for sep in STREAM_CUT_SEPARATORS:
+        pos = buffer.rfind(sep, window // 2, window)
+        if pos >= 0:
+            return pos + len(sep)
+    return window
+
+
+def split_text_stream(
+    text_iter: Iterable[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    window_factor: int = 64,
+    **kwargs
+) -> Iterator[str]:
+    """
+    流式切割：文本分段到达时即开始产出 chunk，内存占用与窗口大小成正比
+    累积到窗口大小后在最后一个段落边界截断，截断点之前的部分按 FastRecursiveSplitter 切割，
+    其余部分与后续文本拼接。截断点两侧的 chunk 之间没有 overlap。
+    """
+    splitter = FastRecursiveSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        **kwargs
+    )
+    window = max(chunk_size * window_factor, 64 * 1024)
+    buffer = ""
+    for piece in text_iter:
+        buffer += piece
+        while len(buffer) >= window:
+            cut = _find_stream_cut(buffer, window)
+            head, buffer = buffer[:cut], buffer[cut:]
+            yield from splitter.iter_split(head)
+    if buffer:
+        yield from splitter.iter_split(buffer)
+
+# Markdown 流式切割
+
+MARKDOWN_HEADER_PATH_SEPARATOR = " > "
+
+_MD_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_MD_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_MD_SETEXT_RE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+_MD_TABLE_DELIMITER_RE = re.compile(r"^[ \t]*\|?[ \t]*:?-+:?[ \t]*(\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$")
+
+
+def _iter_lines(text_iter: Iterable[str]) -> Iterator[str]:
+    """把任意切分的文本分段还原为逐行输出（不含换行符，CRLF 行尾的 \r 一并去掉）"""
+    rest = ""
+    for piece in text_iter:
+        rest += piece
+        lines = rest.split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line[:-1] if line.endswith("\r") else line
+    if rest:
+        yield rest[:-1] if rest.endswith("\r") else rest
+
+
+def _iter_markdown_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, str, int]]:
+    """
+    逐行识别 Markdown 块，产出 (block_type, text, level)：
+    heading（ATX 与 Setext 标题，level 为 1~6）、code（围栏代码块，含围栏行）、table（含表头与分隔行）、text（段落）
+    """
+    paragraph: List[str] = []
+    table: List[str] = []
+    fence: List[str] = []
+    fence_marker = ""
+
+    def end_paragraph():
+        if paragraph:
+            yield "text", "\n".join(paragraph), 0
+            paragraph.clear()
+
+    def end_table():
+        if table:
+            yield "table", "\n".join(table), 0
+            table.clear()
+
+    for line in lines:
+        if fence_marker:
+            fence.append(line)
+            stripped = line.strip()
+            if stripped.startswith(fence_marker) and not stripped.lstrip(fence_marker[0]):
+                yield "code", "\n".join(fence), 0
+                fence.clear()
+                fence_marker = ""
+            continue
+        if table:
+            if line.strip() and "|" in line:
+                table.append(line)
+                continue
+            yield from end_table()
+        fence_match = _MD_FENCE_RE.match(line)
+        if fence_match:
+            yield from end_paragraph()
+            fence_marker = fence_match.group(1)
+            fence.append(line)
+            continue
+        heading_match = _MD_HEADING_RE.match(line)
+        if heading_match:
+            yield from end_paragraph()
+            yield "heading", (heading_match.group(2) or "").strip(), len(heading_match.group(1))
+            continue
+        if not line.strip():
+            yield from end_paragraph()
+            continue
+        if paragraph and _MD_SETEXT_RE.match(line):
+            # Setext 标题：段落下方的 === / --- 把整个段落变为标题
+            level = 1 if line.strip().startswith("=") else 2
+            yield "heading", " ".join(p.strip() for p in paragraph), level
+            paragraph.clear()
+            continue
+        if len(paragraph) >= 1 and "|" in paragraph[-1] and _MD_TABLE_DELIMITER_RE.match(line):
+            header = paragraph.pop()
+            yield from end_paragraph()
+            table.extend([header, line])
+            continue
+        paragraph.append(line)
+
+    if fence:
+        # 未闭合的代码块按 CommonMark 延续到文末
+        yield "code", "\n".join(fence), 0
+    yield from end_table()
+    yield from end_paragraph()
+
+
+def split_markdown_stream(
+    text_iter: Iterable[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    length_function: Callable[[str], int] = len
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Markdown 流式切割：单遍逐行解析标题、围栏代码块与表格，产出 (chunk, metadata)
+    - 同一标题下的相邻块合并到不超过 chunk_size，遇到新标题时结束当前分块
+    - 章节首个分块以标题路径开头（计入 chunk_size）；没有正文的标题单独成块（block_type 为 heading）
+    - 围栏代码块从不拆分，超过 chunk_size 时单独成块
+    - 超长表格按行分组，每组重复表头与分隔行；超长段落按 FastRecursiveSplitter 切分
+    - metadata 含 header_path（如 "安装 > 依赖"）与 block_type（text | code | table | heading）
+    """
+    splitter = FastRecursiveSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function
+    )
+    separator_len = length_function("\n\n")
+    headings: List[Tuple[int, str]] = []
+    buffer: List[Tuple[str, str]] = []
+    buffer_len = 0
+
+    def header_path() -> str:
+        return MARKDOWN_HEADER_PATH_SEPARATOR.join(text for _, text in headings)
+
+    def metadata(block_type: str) -> Dict[str, Any]:
+        return {"header_path": header_path(), "block_type": block_type}
+
+    def flush():
+        nonlocal buffer_len
+        if buffer:
+            block_types = {block_type for block_type, _ in buffer if block_type != "heading"} or {"heading"}
+            chunk_type = block_types.pop() if len(block_types) == 1 else "text"
+            yield "\n\n".join(text for _, text in buffer), metadata(chunk_type)
+        buffer.clear()
+        buffer_len = 0
+
+    def take_heading() -> str:
+        """缓冲区中只有章节标题行时取出，作为超长首块第一个分块的前缀"""
+        nonlocal buffer_len
+        if len(buffer) != 1 or buffer[0][0] != "heading":
+            return ""
+        prefix = buffer[0][1] + "\n\n"
+        buffer.clear()
+        buffer_len = 0
+        return prefix
+
+    for block_type, text, level in _iter_markdown_blocks(_iter_lines(text_iter)):
+        if block_type == "heading":
+            # 上一个标题下没有正文时，其标题行单独成块
+            yield from flush()
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            if text:
+                headings.append((level, text))
+                # 标题路径作为章节首个分块的第一行
+                path = header_path()
+                buffer.append(("heading", path))
+                buffer_len = length_function(path)
+            continue
+        text_len = length_function(text)
+        added = text_len + (separator_len if buffer else 0)
+        if buffer_len + added <= chunk_size:
+            buffer.append((block_type, text))
+            buffer_len += added
+            continue
+        # 章节首块与标题行放不进同一分块时，标题行仍并入该块的第一个分块
+        prefix = take_heading()
+        yield from flush()
+        if prefix and length_function(prefix) >= chunk_size:
+            # 标题路径本身已占满 chunk_size 时单独成块
+            yield prefix.rstrip("\n"), metadata("heading")
+            prefix = ""
+        # 标题行前缀占用的长度计入 chunk_size，该块按剩余长度切分
+        budget = chunk_size - length_function(prefix)
+        if text_len <= budget or block_type == "code":
+            buffer.append((block_type, prefix + text))
+            buffer_len = length_function(prefix) + text_len
+        elif block_type == "table":
+            for part in _split_markdown_table(text, chunk_size, length_function, first_size=budget):
+                yield prefix + part, metadata("table")
+                prefix = ""
+        else:
+            if budget < chunk_size:
+                splitter_for_block = FastRecursiveSplitter(
+                    chunk_size=budget, chunk_overlap=min(chunk_overlap, budget), length_function=length_function
+                )
+            else:
+                splitter_for_block = splitter
+            for piece in splitter_for_block.iter_split(text):
+                yield prefix + piece, metadata("text")
+                prefix = ""
+    yield from flush()
+
+
+def _split_markdown_table(
+    table: str,
+    chunk_size: int,
+    length_function: Callable[[str], int],
+    first_size: Optional[int] = None
+) -> List[str]:
+    """按行分组切分 Markdown 表格，每组以表头行与分隔行开头；第一组不超过 first_size（默认 chunk_size）"""
+    rows = table.split("\n")
+    header = "\n".join(rows[:2])
+    header_len = length_function(header)
+    newline = length_function("\n")
+    parts: List[str] = []
+    current: List[str] = []
+    current_len = header_len
+    for row in rows[2:]:
+        row_len = length_function(row)
+        limit = chunk_size if parts or first_size is None else first_size
+        if current and current_len + newline + row_len > limit:
+            parts.append("\n".join([header] + current))
+            current, current_len = [], header_len
+        current.append(row)
+        current_len += newline + row_len
+    if current or not parts:
+        parts.append("\n".join([header] + current))
+    return parts
 
 # PDF 解析工具
 
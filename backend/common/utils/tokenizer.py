@@ -0,0 +1,123 @@
+"""
+按 embedding 模型计算 token 数，用于按 token 切块和控制每次 embedding 请求的输入量
+
+OpenAI 系列模型使用 tiktoken 精确计数；其他模型（Ollama / Xinference 部署的 bge、m3e 等）
+没有可离线加载的分词器，按 CJK 字符 1 token、其余 4 字符 1 token 保守估算。
+计数器按模型名缓存，同一进程内只加载一次编码表。
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Optional
+
+from loguru import logger
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken 已在 requirements.txt 中固定版本，未安装时按估算计数
+    tiktoken = None
+
+LENGTH_UNITS = ("char", "token")
+
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+# 常见 embedding 模型单条输入的 token 上限（按模型名子串匹配，靠前的优先）
+MODEL_MAX_INPUT_TOKENS = (
+    ("text-embedding-3", 8191),
+    ("text-embedding-ada", 8191),
+    ("bge-m3", 8192),
+    ("nomic-embed", 8192),
+    ("jina-embeddings-v2", 8192),
+    ("qwen3-embedding", 32768),
+    ("gte-qwen", 32768),
+    ("bge-", 512),
+    ("m3e", 512),
+    ("text2vec", 512),
+    ("gte-", 512),
+)
+DEFAULT_MAX_INPUT_TOKENS = 512
+
+# 各服务商单次 embedding 请求的 token 上限（OpenAI 为 300k；本地部署的服务按显存保守取值）
+PROVIDER_MAX_BATCH_TOKENS = {
+    "openai": 300000,
+    "ollama": 8192,
+    "xinference": 8192,
+}
+DEFAULT_MAX_BATCH_TOKENS = 8192
+
+_OPENAI_PREFIXES = ("text-embedding-", "gpt-", "o1", "o3")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符按1个token，其余按4个字符1个token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenCounter:
+    """token 计数器，name 为使用的编码（tiktoken 编码名或 estimate）"""
+
+    def __init__(self, name: str, count: Callable[[str], int]):
+        self.name = name
+        self._count = count
+
+    def count(self, text: str) -> int:
+        return self._count(text) if text else 0
+
+    __call__ = count
+
+
+@lru_cache(maxsize=32)
+def get_token_counter(model_name: Optional[str] = None) -> TokenCounter:
+    """按模型名返回（缓存的）token 计数器"""
+    name = (model_name or "").lower()
+    if tiktoken is not None and name.startswith(_OPENAI_PREFIXES):
+        try:
+            encoding = tiktoken.encoding_for_model(name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"加载 tiktoken 编码失败，按估算计数: model={model_name}, 错误={e}")
+            return TokenCounter("estimate", estimate_tokens)
+        return TokenCounter(encoding.name, lambda text: len(encoding.encode(text, disallowed_special=())))
+    return TokenCounter("estimate", estimate_tokens)
+
+
+def get_max_input_tokens(model_name: Optional[str], default: int = DEFAULT_MAX_INPUT_TOKENS) -> int:
+    """模型单条输入的 token 上限，未知模型返回 default"""
+    name = (model_name or "").lower()
+    for pattern, limit in MODEL_MAX_INPUT_TOKENS:
+        if pattern in name:
+            return limit
+    return default
+
+
+def get_max_batch_tokens(provider: Optional[str], default: int = DEFAULT_MAX_BATCH_TOKENS) -> int:
+    """服务商单次 embedding 请求的 token 上限"""
+    return PROVIDER_MAX_BATCH_TOKENS.get((provider or "").lower(), default)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: Optional[str] = None) -> str:
+    """截取 text 的最长前缀，使其 token 数不超过 max_tokens（按前缀长度二分查找）"""
+    count = get_token_counter(model_name).count
+    if count(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def get_length_function(length_unit: str = "char", model_name: Optional[str] = None) -> Callable[[str], int]:
+    """切块长度函数：char 按字符数，token 按模型 token 数"""
+    if length_unit == "token":
+        return get_token_counter(model_name).count
+    if length_unit != "char":
+        raise ValueError(f"不支持的长度单位: {length_unit}")
+    return len
@@ -0,0 +1,52 @@
+"""
+向量的紧凑表示：连续的 float32 NumPy 数组，以及跨进程传输用的 base64 编码
+
+每个维度 4 字节（List[float] 中每个 Python float 约 32 字节），
+base64 按小端 float32 原始字节编码，与 OpenAI embeddings 接口 encoding_format="base64" 的格式一致。
+"""
+
+import base64
+import binascii
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+FLOAT32_LE = np.dtype("<f4")
+
+Vectors = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def to_float32_array(vectors: Vectors) -> np.ndarray:
+    """转换为 (n, dim) 的连续 float32 数组，已是该格式时不复制"""
+    array = np.ascontiguousarray(vectors, dtype=np.float32)
+    if array.ndim == 1 and array.size == 0:
+        return array.reshape(0, 0)
+    if array.ndim != 2:
+        raise ValueError(f"向量数组应为二维 (n, dim)，实际为 {array.shape}")
+    return array
+
+
+def encode_float32_base64(vectors: Union[np.ndarray, Sequence[float]]) -> str:
+    """单个向量或一批向量按行拼接后编码为 base64（小端 float32）"""
+    return base64.b64encode(np.ascontiguousarray(vectors, dtype=FLOAT32_LE).tobytes()).decode("ascii")
+
+
+def decode_float32_base64(data: str, dim: Optional[int] = None) -> np.ndarray:
+    """
+    解码 base64（小端 float32），不复制底层字节；指定 dim 时返回 (n, dim)，否则返回一维数组
+
+    Raises:
+        ValueError: 不是合法的 base64，或字节数与维度不匹配
+    """
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"向量不是合法的 base64: {e}")
+    if len(raw) % FLOAT32_LE.itemsize:
+        raise ValueError(f"向量字节数 {len(raw)} 不是 float32 的整数倍")
+    array = np.frombuffer(raw, dtype=FLOAT32_LE)
+    if dim is None:
+        return array
+    if not dim or array.size % dim:
+        raise ValueError(f"向量长度 {array.size} 与维度 {dim} 不匹配")
+    return array.reshape(-1, dim)
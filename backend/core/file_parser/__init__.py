@@ -3,11 +3,13 @@
 from .base_parser import BaseFileParser
 from .doc_parser import WordFileParser
 from .text_parser import TextFileParser
+from .pdf_parser import PdfFileParser
 from .img_parser import ImgFileParser
 
 __all__ = [
     "BaseFileParser",
     "WordFileParser",
     "TextFileParser",
+    "PdfFileParser",
     "ImgFileParser",
 ] 
\ No newline at end of file
@@ -4,12 +4,16 @@ from pathlib import Path
 import os
 from dataclasses import dataclass
 from pydantic import BaseModel
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from common.utils.text_splitter import FastRecursiveSplitter
+from common.utils.tokenizer import get_length_function
 
 
 class ChunkParams(BaseModel):
     chunk_size: int = 1000
     overlap: int = 100
+    length_unit: str = "char"  # char | token
+    model_name: Optional[str] = None  # length_unit 为 token 时用于选择分词器
 
 
 
@@ -108,10 +112,10 @@ class BaseFileParser(ABC):
 
         chunk_size = chunk_params.chunk_size if chunk_params else 1000
         overlap = chunk_params.overlap if chunk_params else 100
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+        length_function = get_length_function(chunk_params.length_unit, chunk_params.model_name) if chunk_params else len
+        text_splitter = FastRecursiveSplitter(chunk_size=chunk_size, chunk_overlap=overlap, length_function=length_function)
         text = self.parse_to_text(file_path, file_content)
-        for chunk in text_splitter.split_text(text):
-            yield chunk
+        yield from text_splitter.iter_split(text)
     
     
     def parse_to_text(self, file_path: str | None = None, file_content: bytes | str | None = None) -> str:
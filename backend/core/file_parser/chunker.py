@@ -0,0 +1,169 @@
+"""结构化分块：把块级解析结果（标题、段落、表格、图片）合并为接近 chunk_size 的分块"""
+
+import re
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Tuple
+
+from common.utils.text_splitter import FastRecursiveSplitter
+
+from .base_parser import ParsedContent
+
+HEADING_PATH_SEPARATOR = " > "
+
+
+def heading_level(style_name: str) -> int:
+    """标题级别：Title 为 0，Heading N 为 N，无法识别时按 1 处理"""
+    name = (style_name or "").lower()
+    if "title" in name and "heading" not in name:
+        return 0
+    match = re.search(r"(\d+)", name)
+    return int(match.group(1)) if match else 1
+
+
+class StructuredChunker:
+    """
+    结构化分块器，位于 WordFileParser.parse_blocks_lazy 与 embedding 之间
+
+    - 同一标题下的相邻段落合并到不超过 chunk_size，遇到新标题时结束当前分块（分块不跨章节）
+    - 章节首个分块的第一行为标题路径，计入 chunk_size；没有正文的标题单独成块
+    - 超长段落按 FastRecursiveSplitter（chunk_size / overlap）切分
+    - 表格单独成块且不拆行；超过 chunk_size 时按 table_data 的行分组（单元格内可含换行），每组重复表头行
+    - 图片描述单独成块，保留原有图片元数据
+    - 每个分块的 metadata 带 heading_path（如 "第一章 > 1.2 安装"）与 block_type
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 100, length_function: Callable[[str], int] = len):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.length = length_function
+        self._splitter = FastRecursiveSplitter(
+            chunk_size=chunk_size, chunk_overlap=overlap, length_function=length_function
+        )
+
+    def chunk(self, blocks: Iterable[ParsedContent]) -> Generator[ParsedContent, None, None]:
+        headings: List[Tuple[int, str]] = []
+        buffer: List[str] = []
+        buffer_len = 0
+        # 缓冲区中只有本章节的标题行、尚无正文
+        heading_only = False
+
+        def heading_path() -> str:
+            return HEADING_PATH_SEPARATOR.join(text for _, text in headings)
+
+        def flush() -> Generator[ParsedContent, None, None]:
+            nonlocal buffer, buffer_len, heading_only
+            if buffer:
+                yield self._make("\n".join(buffer), "text", heading_path())
+            buffer, buffer_len, heading_only = [], 0, False
+
+        def take_heading() -> str:
+            """取出待写入的标题行，作为章节首个表格/图片/超长段落分块的前缀"""
+            nonlocal buffer, buffer_len, heading_only
+            if not heading_only:
+                return ""
+            prefix = buffer[0] + "\n"
+            buffer, buffer_len, heading_only = [], 0, False
+            return prefix
+
+        def heading_alone(prefix: str) -> Generator[ParsedContent, None, None]:
+            """标题路径本身已占满 chunk_size 时单独成块，正文不再带前缀"""
+            yield self._make(prefix.rstrip("\n"), "text", heading_path())
+
+        for block in blocks:
+            text = (block.content or "").strip()
+            if block.type == "heading":
+                # 上一个标题下没有正文时，其标题行单独成块
+                yield from flush()
+                level = heading_level(block.metadata.get("style", ""))
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                if text:
+                    headings.append((level, text))
+                    # 标题路径作为章节首个分块的第一行
+                    path = heading_path()
+                    buffer, buffer_len, heading_only = [path], self.length(path), True
+                continue
+            if block.type == "table":
+                prefix = take_heading()
+                yield from flush()
+                if prefix and self.length(prefix) >= self.chunk_size:
+                    yield from heading_alone(prefix)
+                    prefix = ""
+                for part in self._split_table(block, self.chunk_size - self.length(prefix)):
+                    yield self._make(prefix + part, "table", heading_path(), {"table_rows": block.metadata.get("rows", 0)})
+                    prefix = ""
+                continue
+            if block.type == "image":
+                prefix = take_heading()
+                yield from flush()
+                metadata = {k: v for k, v in block.metadata.items() if isinstance(v, (str, int, float, bool))}
+                yield self._make(prefix + text, "image", heading_path(), metadata)
+                continue
+            if not text:
+                continue
+            text_len = self.length(text)
+            added = text_len + (self.length("\n") if buffer else 0)
+            if buffer_len + added <= self.chunk_size:
+                buffer.append(text)
+                buffer_len += added
+                heading_only = False
+                continue
+            # 章节首段与标题行放不进同一分块时，标题行仍并入该段的第一个分块
+            prefix = take_heading()
+            yield from flush()
+            if prefix and self.length(prefix) >= self.chunk_size:
+                yield from heading_alone(prefix)
+                prefix = ""
+            # 标题行前缀占用的长度计入 chunk_size，该段按剩余长度切分
+            budget = self.chunk_size - self.length(prefix)
+            if text_len <= budget:
+                buffer, buffer_len = [prefix + text], self.length(prefix) + text_len
+            else:
+                for piece in self._get_splitter(budget).iter_split(text):
+                    yield self._make(prefix + piece, "text", heading_path())
+                    prefix = ""
+        yield from flush()
+
+    def _get_splitter(self, chunk_size: int) -> FastRecursiveSplitter:
+        if chunk_size == self.chunk_size:
+            return self._splitter
+        return FastRecursiveSplitter(
+            chunk_size=chunk_size, chunk_overlap=min(self.overlap, chunk_size), length_function=self.length
+        )
+
+    def _split_table(self, block: ParsedContent, first_size: int) -> List[str]:
+        """
+        表格文本不超过 first_size 时整体返回，否则按行分组（每组带表头行）
+
+        first_size 为第一组可用的长度（chunk_size 减去标题行前缀），其余各组为 chunk_size。
+        行取自 metadata 的 table_data，与解析器相同的 " | " 格式；没有 table_data 时按文本行分组。
+        """
+        if self.length(block.content) <= first_size:
+            return [block.content]
+        table_data = block.metadata.get("table_data")
+        if table_data:
+            rows = [" | ".join(cells) for cells in table_data]
+        else:
+            rows = block.content.split("\n")
+        header, body = rows[0], rows[1:]
+        newline = self.length("\n")
+        parts: List[str] = []
+        current: List[str] = [header]
+        current_len = self.length(header)
+        for row in body:
+            row_len = self.length(row)
+            limit = self.chunk_size if parts else first_size
+            if len(current) > 1 and current_len + newline + row_len > limit:
+                parts.append("\n".join(current))
+                current, current_len = [header], self.length(header)
+            current.append(row)
+            current_len += newline + row_len
+        if len(current) > 1 or not parts:
+            parts.append("\n".join(current))
+        return parts
+
+    @staticmethod
+    def _make(text: str, block_type: str, heading_path: str, extra: Optional[Dict] = None) -> ParsedContent:
+        metadata = dict(extra or {})
+        metadata["block_type"] = block_type
+        metadata["heading_path"] = heading_path
+        return ParsedContent(content_type="image" if block_type == "image" else "text", content=text, metadata=metadata)
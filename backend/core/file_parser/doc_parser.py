@@ -13,6 +13,7 @@ from prompt_hub import get_prompt
 from .base_parser import BaseFileParser, ParsedContent
 from core.model.vision.base import VisionModel
 from .img_parser import ImgFileParser
+from .parallel import iter_ordered, open_cached, resolve_workers
 
 # 全局命名空间字典，便于lxml查找
 NS = {
@@ -21,15 +22,29 @@ NS = {
     # 可按需扩展
 }
 
+def _parse_body_section(file_path: str, start: int, end: int, blocks: bool = False) -> List[ParsedContent]:
+    """进程池中执行：解析正文第 [start, end) 个元素（不调用视觉模型）；每个池进程只打开一次文档"""
+    return list(WordFileParser()._iter_body(open_cached(file_path, Document), start, end, blocks=blocks))
+
+
 class WordFileParser(BaseFileParser):
     """Word文档解析器，支持文本和图片顺序还原"""
     
-    def __init__(self, vision_model: VisionModel | None = None):
+    def __init__(self, vision_model: VisionModel | None = None, max_workers: int = 1, parallel_min_elements: int = 5000, section_elements: int = 1000):
         """
         支持直接传入视觉模型实例（如OpenAIVisionModel等）
+
+        Args:
+            max_workers: 进程池解析的进程数（0为按CPU核数，1为不启用）。
+                需要调用视觉模型时总是在当前进程中顺序解析
+            parallel_min_elements: 正文元素（段落、表格）数达到该值时启用进程池
+            section_elements: 每个进程池解析单元包含的正文元素数
         """
         super().__init__()
         self.vision_model = vision_model
+        self.max_workers = max_workers
+        self.parallel_min_elements = parallel_min_elements
+        self.section_elements = max(section_elements, 1)
         if vision_model is not None:
             self.vision_model_func = vision_model.invoke
             self.img_parser = ImgFileParser(vision_model)
@@ -46,119 +61,157 @@ class WordFileParser(BaseFileParser):
         """
         懒加载方式解析Word文件内容，按文档实际顺序yield文本和图片
         """
+        yield from self._parse_lazy(file_path, blocks=False)
+
+    def parse_blocks_lazy(self, file_path: str | None = None) -> Generator[ParsedContent, None, None]:
+        """
+        按块级结构解析：每个段落一个 ParsedContent（heading/text，metadata 含 style），
+        每个表格一个 table（见 _parse_table），图片与 parse_file_lazy 相同。供结构化分块使用。
+        """
+        yield from self._parse_lazy(file_path, blocks=True)
+
+    def _parse_lazy(self, file_path: str | None, blocks: bool) -> Generator[ParsedContent, None, None]:
         if not self.check_path(file_path):
             raise ValueError(f"不支持的文件格式或文件不存在: {file_path}")
         try:
             doc = Document(file_path)
-            image_idx = 0
-            rels = doc.part.rels
-            image_rid_map = {}
-            for rel in rels.values():
-                if "image" in rel.target_ref:
-                    image_rid_map[rel.rId] = rel.target_part.blob
-
-            # 收集所有段落文本，便于图片上下文拼接
-            all_paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-
-            def yield_paragraph(paragraph: Paragraph, para_idx: int):
-                nonlocal image_idx
-                for run in paragraph.runs:
-                    drawing_elements = run._element.findall('.//w:drawing', namespaces=NS)
-                    if drawing_elements:
-                        for drawing in drawing_elements:
-                            blip = drawing.find('.//a:blip', namespaces=NS)
-                            if blip is not None:
-                                embed_rid = blip.attrib.get(qn('r:embed'))
-                                if embed_rid and embed_rid in image_rid_map:
-                                    image_data = image_rid_map[embed_rid]
-                                    # 上下文：前后各1段
-                                    context = ""
-                                    if para_idx > 0:
-                                        context += all_paragraphs[para_idx-1] + "\n"
-                                    context += paragraph.text.strip() + "\n"
-                                    if para_idx+1 < len(all_paragraphs):
-                                        context += all_paragraphs[para_idx+1]
-                                    metadata = {
-                                        'image_idx': image_idx,
-                                        'image_format': rels[embed_rid].target_ref.split('.')[-1] if '.' in rels[embed_rid].target_ref else 'unknown',
-                                        'image_size': len(image_data)
-                                    }
-                                    if hasattr(self, 'img_parser') and self.img_parser is not None:
-                                        # Use ImgParser to extract knowledge from image
-                                        parsed = self.img_parser.parse_image(file_content=image_data, context=context)
-                                        # Merge ImgParser metadata
-                                        metadata.update(parsed.metadata)
-                                        yield ParsedContent(
-                                            content_type='image',
-                                            content=f"【以下内容由视觉大模型解析的文档图片知识】\n{parsed.content}\n【文档图片知识结束】",
-                                            metadata=metadata
-                                        )
-                                    else:
-                                        # No vision model, yield placeholder
-                                        yield ParsedContent(
-                                            content_type='image',
-                                            content='[Image Placeholder: This is an image in the document.]',
-                                            metadata=metadata
-                                        )
-                                    image_idx += 1
-                    # 普通文本run
-                    text = run.text.strip()
-                    if text:
-                        style_name = paragraph.style.name if paragraph.style else ""
-                        metadata = {
-                            'style': style_name,
-                            'alignment': str(paragraph.alignment) if paragraph.alignment else None,
-                        }
-                        if any(heading in style_name.lower() for heading in ['heading', 'title']):
-                            content_type = 'heading'
-                        else:
-                            content_type = 'text'
-                        yield ParsedContent(
-                            content_type=content_type,
-                            content=text,
-                            metadata=metadata
-                        )
-
-            def yield_table(table: Table):
-                for row in table.rows:
-                    for cell in row.cells:
-                        for para in cell.paragraphs:
-                            # 传递para_idx为-1，表格内不做上下文拼接
-                            yield from yield_paragraph(para, -1)
-
-            # 主体遍历
-            for idx, element in enumerate(doc.element.body):
-                if element.tag.endswith('p'):
-                    para = self._get_paragraph_from_element(doc, element)
-                    if para:
-                        yield from yield_paragraph(para, idx)
-                elif element.tag.endswith('tbl'):
-                    table = self._get_table_from_element(doc, element)
-                    if table:
-                        yield from yield_table(table)
+            element_count = len(doc.element.body)
+            workers = resolve_workers(self.max_workers) if self.img_parser is None else 1
+            if workers > 1 and element_count >= self.parallel_min_elements:
+                del doc
+                sections = [
+                    (file_path, start, min(start + self.section_elements, element_count), blocks)
+                    for start in range(0, element_count, self.section_elements)
+                ]
+                # 各区段内的图片序号从0开始，这里按文档顺序重新编号
+                image_idx = 0
+                for contents in iter_ordered(_parse_body_section, sections, workers):
+                    for content in contents:
+                        if content.type == 'image':
+                            content.metadata['image_idx'] = image_idx
+                            image_idx += 1
+                        yield content
+            else:
+                yield from self._iter_body(doc, blocks=blocks)
         except Exception as e:
             logger.error(f"Word文档流式解析失败: {file_path}, 错误: {str(e)}")
             raise ValueError(f"Word文档流式解析失败: {str(e)}")
+
+    def _iter_body(self, doc: DocxDocument, start: int = 0, end: Optional[int] = None, blocks: bool = False) -> Generator[ParsedContent, None, None]:
+        """按文档顺序解析正文中第 [start, end) 个元素，blocks 为 True 时按段落/表格整体产出"""
+        image_idx = 0
+        rels = doc.part.rels
+        # 全文段落文本只用于视觉模型的图片上下文，首次需要时才收集；进程池区段不调用视觉模型，不会收集
+        all_paragraphs: Optional[List[str]] = None
+
+        def image_blob(rid: str) -> Optional[bytes]:
+            # 只查找本区段内引用到的图片关系，不预先读取全部图片
+            rel = rels.get(rid)
+            if rel is None or "image" not in rel.target_ref:
+                return None
+            return rel.target_part.blob
+
+        def image_context(paragraph: Paragraph, para_idx: int) -> str:
+            nonlocal all_paragraphs
+            if all_paragraphs is None:
+                all_paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+            # 上下文：前后各1段
+            context = ""
+            if para_idx > 0:
+                context += all_paragraphs[para_idx-1] + "\n"
+            context += paragraph.text.strip() + "\n"
+            if para_idx+1 < len(all_paragraphs):
+                context += all_paragraphs[para_idx+1]
+            return context
+
+        def yield_paragraph(paragraph: Paragraph, para_idx: int, with_text: bool = True):
+            nonlocal image_idx
+            style_name = None
+            for run in paragraph.runs:
+                drawing_elements = run._element.findall('.//w:drawing', namespaces=NS)
+                if drawing_elements:
+                    for drawing in drawing_elements:
+                        blip = drawing.find('.//a:blip', namespaces=NS)
+                        if blip is not None:
+                            embed_rid = blip.attrib.get(qn('r:embed'))
+                            image_data = image_blob(embed_rid) if embed_rid else None
+                            if image_data is not None:
+                                metadata = {
+                                    'image_idx': image_idx,
+                                    'image_format': rels[embed_rid].target_ref.split('.')[-1] if '.' in rels[embed_rid].target_ref else 'unknown',
+                                    'image_size': len(image_data)
+                                }
+                                if hasattr(self, 'img_parser') and self.img_parser is not None:
+                                    # Use ImgParser to extract knowledge from image
+                                    parsed = self.img_parser.parse_image(file_content=image_data, context=image_context(paragraph, para_idx))
+                                    # Merge ImgParser metadata
+                                    metadata.update(parsed.metadata)
+                                    yield ParsedContent(
+                                        content_type='image',
+                                        content=f"【以下内容由视觉大模型解析的文档图片知识】\n{parsed.content}\n【文档图片知识结束】",
+                                        metadata=metadata
+                                    )
+                                else:
+                                    # No vision model, yield placeholder
+                                    yield ParsedContent(
+                                        content_type='image',
+                                        content='[Image Placeholder: This is an image in the document.]',
+                                        metadata=metadata
+                                    )
+                                image_idx += 1
+                if blocks:
+                    continue
+                # 普通文本run
+                text = run.text.strip()
+                if text:
+                    if style_name is None:
+                        # 样式解析需要查找样式表，同一段落只做一次
+                        style_name = paragraph.style.name if paragraph.style else ""
+                    metadata = {
+                        'style': style_name,
+                        'alignment': str(paragraph.alignment) if paragraph.alignment else None,
+                    }
+                    if any(heading in style_name.lower() for heading in ['heading', 'title']):
+                        content_type = 'heading'
+                    else:
+                        content_type = 'text'
+                    yield ParsedContent(
+                        content_type=content_type,
+                        content=text,
+                        metadata=metadata
+                    )
+
+            if blocks and with_text:
+                yield from self._parse_paragraph(paragraph)
+
+        def yield_table(table: Table):
+            for row in table.rows:
+                for cell in row.cells:
+                    for para in cell.paragraphs:
+                        # 传递para_idx为-1，表格内不做上下文拼接；块模式下单元格文本由整表输出
+                        yield from yield_paragraph(para, -1, with_text=not blocks)
+            if blocks:
+                parsed_table = self._parse_table(table)
+                if parsed_table:
+                    yield parsed_table
+
+        # 主体遍历
+        body = doc.element.body
+        end = len(body) if end is None else min(end, len(body))
+        for idx in range(start, end):
+            element = body[idx]
+            if element.tag == qn('w:p'):
+                yield from yield_paragraph(self._get_paragraph_from_element(doc, element), idx)
+            elif element.tag == qn('w:tbl'):
+                yield from yield_table(self._get_table_from_element(doc, element))
     
-    def _get_paragraph_from_element(self, doc: DocxDocument, element) -> Optional[Paragraph]:
-        """从XML元素获取段落对象"""
-        try:
-            for para in doc.paragraphs:
-                if para._element == element:
-                    return para
-            return None
-        except Exception:
-            return None
+    def _get_paragraph_from_element(self, doc: DocxDocument, element) -> Paragraph:
+        """从XML元素构造段落对象（直接包装，避免每个元素都遍历 doc.paragraphs）"""
+        return Paragraph(element, doc._body)
     
-    def _get_table_from_element(self, doc: DocxDocument, element) -> Optional[Table]:
-        """从XML元素获取表格对象"""
-        try:
-            for table in doc.tables:
-                if table._element == element:
-                    return table
-            return None
-        except Exception:
-            return None
+    def _get_table_from_element(self, doc: DocxDocument, element) -> Table:
+        """从XML元素构造表格对象"""
+        return Table(element, doc._body)
     
     def _parse_paragraph(self, paragraph: Paragraph) -> List[ParsedContent]:
         """
@@ -0,0 +1,89 @@
+"""
+进程池解析：把文档拆成互不依赖的单元（PDF 页范围、DOCX 正文区段）在子进程中解析，按原顺序流式返回
+
+CPU 密集的解析放到子进程中，不再和任务线程里的分块提交、embedding 回调争抢 GIL。
+同时在途的单元数有上限，父进程只缓存少量已完成的结果。
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
+
+import billiard
+from loguru import logger
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 4
+
+# 子进程内最近打开的文档（按文件路径），同一进程处理的后续单元不再重复解析整个文件
+_opened: Dict[str, Tuple[Any, Any]] = {}
+_opened_lock = threading.Lock()
+
+
+def resolve_workers(max_workers: int = 0) -> int:
+    """实际使用的进程数：max_workers > 0 时按配置，否则按 CPU 核数（最多 DEFAULT_MAX_WORKERS）"""
+    if max_workers > 0:
+        return max_workers
+    return min(os.cpu_count() or 1, DEFAULT_MAX_WORKERS)
+
+
+def open_cached(file_path: str, opener: Callable[[str], T]) -> T:
+    """
+    子进程中打开文档：同一进程只保留最近一个文件的解析结果，
+    一个文档的多个单元分到同一进程时只解析一次（按 opener 区分，如 Document 与 PdfReader）
+    """
+    key = f"{getattr(opener, '__qualname__', opener)}:{file_path}"
+    with _opened_lock:
+        mtime = os.path.getmtime(file_path)
+        cached = _opened.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        _opened.clear()
+        document = opener(file_path)
+        _opened[key] = (mtime, document)
+        return document
+
+
+def iter_ordered(
+    func: Callable[..., T],
+    tasks: Sequence[tuple],
+    workers: int,
+    max_pending: Optional[int] = None
+) -> Iterator[T]:
+    """
+    在进程池中执行 func(*task)，按 tasks 的顺序产出结果
+
+    进程池使用 billiard 的 forkserver 上下文：
+    - Celery prefork 子进程是守护进程，标准库 multiprocessing 不允许其创建子进程，billiard 没有该限制
+    - 池进程由单线程的 forkserver 派生，不会继承任务进程中 embedding、HTTP 连接池、日志等线程持有的锁
+
+    Args:
+        func: 模块级函数（需可被 pickle，forkserver 预先导入其所在模块）
+        tasks: 参数元组列表
+        workers: 进程数
+        max_pending: 同时在途的任务数上限，默认 workers * 2
+    """
+    max_pending = max_pending or workers * 2
+    context = billiard.get_context("forkserver")
+    context.set_forkserver_preload([func.__module__])
+    logger.debug(f"进程池解析: func={func.__name__}, units={len(tasks)}, workers={workers}")
+    pool = context.Pool(processes=workers)
+    completed = False
+    try:
+        pending = deque()
+        next_task = 0
+        while next_task < len(tasks) or pending:
+            while next_task < len(tasks) and len(pending) < max_pending:
+                pending.append(pool.apply_async(func, tasks[next_task]))
+                next_task += 1
+            yield pending.popleft().get()
+        completed = True
+    finally:
+        if completed:
+            pool.close()
+        else:
+            # 出错或调用方提前结束迭代：丢弃未完成的单元
+            pool.terminate()
+        pool.join()
@@ -0,0 +1,70 @@
+from .base_parser import BaseFileParser, ParsedContent
+from .parallel import iter_ordered, open_cached, resolve_workers
+from typing import List, Generator, Optional, Tuple
+import io
+from pypdf import PdfReader
+
+
+def _extract_pages(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """子进程中执行：提取 [start, end) 页的文本；每个池进程只打开一次文件"""
+    reader = open_cached(file_path, PdfReader)
+    return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+class PdfFileParser(BaseFileParser):
+    """
+    PDF 解析器，按页产出文本，metadata 中带 page_number（从1开始）
+
+    页数不少于 parallel_min_pages 且可用进程数大于1时，按 batch_pages 页一批分发到进程池并行提取，
+    结果仍按页序产出；同时在途的批次数有上限，内存占用与批大小成正比而不是与文档大小成正比。
+    """
+
+    def __init__(self, max_workers: int = 0, parallel_min_pages: int = 200, batch_pages: int = 50):
+        super().__init__()
+        self.max_workers = max_workers
+        self.parallel_min_pages = parallel_min_pages
+        self.batch_pages = max(batch_pages, 1)
+
+    def get_supported_extensions(self) -> List[str]:
+        return ["pdf"]
+
+    def parse_file_lazy(self, file_path: str | None = None, file_content: bytes | str | None = None) -> Generator[ParsedContent, None, None]:
+        if file_path is None and isinstance(file_content, bytes):
+            reader = PdfReader(io.BytesIO(file_content))
+            yield from self._iter_sequential(reader)
+            return
+        if not self.check_path(file_path):
+            raise ValueError(f"Unsupported file format or file not found: {file_path}")
+        try:
+            reader = PdfReader(file_path)
+            page_count = len(reader.pages)
+        except Exception as e:
+            raise ValueError(f"PDF file read failed: {e}")
+
+        workers = resolve_workers(self.max_workers)
+        if workers > 1 and page_count >= self.parallel_min_pages:
+            del reader
+            yield from self._iter_parallel(file_path, page_count, workers)
+        else:
+            yield from self._iter_sequential(reader)
+
+    @staticmethod
+    def _page_content(page_number: int, text: str) -> Optional[ParsedContent]:
+        text = text.strip()
+        if not text:
+            return None
+        return ParsedContent(content_type="text", content=text, metadata={"page_number": page_number})
+
+    def _iter_sequential(self, reader: PdfReader) -> Generator[ParsedContent, None, None]:
+        for i in range(len(reader.pages)):
+            content = self._page_content(i + 1, reader.pages[i].extract_text() or "")
+            if content:
+                yield content
+
+    def _iter_parallel(self, file_path: str, page_count: int, workers: int) -> Generator[ParsedContent, None, None]:
+        batches = [(file_path, start, min(start + self.batch_pages, page_count)) for start in range(0, page_count, self.batch_pages)]
+        for pages in iter_ordered(_extract_pages, batches, workers):
+            for page_number, text in pages:
+                content = self._page_content(page_number, text)
+                if content:
+                    yield content
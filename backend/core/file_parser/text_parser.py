@@ -1,5 +1,7 @@
 from .base_parser import BaseFileParser, ParsedContent
-from typing import List, Generator, Optional
+from typing import Iterable, Iterator, List, Generator, Optional
+import codecs
+import io
 import os
 
 class TextFileParser(BaseFileParser):
@@ -19,4 +21,19 @@ class TextFileParser(BaseFileParser):
                     text = f.read()
             yield ParsedContent(content_type="text", content=text)
         except Exception as e:
-            raise ValueError(f"Text file read failed: {e}") 
\ No newline at end of file
+            raise ValueError(f"Text file read failed: {e}")
+
+    @staticmethod
+    def iter_text(byte_chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator[str]:
+        """
+        增量解码字节流（如边下载边读取的文件），换行符按文本模式统一为 \n。
+        内容不是合法的 encoding 编码时抛出 UnicodeDecodeError，由调用方回退到整文件解析。
+        """
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+        for chunk in byte_chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
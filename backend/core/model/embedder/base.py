@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
 from typing import List
+
+import numpy as np
 from langchain_core.embeddings import Embeddings
 
+from common.utils.vector_codec import to_float32_array
+
 class Embedder(Embeddings, ABC):
     """
     通用向量化基类，所有具体 embedder 需继承
+
+    embed_documents_array / embed_query_array 返回连续的 float32 数组，批量入库时避免逐元素的 Python float；
+    默认由 embed_documents / embed_query 的结果转换，能直接得到数组的 embedder 应覆盖
     """
     @abstractmethod
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
@@ -12,4 +19,12 @@ class Embedder(Embeddings, ABC):
 
     @abstractmethod
     def embed_query(self, text: str) -> List[float]:
-        pass 
\ No newline at end of file
+        pass
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """返回 (len(texts), dim) 的 float32 数组"""
+        return to_float32_array(self.embed_documents(texts))
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """返回 (dim,) 的 float32 数组"""
+        return np.asarray(self.embed_query(text), dtype=np.float32)
@@ -1,17 +1,29 @@
+import os
+
 from core.model.embedder.base import Embedder
 from .openai import OpenAIEmbedder
 from .ollama import OllamaEmbedder
 from .xinference import XinferenceEmbedder
+from .gateway import GatewayEmbedder
+from .local import LocalEmbedder
+
+# 设置后（如 http://127.0.0.1:8090）所有 embedding 请求经本机网关合并批次后再发往模型服务
+GATEWAY_URL_ENV = "EMBEDDING_GATEWAY_URL"
 
 class EmbedderFactory:
     @staticmethod
     def create(config: dict) -> Embedder:
         embedder_provider = config.get('provider', '').lower()
+        gateway_url = os.getenv(GATEWAY_URL_ENV)
+        if gateway_url and not config.get('direct'):
+            return GatewayEmbedder(config, gateway_url)
         if embedder_provider == 'openai':
             return OpenAIEmbedder(config)
         elif embedder_provider == 'ollama':
             return OllamaEmbedder(config)
         elif embedder_provider == 'xinference':
             return XinferenceEmbedder(config)
+        elif embedder_provider == 'local':
+            return LocalEmbedder(config)
         else:
-            raise ValueError(f"不支持的embedder类型: {embedder_provider}") 
\ No newline at end of file
+            raise ValueError(f"不支持的embedder类型: {embedder_provider}")
@@ -0,0 +1,70 @@
+"""
+本机 embedding 网关的客户端
+
+同一节点上所有 Celery 子进程/线程把 embedding 请求发给本机网关进程（worker.embedding_gateway），
+网关把不同任务的请求在短时间窗口内合并成批次再调用实际的模型服务，结果按请求拆回。
+请求体带上游模型配置，网关按配置区分批次，不同模型/连接的请求不会合并。
+"""
+
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+import requests
+
+from common.utils.vector_codec import decode_float32_base64
+from .base import Embedder
+
+# 转发给网关、用于创建上游 embedder 的配置项
+UPSTREAM_CONFIG_KEYS = ("provider", "model_name", "api_base", "base_url", "api_key", "connection_id", "extra_config")
+
+
+class GatewayEmbedder(Embedder):
+    """
+    Args:
+        config: 上游模型配置（provider 为实际的模型服务商）
+        gateway_url: 网关地址，如 http://127.0.0.1:8090
+        timeout: 单次请求超时（秒），包含网关排队与上游调用的时间
+    """
+
+    def __init__(self, config: Dict[str, Any], gateway_url: str, timeout: float = 300.0):
+        self.model = config.get('model_name')
+        self.upstream = {key: config.get(key) for key in UPSTREAM_CONFIG_KEYS if config.get(key) is not None}
+        self.url = gateway_url.rstrip('/') + '/embed'
+        self.timeout = timeout
+        self._thread_local = threading.local()
+
+    def _get_session(self) -> requests.Session:
+        if not hasattr(self._thread_local, "session"):
+            self._thread_local.session = requests.Session()
+        return self._thread_local.session
+
+    def _embed(self, texts: List[str], flush: bool) -> np.ndarray:
+        # 向量按 base64（float32）传输，避免 JSON 浮点数的编解码
+        response = self._get_session().post(
+            self.url,
+            json={"upstream": self.upstream, "texts": texts, "flush": flush, "encoding": "base64"},
+            timeout=self.timeout
+        )
+        # 4xx/5xx 抛出 HTTPError，状态码与 Retry-After 保留在 response 上，供调用方判断是否重试
+        response.raise_for_status()
+        body = response.json()
+        return decode_float32_base64(body["embeddings"], body["dim"])
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._embed(texts, flush=False)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        # 网关按文档方式调用上游，查询前缀（如 bge 的 query_instruction）在这里加上；检索查询对延迟敏感，不等待合并窗口
+        instruction = (self.upstream.get('extra_config') or {}).get('query_instruction')
+        if instruction:
+            text = instruction + text
+        return self._embed([text], flush=True)[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
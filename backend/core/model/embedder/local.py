@@ -0,0 +1,189 @@
+"""
+本地 CPU embedding（无需单独的模型服务，适用于离线部署）
+
+模型目录需包含 tokenizer.json 与 ONNX 模型（model.onnx 或 onnx/model.onnx），通过 ONNX Runtime 推理；
+目录中没有 ONNX 模型时回退到 sentence-transformers（需另行安装）。
+- 按 token 长度排序后分批，同一批文本长度接近，减少 padding 计算
+- ONNX Runtime 的 intra-op 线程数默认按 CPU 核数在本机的 worker 进程间均分（见 default_num_threads），
+  同一模型的推理串行执行，避免多线程争抢核
+- 模型按进程缓存，每个 worker 进程只加载一次
+
+配置（extra_config）：
+    model_path: 模型目录或 HuggingFace 仓库名（默认取 model_name，仓库需已在本地缓存）
+    pooling: mean | cls，默认 mean
+    normalize: 是否 L2 归一化，默认 True
+    batch_size: 每批条数，默认 32
+    num_threads: 推理线程数，默认取环境变量 LOCAL_EMBEDDING_THREADS，未设置时为 CPU 核数 / WORKER_CONCURRENCY
+    max_length: 单条输入截断长度（token），默认按模型名推断
+    query_instruction: 查询前缀（如 bge 的 "为这个句子生成表示以用于检索相关文章："）
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from common.utils.tokenizer import get_max_input_tokens
+from .base import Embedder
+
+ONNX_MODEL_FILES = ("model.onnx", os.path.join("onnx", "model.onnx"))
+
+# 推理线程数；未设置时按 CPU 核数除以本机 Celery 子进程数（WORKER_CONCURRENCY，与 --concurrency 一致）
+NUM_THREADS_ENV = "LOCAL_EMBEDDING_THREADS"
+PROCESSES_ENV = "WORKER_CONCURRENCY"
+
+_models: Dict[Tuple, "_LocalModel"] = {}
+_models_lock = threading.Lock()
+
+
+def default_num_threads() -> int:
+    """每个进程的推理线程数，prefork 各子进程合计不超过可用核数"""
+    value = os.getenv(NUM_THREADS_ENV)
+    if value:
+        return max(int(value), 1)
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    processes = max(int(os.getenv(PROCESSES_ENV) or 1), 1)
+    return max(cores // processes, 1)
+
+
+def _resolve_model_dir(model_path: str) -> str:
+    if os.path.isdir(model_path):
+        return model_path
+    # 不是本地目录时按 HuggingFace 仓库名在本地缓存中查找，不访问网络
+    from huggingface_hub import snapshot_download
+    return snapshot_download(model_path, local_files_only=True)
+
+
+class _LocalModel:
+    """进程内共享的模型实例，同一模型的推理串行执行"""
+
+    def __init__(self, model_dir: str, pooling: str, num_threads: int, max_length: int):
+        self.pooling = pooling
+        self.max_length = max_length
+        self._lock = threading.Lock()
+        self._session = None
+        self._st_model = None
+        onnx_file = next(
+            (os.path.join(model_dir, f) for f in ONNX_MODEL_FILES if os.path.isfile(os.path.join(model_dir, f))),
+            None
+        )
+        if onnx_file is not None:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(onnx_file, sess_options=options, providers=["CPUExecutionProvider"])
+            self._input_names = {i.name for i in self._session.get_inputs()}
+            self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+            self.tokenizer.enable_truncation(max_length)
+            self.tokenizer.no_padding()
+            pad_token = next((t for t in ("[PAD]", "<pad>") if self.tokenizer.token_to_id(t) is not None), None)
+            self._pad_id = self.tokenizer.token_to_id(pad_token) if pad_token else 0
+        else:
+            from sentence_transformers import SentenceTransformer
+            import torch
+
+            torch.set_num_threads(num_threads)
+            self._st_model = SentenceTransformer(model_dir, device="cpu")
+            self._st_model.max_seq_length = max_length
+        logger.info(
+            f"本地 embedding 模型已加载: {model_dir}, 后端={'onnxruntime' if self._session else 'sentence-transformers'}, "
+            f"线程数={num_threads}"
+        )
+
+    def embed(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """按 token 长度排序后分批推理，返回与输入顺序一致的 (n, dim) float32 向量"""
+        if self._session is None:
+            # sentence-transformers 内部已按长度排序分批
+            with self._lock:
+                return self._st_model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype(np.float32)
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        vectors: Optional[np.ndarray] = None
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = self._run([encodings[i] for i in indices])
+            if vectors is None:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[indices] = batch
+        return vectors
+
+    def _run(self, encodings) -> np.ndarray:
+        # 只补齐到批内最长的输入
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.full((len(encodings), width), self._pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), width), dtype=np.int64)
+        token_type_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, e in enumerate(encodings):
+            n = len(e.ids)
+            input_ids[row, :n] = e.ids
+            attention_mask[row, :n] = 1
+            token_type_ids[row, :n] = e.type_ids
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+        with self._lock:
+            output = self._session.run(None, {k: v for k, v in inputs.items() if k in self._input_names})[0]
+        if output.ndim == 2:
+            # 模型已包含池化层，直接输出句向量
+            return output.astype(np.float32)
+        if self.pooling == "cls":
+            return output[:, 0].astype(np.float32)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return ((output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+
+def _get_model(model_path: str, pooling: str, num_threads: int, max_length: int) -> _LocalModel:
+    key = (model_path, pooling, num_threads, max_length)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _LocalModel(_resolve_model_dir(model_path), pooling, num_threads, max_length)
+            _models[key] = model
+        return model
+
+
+class LocalEmbedder(Embedder):
+    def __init__(self, config: Dict[str, Any]):
+        extra_config = config.get('extra_config') or {}
+        self.model = config.get('model_name')
+        self.model_path = extra_config.get('model_path') or self.model
+        self.pooling = extra_config.get('pooling', 'mean')
+        self.normalize = extra_config.get('normalize', True)
+        self.batch_size = int(extra_config.get('batch_size', 32))
+        self.num_threads = int(extra_config.get('num_threads') or default_num_threads())
+        self.max_length = int(extra_config.get('max_length') or get_max_input_tokens(self.model))
+        self.query_instruction: Optional[str] = extra_config.get('query_instruction')
+        self._model: Optional[_LocalModel] = None
+
+    def _get_model(self) -> _LocalModel:
+        # 首次调用时加载，Celery prefork 下各子进程分别加载一次
+        if self._model is None:
+            self._model = _get_model(self.model_path, self.pooling, self.num_threads, self.max_length)
+        return self._model
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self._get_model().embed(texts, self.batch_size)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._encode(texts)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        if self.query_instruction:
+            text = self.query_instruction + text
+        return self._encode([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
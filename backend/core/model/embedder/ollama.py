@@ -1,23 +1,33 @@
 from .base import Embedder
-from langchain_ollama import OllamaEmbeddings
 from typing import List, Dict, Any
-import threading
+
+import numpy as np
+
+from core.model.transport import get_http_client, request_timeout
 
 class OllamaEmbedder(Embedder):
+    """调用 Ollama 的 /api/embed 接口，同一 Connection 在进程内共用连接池"""
+
     def __init__(self, config: Dict[str, Any]):
         self.model = config.get('model_name', 'bge-small')
-        self.base_url = config.get('base_url', 'http://localhost:11434')
-        self._thread_local = threading.local()
+        self.base_url = (config.get('base_url') or config.get('api_base') or 'http://localhost:11434').rstrip('/')
+        self.client = get_http_client(config)
+        self.timeout = request_timeout(config)
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        response = self.client.post(
+            f"{self.base_url}/api/embed", json={"model": self.model, "input": texts}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
 
-    def _get_client(self):
-        if not hasattr(self._thread_local, "client"):
-            self._thread_local.client = OllamaEmbeddings(model=self.model, base_url=self.base_url)
-        return self._thread_local.client
+    def embed_query_array(self, text: str) -> np.ndarray:
+        return self.embed_documents_array([text])[0]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        client = self._get_client()
-        return client.embed_documents(texts)
+        return self.embed_documents_array(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        client = self._get_client()
-        return client.embed_query(text) 
\ No newline at end of file
+        return self.embed_query_array(text).tolist()
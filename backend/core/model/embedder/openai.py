@@ -1,19 +1,75 @@
+"""
+OpenAI 兼容接口的 embedder
+
+- 请求 encoding_format=base64，响应中的向量直接解码为 float32 数组，不解析 JSON 浮点数
+  （服务端不支持 base64 而返回浮点数组时自动兼容）
+- 同一 Connection 在进程内共用一个 HTTP 连接池（core.model.transport）
+- extra_config.dimensions：text-embedding-3 等模型的缩短维度
+- extra_config.max_retries：openai 客户端自身的重试次数，默认 2；worker 入库时设为 0，由自适应并发统一退避重试
+- extra_config.max_input_tokens：单条输入 token 上限，默认按模型名推断；超长的查询截断到上限
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from openai import OpenAI
+
+from common.utils.tokenizer import get_max_input_tokens, truncate_to_tokens
+from common.utils.vector_codec import decode_float32_base64
+from core.model.transport import get_http_client, request_timeout
 from .base import Embedder
-from langchain_openai import OpenAIEmbeddings
-from typing import List, Dict, Any
+
+# OpenAI 单次请求的最大输入条数
+MAX_INPUTS_PER_REQUEST = 2048
+
 
 class OpenAIEmbedder(Embedder):
     def __init__(self, config: Dict[str, Any]):
+        extra_config = config.get('extra_config') or {}
         self.model = config.get('model_name', 'text-embedding-ada-002')
         self.api_key = config.get('api_key')
-        self.base_url = config.get('base_url')
-        kwargs = {}
-        if self.base_url:
-            kwargs['base_url'] = self.base_url
-        self.client = OpenAIEmbeddings(model=self.model, openai_api_key=self.api_key, **kwargs)
+        self.base_url = config.get('base_url') or config.get('api_base')
+        self.dimensions: Optional[int] = extra_config.get('dimensions') or config.get('dimensions')
+        self.encoding_format = extra_config.get('encoding_format', 'base64')
+        self.max_input_tokens = int(extra_config.get('max_input_tokens') or get_max_input_tokens(self.model))
+        self.client = OpenAI(
+            api_key=self.api_key or "EMPTY",
+            base_url=self.base_url or None,
+            http_client=get_http_client(config),
+            timeout=request_timeout(config),
+            max_retries=int(extra_config.get('max_retries', 2))
+        )
+
+    def _create(self, texts: List[str]) -> np.ndarray:
+        kwargs: Dict[str, Any] = {"model": self.model, "input": texts, "encoding_format": self.encoding_format}
+        if self.dimensions:
+            kwargs["dimensions"] = int(self.dimensions)
+        response = self.client.embeddings.create(**kwargs)
+        data = sorted(response.data, key=lambda item: item.index)
+        if len(data) != len(texts):
+            raise ValueError(f"embedding 返回条数 {len(data)} 与输入条数 {len(texts)} 不一致")
+        vectors = [
+            decode_float32_base64(item.embedding) if isinstance(item.embedding, str) else item.embedding
+            for item in data
+        ]
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if len(texts) <= MAX_INPUTS_PER_REQUEST:
+            return self._create(texts)
+        return np.concatenate([
+            self._create(texts[start:start + MAX_INPUTS_PER_REQUEST])
+            for start in range(0, len(texts), MAX_INPUTS_PER_REQUEST)
+        ])
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        # 检索查询未经切块，超过模型上限时服务端直接报错，这里截断
+        return self._create([truncate_to_tokens(text, self.max_input_tokens, self.model)])[0]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return self.client.embed_documents(texts)
+        return self.embed_documents_array(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        return self.client.embed_query(text) 
\ No newline at end of file
+        return self.embed_query_array(text).tolist()
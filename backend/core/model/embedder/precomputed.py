@@ -0,0 +1,66 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from core.model.embedder.base import Embedder
+
+
+class PrecomputedEmbedder(Embedder):
+    """
+    供向量库使用的 embedder：已登记向量的文本直接返回登记的向量，其余委托给实际的 embedder
+
+    向量库只提供 add_texts（在内部调用 embedder）时，调用方先在自己的重试范围内计算向量，
+    再在 precomputed 上下文中写入，写入不会再次请求 embedding 服务。
+    登记按整批文本匹配，各线程可同时登记不同批次。
+
+    Args:
+        embedder: 实际的 embedder
+    """
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._vectors: Dict[Tuple[str, ...], List] = {}
+
+    @contextmanager
+    def precomputed(self, texts: List[str], embeddings: np.ndarray):
+        """上下文内 embed_documents(texts) 返回 embeddings"""
+        key = tuple(texts)
+        with self._lock:
+            entry = self._vectors.setdefault(key, [embeddings, 0])
+            entry[1] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._vectors.pop(key, None)
+
+    def _lookup(self, texts: List[str]):
+        with self._lock:
+            entry = self._vectors.get(tuple(texts))
+        return None if entry is None else entry[0]
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        embeddings = self._lookup(texts)
+        if embeddings is not None:
+            return embeddings
+        return self.embedder.embed_documents_array(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self._lookup(texts)
+        if embeddings is not None:
+            return embeddings.tolist()
+        return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedder.embed_query(text)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        return self.embedder.embed_query_array(text)
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
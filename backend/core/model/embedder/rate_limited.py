@@ -0,0 +1,69 @@
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from core.model.embedder.base import Embedder
+from common.utils.rate_limiter import RedisTokenBucket, PRIORITY_BACKGROUND
+from common.utils.tokenizer import estimate_tokens
+
+
+class RateLimitedEmbedder(Embedder):
+    """
+    每次 embedding 请求前从 Connection 的共享令牌桶取令牌（1 个请求 + 输入的 token 数）
+
+    调用方也可先调用 acquire 取令牌（如在占用并发名额之前等待限流），当前线程的下一次请求不再重复取
+
+    Args:
+        embedder: 实际的 embedder
+        limiter: Connection 的令牌桶
+        priority: interactive（检索查询）| background（入库）
+        count_tokens: token 计数函数，默认按估算
+        timeout: 最长等待秒数，None 为一直等待
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        limiter: RedisTokenBucket,
+        priority: str = PRIORITY_BACKGROUND,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        timeout: Optional[float] = None
+    ):
+        self.embedder = embedder
+        self.limiter = limiter
+        self.priority = priority
+        self.count_tokens = count_tokens
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def acquire(self, texts: List[str]) -> None:
+        """为当前线程的下一次请求提前取令牌"""
+        if not getattr(self._local, "prepaid", False):
+            self.limiter.acquire(sum(self.count_tokens(t) for t in texts), self.priority, self.timeout)
+            self._local.prepaid = True
+
+    def _acquire(self, texts: List[str]) -> None:
+        if getattr(self._local, "prepaid", False):
+            self._local.prepaid = False
+            return
+        self.limiter.acquire(sum(self.count_tokens(t) for t in texts), self.priority, self.timeout)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._acquire(texts)
+        return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._acquire([text])
+        return self.embedder.embed_query(text)
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        self._acquire(texts)
+        return self.embedder.embed_documents_array(texts)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        self._acquire([text])
+        return self.embedder.embed_query_array(text)
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
@@ -1,15 +1,15 @@
-from .base import Embedder
-from langchain_community.embeddings import XinferenceEmbeddings
-from typing import List, Dict, Any
+from .openai import OpenAIEmbedder
+from typing import Dict, Any
 
-class XinferenceEmbedder(Embedder):
-    def __init__(self, config: Dict[str, Any]):
-        self.model = config.get('model_name', 'bge-small')
-        self.base_url = config.get('base_url', 'http://localhost:9997')
-        self.client = XinferenceEmbeddings(model=self.model, server_url=self.base_url)
-
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return self.client.embed_documents(texts)
+class XinferenceEmbedder(OpenAIEmbedder):
+    """通过 Xinference 的 OpenAI 兼容接口（/v1/embeddings）调用，model_name 为模型 UID"""
 
-    def embed_query(self, text: str) -> List[float]:
-        return self.client.embed_query(text) 
\ No newline at end of file
+    def __init__(self, config: Dict[str, Any]):
+        server_url = (config.get('base_url') or config.get('api_base') or 'http://localhost:9997').rstrip('/')
+        extra_config = {'encoding_format': 'float', **(config.get('extra_config') or {})}
+        super().__init__(dict(
+            config,
+            model_name=config.get('model_name', 'bge-small'),
+            base_url=server_url if server_url.endswith('/v1') else f"{server_url}/v1",
+            extra_config=extra_config
+        ))
@@ -1,4 +1,4 @@
-from core.llm.base import LLM
+from core.model.llm.base import LLM
 from .openai import OpenAILLM
 from .ollama import OllamaLLM
 from .xinference import XinferenceLLM
@@ -1,4 +1,4 @@
-from core.llm.base import LLM
+from core.model.llm.base import LLM
 from langchain_community.llms import Ollama
 from typing import Any, List
 
@@ -1,4 +1,5 @@
-from core.llm.base import LLM
+from core.model.llm.base import LLM
+from core.model.transport import get_http_client, request_timeout
 from langchain_openai import ChatOpenAI
 from typing import Any, List
 
@@ -6,10 +7,13 @@ class OpenAILLM(LLM):
     def __init__(self, config: dict):
         self.model = ChatOpenAI(
             api_key=config.get('api_key'),
-            model=config.get('model', 'gpt-3.5-turbo'),
+            model=config.get('model') or config.get('model_name', 'gpt-3.5-turbo'),
             temperature=config.get('temperature', 0.7),
-            base_url=config.get('base_url')
+            base_url=config.get('base_url') or config.get('api_base'),
+            # 同一 Connection 在进程内共用连接池
+            http_client=get_http_client(config),
+            timeout=request_timeout(config)
         )
 
     def invoke(self, messages: List[Any], **kwargs) -> Any:
-        return self.model.invoke(messages, **kwargs) 
\ No newline at end of file
+        return self.model.invoke(messages, **kwargs)
@@ -0,0 +1,78 @@
+"""
+模型服务的进程级 HTTP 传输层
+
+embedder、LLM、视觉模型对同一 Connection 的同步请求共用一个 httpx 连接池（按进程缓存），
+TCP/TLS 握手每个进程只付一次，跨分块、跨任务复用 keep-alive 连接；HTTPS 且安装了 h2 时启用 HTTP/2。
+Celery prefork 子进程不会继承父进程的连接（按 pid 区分缓存）。
+
+连接池参数可在模型配置的 extra_config 中覆盖：
+    http_max_connections: 最大连接数，默认 64
+    http_max_keepalive: 最大空闲 keep-alive 连接数，默认 16
+    http_keepalive_expiry: 空闲连接保留秒数，默认 60
+    http2: 是否尝试 HTTP/2，默认 True
+    connect_timeout: 建连超时秒数，默认 10
+    timeout: 单次请求超时秒数（读/写/等待连接池），默认 60，各客户端按请求传入
+"""
+
+import hashlib
+import importlib.util
+import os
+import threading
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_MAX_KEEPALIVE = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_TIMEOUT = 60.0
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients: Dict[Tuple, httpx.Client] = {}
+_lock = threading.Lock()
+
+
+def connection_key(config: Dict[str, Any]) -> str:
+    """连接标识：有 connection_id 时按 Connection 区分，否则按服务地址（协议+主机+端口）与 api_key 区分"""
+    if config.get('connection_id') is not None:
+        return f"conn:{config['connection_id']}"
+    base_url = config.get('base_url') or config.get('api_base') or ""
+    parts = urlsplit(base_url)
+    origin = f"{parts.scheme}://{parts.netloc}" if parts.netloc else base_url
+    key_hash = hashlib.sha256((config.get('api_key') or "").encode()).hexdigest()[:16]
+    return f"{origin}|{key_hash}"
+
+
+def request_timeout(config: Dict[str, Any]) -> httpx.Timeout:
+    """单次请求的超时设置"""
+    extra_config = config.get('extra_config') or {}
+    timeout = float(extra_config.get('timeout') or config.get('timeout') or DEFAULT_TIMEOUT)
+    return httpx.Timeout(timeout, connect=float(extra_config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT)))
+
+
+def _client_options(config: Dict[str, Any]) -> Tuple[Tuple, Dict[str, Any]]:
+    extra_config = config.get('extra_config') or {}
+    limits = httpx.Limits(
+        max_connections=int(extra_config.get('http_max_connections', DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(extra_config.get('http_max_keepalive', DEFAULT_MAX_KEEPALIVE)),
+        keepalive_expiry=float(extra_config.get('http_keepalive_expiry', DEFAULT_KEEPALIVE_EXPIRY))
+    )
+    http2 = bool(extra_config.get('http2', True)) and HTTP2_AVAILABLE
+    key = (os.getpid(), connection_key(config))
+    return key, {"limits": limits, "http2": http2, "timeout": request_timeout(config)}
+
+
+def get_http_client(config: Dict[str, Any]) -> httpx.Client:
+    """同一进程内同一 Connection 共用的同步客户端（连接池参数取首次创建时的配置）"""
+    key, options = _client_options(config)
+    with _lock:
+        client = _clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(**options)
+            _clients[key] = client
+            logger.debug(f"创建模型服务连接池: {key[1]}, http2={options['http2']}, limits={options['limits']}")
+        return client
@@ -1,4 +1,5 @@
 from core.model.vision.base import VisionModel
+from core.model.transport import get_http_client, request_timeout
 from langchain_openai import ChatOpenAI
 from typing import Any, List
 
@@ -6,10 +7,13 @@ class OpenAIVisionModel(VisionModel):
     def __init__(self, config: dict):
         self.model = ChatOpenAI(
             api_key=config.get('api_key'),
-            model=config.get('model_name', 'gpt-4-vision-preview'),
+            model=config.get('model_name') or config.get('model', 'gpt-4-vision-preview'),
             temperature=config.get('temperature', 0.7),
-            base_url=config.get('api_base')
+            base_url=config.get('api_base') or config.get('base_url'),
+            # 同一 Connection 在进程内共用连接池（解析文档时每张图片一次请求）
+            http_client=get_http_client(config),
+            timeout=request_timeout(config)
         )
 
     def invoke(self, messages: List[Any], **kwargs) -> Any:
-        return self.model.invoke(messages, **kwargs) 
\ No newline at end of file
+        return self.model.invoke(messages, **kwargs)
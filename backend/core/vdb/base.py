@@ -4,6 +4,7 @@ from langchain_core.vectorstores import VectorStore
 from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
 from common.schemas.worker import VectorDBCollectionConfig
+from common.utils.vector_codec import Vectors
 
 class VectorDB(VectorStore, ABC):
     def __init__(self, embedding_function: Embeddings, config: VectorDBCollectionConfig):
@@ -69,6 +70,14 @@ class VectorDB(VectorStore, ABC):
     def delete(self, ids: List[str]) -> None:
         raise NotImplementedError("delete not supported for this VDB")
 
+    def add_embeddings(self, texts: List[str], embeddings: Vectors, metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """写入已计算好的向量（List[List[float]] 或 (n, dim) float32 数组），不调用 embedding 模型"""
+        raise NotImplementedError("add_embeddings not supported for this VDB")
+
+    def get_chunks_with_embeddings(self, where: Dict[str, Any]) -> Dict[str, list]:
+        """按元数据条件获取分块，返回 {'documents': [...], 'metadatas': [...], 'embeddings': (n, dim) float32 数组}"""
+        raise NotImplementedError("get_chunks_with_embeddings not supported for this VDB")
+
     def as_retriever(self, **kwargs):
         raise NotImplementedError("as_retriever not supported for this VDB")
     
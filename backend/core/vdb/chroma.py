@@ -3,8 +3,10 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
 from .base import VectorDB
 from common.schemas.worker import VectorDBCollectionConfig
+from common.utils.vector_codec import Vectors, to_float32_array
 from typing import List, Dict, Any, Optional
 from loguru import logger
+import uuid
 
 class ChromaVectorDB(VectorDB):
     def __init__(self, embedding_function: Embeddings, config: VectorDBCollectionConfig):
@@ -66,6 +68,7 @@ class ChromaVectorDB(VectorDB):
         return {
             "add_documents": True,
             "add_texts": True,
+            "add_embeddings": True,
             "similarity_search": True,
             "similarity_search_with_score": True,
             "delete": True,
@@ -85,6 +88,21 @@ class ChromaVectorDB(VectorDB):
     def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
         return self._client.add_texts(texts, metadatas=metadatas)
 
+    def add_embeddings(self, texts: List[str], embeddings: Vectors, metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        ids = [str(uuid.uuid4()) for _ in texts]
+        # chromadb 直接接受 float32 数组，不逐元素转换
+        self._client._collection.upsert(ids=ids, embeddings=to_float32_array(embeddings), documents=texts, metadatas=metadatas)
+        return ids
+
+    def get_chunks_with_embeddings(self, where: Dict[str, Any]) -> Dict[str, list]:
+        result = self._client.get(where=where, include=["documents", "metadatas", "embeddings"])
+        embeddings = result.get("embeddings")
+        return {
+            "documents": list(result.get("documents") or []),
+            "metadatas": list(result.get("metadatas") or []),
+            "embeddings": to_float32_array(embeddings if embeddings is not None else [])
+        }
+
     def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
         return self._client.similarity_search(query, k=k, **kwargs)
 
@@ -2,12 +2,14 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
 from .base import VectorDB
 from common.schemas.worker import VectorDBCollectionConfig
+from common.utils.vector_codec import Vectors, to_float32_array
 from typing import List, Dict, Any, Optional
 from langchain_postgres.v2.engine import PGEngine
 from langchain_postgres.v2.vectorstores import PGVectorStore
 from langchain_postgres import Column
 import logging
 import asyncpg
+import numpy as np
 
 
 class PostgreSQLVectorDB(VectorDB):
@@ -120,6 +122,7 @@ class PostgreSQLVectorDB(VectorDB):
         return {
             "add_documents": True,
             "add_texts": True,
+            "add_embeddings": True,
             "similarity_search": True,
             "similarity_search_with_score": True,
             "delete": True,
@@ -145,6 +148,16 @@ class PostgreSQLVectorDB(VectorDB):
         """
         return self._client.add_texts(texts, metadatas=metadatas)
 
+    def add_embeddings(self, texts: List[str], embeddings: Vectors, metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """
+        Add texts with precomputed embeddings (the embedding service is not called).
+        float32 arrays are converted with a single tolist() call, since PGVectorStore
+        formats every vector as a text literal anyway.
+        """
+        if isinstance(embeddings, np.ndarray):
+            embeddings = embeddings.tolist()
+        return self._client.add_embeddings(texts, embeddings, metadatas=metadatas)
+
     def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
         """
         Perform a similarity search for the given query.
@@ -217,6 +230,31 @@ class PostgreSQLVectorDB(VectorDB):
                     metadatas.append(row['metadata'])
         return {"documents": documents, "metadatas": metadatas}
 
+    def get_chunks_with_embeddings(self, where: Dict[str, Any]) -> Dict[str, list]:
+        """
+        Like get(), but also returns the stored embeddings as an (n, dim) float32 array.
+        """
+        import psycopg
+        from psycopg.rows import dict_row
+        conn_str = self._connection_string.replace('postgresql+psycopg://', 'postgresql://')
+        table = self._collection_name
+        filter_sql = ""
+        params = []
+        if where and 'doc_id' in where:
+            filter_sql = "WHERE (metadata->>'doc_id')::text = %s"
+            params.append(str(where['doc_id']))
+        sql = f"SELECT content, metadata, embedding::text AS embedding FROM {table} {filter_sql} ORDER BY (metadata->>'chunk_id')::int ASC"
+        documents, metadatas, embeddings = [], [], []
+        with psycopg.connect(conn_str, row_factory=dict_row) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                for row in cur.fetchall():
+                    documents.append(row['content'])
+                    metadatas.append(row['metadata'])
+                    # pgvector text format is "[x,y,...]"; parse it straight into float32
+                    embeddings.append(np.fromstring(row['embedding'][1:-1], dtype=np.float32, sep=','))
+        return {"documents": documents, "metadatas": metadatas, "embeddings": to_float32_array(embeddings)}
+
     @classmethod
     def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
         """
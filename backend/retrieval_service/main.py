@@ -1,7 +1,9 @@
 from fastapi import FastAPI, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any, Dict, Union
+from typing import List, Optional, Any, Dict, Union, Literal, Iterator
 import json
+import numpy as np
 
 from common.db.session import SessionLocal
 from common.db.models import KnowledgeBase, VDBCollection, VDB, Model
@@ -11,10 +13,60 @@ from core.vdb.factory import VectorDBFactory
 from core.model.embedder.factory import EmbedderFactory
 from common.schemas.worker import VectorDBCollectionConfig
 from common.utils.redis_client import get_key, set_key
+from common.core.config import config
+from common.core.tracing import TracingMiddleware, metrics_response, outbound_span
+from core.model.embedder.base import Embedder
+from core.model.embedder.rate_limited import RateLimitedEmbedder
+from common.utils.rate_limiter import get_connection_limiter, RateLimitExceeded, PRIORITY_INTERACTIVE
+from common.utils.vector_codec import decode_float32_base64
 
 from loguru import logger
 
 app = FastAPI(title="Retrieval Service API")
+app.add_middleware(TracingMiddleware, service="retrieval", slow_request_ms=config.tracing.get('slow_request_ms', 1000))
+
+
+class _TracedEmbedder(Embedder):
+    """记录 embedding 调用耗时（outbound: embedding），向量库内部调用时同样生效"""
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with outbound_span("embedding"):
+            return self.embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with outbound_span("embedding"):
+            return self.embedder.embed_query(text)
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        with outbound_span("embedding"):
+            return self.embedder.embed_documents_array(texts)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        with outbound_span("embedding"):
+            return self.embedder.embed_query_array(text)
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
+
+
+class _QueryVectorEmbedder(Embedder):
+    """请求已带查询向量时使用：embed_query 直接返回该向量，不调用 embedding 模型"""
+
+    def __init__(self, vector: np.ndarray):
+        self.vector = vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError("按向量检索时不支持 embed_documents")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vector.tolist()
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        return self.vector
+
 
 # 响应体统一格式
 class ResponseModel(BaseModel):
@@ -25,8 +77,10 @@ class ResponseModel(BaseModel):
 # 检索请求参数
 class RetrieveRequest(BaseModel):
     knowledge_base_id: int = Field(..., description="知识库ID")
-    query: Union[str, List[float]] = Field(..., description="检索内容（文本或向量）")
+    query: Optional[Union[str, List[float]]] = Field(None, description="检索内容（文本或向量）")
+    query_vector: Optional[str] = Field(None, description="base64 编码的查询向量（小端 float32），提供时不调用 embedding 模型")
     top_k: Optional[int] = Field(5, description="返回前K条，默认5，最大2000")
+    stream: Optional[Literal["ndjson", "sse"]] = Field(None, description="流式返回格式：ndjson 或 sse，不传则一次性返回")
 
 # 知识库列表接口
 @app.get("/api/v1/kbs", response_model=ListResponse[KnowledgeBaseOut])
@@ -48,82 +102,177 @@ def list_knowledge_bases():
     finally:
         db.close()
 
+def _load_retrieval_config(knowledge_base_id: int):
+    """
+    获取知识库的向量库与 embedding 配置，优先读取 Redis 缓存。
+    返回 (vdb_config, embedder_config, config_source, error)，error 不为空时为 BaseResponse。
+    """
+    vdb_cache_key = f"vdb:kb:{knowledge_base_id}"
+    vdb_cache = get_key(vdb_cache_key)
+    if vdb_cache:
+        try:
+            vdb_info = json.loads(vdb_cache)
+            return VectorDBCollectionConfig(**vdb_info["vdb_config"]), vdb_info["embedder_config"], "redis", None
+        except Exception:
+            pass
+    db = SessionLocal()
+    try:
+        kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == knowledge_base_id).first()
+        if not kb:
+            return None, None, None, BaseResponse(code=404, message="知识库不存在", data=None)
+        collection = db.query(VDBCollection).filter(VDBCollection.id == kb.collection_id).first()
+        if not collection:
+            return None, None, None, BaseResponse(code=404, message="知识库未绑定有效的向量集合", data=None)
+        vdb = db.query(VDB).filter(VDB.id == collection.vdb_id).first()
+        if not vdb:
+            return None, None, None, BaseResponse(code=404, message="向量数据库不存在", data=None)
+        vdb_config = VectorDBCollectionConfig(
+            collection_name=collection.name,
+            type=vdb.type,
+            connection_config=vdb.connection_config,
+            embedding_dimension=vdb.embedding_dimension,
+            index_type=vdb.index_type
+        )
+        model = db.query(Model).filter(Model.id == kb.embedding_model_id).first()
+        if not model:
+            return None, None, None, BaseResponse(code=404, message="知识库未配置embedding模型", data=None)
+        extra_config = model.extra_config_dict
+        embedder_config = {
+            "provider": model.connection.provider if model.connection else None,
+            "model_name": model.model_name,
+            "api_key": vdb.connection_config.get("api_key"),
+            "base_url": vdb.connection_config.get("base_url"),
+            "connection_id": model.connection_id,
+            # 与入库时相同的模型参数（dimensions、query_instruction 等），查询向量与文档向量一致
+            "extra_config": extra_config,
+            # 知识库文档向量的实际维度（模型缩短维度时以 dimensions 为准），校验请求带的查询向量
+            "embedding_dim": extra_config.get("dimensions") or model.embedding_dim,
+            "rate_limit_rpm": model.connection.rate_limit_rpm if model.connection else None,
+            "rate_limit_tpm": model.connection.rate_limit_tpm if model.connection else None
+        }
+        knowledge_base = {
+            "id": kb.id,
+            "name": kb.name,
+            "description": kb.description,
+            "collection_id": kb.collection_id,
+        }
+        set_key(vdb_cache_key, json.dumps({
+            "vdb_config": vdb_config.model_dump(),
+            "embedder_config": embedder_config,
+            "knowledge_base": knowledge_base
+        }), ex=60)
+        return vdb_config, embedder_config, "database", None
+    finally:
+        db.close()
+
+def _create_embedder(embedder_config: Dict[str, Any]) -> Embedder:
+    """创建 embedder；连接配置了限流预算时按交互优先级从共享令牌桶取令牌"""
+    embedder = EmbedderFactory.create(embedder_config)
+    limiter = get_connection_limiter(
+        embedder_config.get("connection_id"),
+        embedder_config.get("rate_limit_rpm"),
+        embedder_config.get("rate_limit_tpm")
+    )
+    if limiter is None:
+        return embedder
+    return RateLimitedEmbedder(
+        embedder, limiter,
+        priority=PRIORITY_INTERACTIVE,
+        timeout=config.rate_limit.get('interactive_timeout_s', 10)
+    )
+
+def _parse_query_vector(req: RetrieveRequest) -> Optional[np.ndarray]:
+    """请求中的查询向量（query_vector 优先，其次是向量形式的 query），文本查询返回 None"""
+    if req.query_vector is not None:
+        return decode_float32_base64(req.query_vector)
+    if isinstance(req.query, list):
+        return np.asarray(req.query, dtype=np.float32)
+    return None
+
+def _iter_results(docs: list) -> Iterator[Dict[str, Any]]:
+    """
+    按分数顺序逐条转换检索结果，转换后即释放对应的 Document，
+    避免同时持有 Document 列表和完整的结果列表。
+    """
+    docs.reverse()
+    while docs:
+        doc = docs.pop()
+        yield {
+            "content": getattr(doc[0], 'page_content', None) or getattr(doc, 'content', None),
+            "score": doc[1],
+            "metadata": getattr(doc[0], 'metadata', {})
+        }
+
+def _stream_results(docs: list, stream_format: str) -> Iterator[str]:
+    """
+    将检索结果编码为 NDJSON 行或 SSE 事件，逐条输出。
+    结束时输出一条 done 记录，异常时输出 error 记录。
+    """
+    def encode(event: str, payload: Dict[str, Any]) -> str:
+        data = json.dumps(payload, ensure_ascii=False, default=str)
+        if stream_format == "sse":
+            return f"event: {event}\ndata: {data}\n\n"
+        return data + "\n"
+
+    count = 0
+    try:
+        for item in _iter_results(docs):
+            count += 1
+            yield encode("result", item)
+        yield encode("done", {"done": True, "count": count})
+    except Exception as e:
+        logger.error(f"流式检索输出异常: {e}")
+        yield encode("error", {"error": f"检索异常: {str(e)}"})
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 # 检索接口
 @app.post("/api/v1/retrieve", response_model=BaseResponse)
 def retrieve_documents(req: RetrieveRequest = Body(...)):
     top_k = req.top_k or 5
     if top_k > 2000:
         return BaseResponse(code=400, message="top_k 最大为2000", data=None)
-    if req.query is None:
+    if req.query is None and req.query_vector is None:
         return BaseResponse(code=400, message="query必须提供（文本或向量）", data=None)
-    vdb_cache_key = f"vdb:kb:{req.knowledge_base_id}"
-    vdb_cache = get_key(vdb_cache_key)
-    vdb_config = None
-    embedder_config = None
-    config_source = None
-    if vdb_cache:
-        try:
-            vdb_info = json.loads(vdb_cache)
-            vdb_config = VectorDBCollectionConfig(**vdb_info["vdb_config"])
-            embedder_config = vdb_info["embedder_config"]
-            config_source = "redis"
-        except Exception:
-            vdb_cache = None
-    else:
-        db = SessionLocal()
-        try:
-            kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == req.knowledge_base_id).first()
-            if not kb:
-                return BaseResponse(code=404, message="知识库不存在", data=None)
-            collection = db.query(VDBCollection).filter(VDBCollection.id == kb.collection_id).first()
-            if not collection:
-                return BaseResponse(code=404, message="知识库未绑定有效的向量集合", data=None)
-            vdb = db.query(VDB).filter(VDB.id == collection.vdb_id).first()
-            if not vdb:
-                return BaseResponse(code=404, message="向量数据库不存在", data=None)
-            vdb_config = VectorDBCollectionConfig(
-                collection_name=collection.name,
-                type=vdb.type,
-                connection_config=vdb.connection_config,
-                embedding_dimension=vdb.embedding_dimension,
-                index_type=vdb.index_type
-            )
-            model = db.query(Model).filter(Model.id == kb.embedding_model_id).first()
-            if not model:
-                return BaseResponse(code=404, message="知识库未配置embedding模型", data=None)
-            embedder_config = {
-                "provider": model.connection.provider if model.connection else None,
-                "model_name": model.model_name,
-                "api_key": vdb.connection_config.get("api_key"),
-                "base_url": vdb.connection_config.get("base_url")
-            }
-            knowledge_base = {
-                "id": kb.id,
-                "name": kb.name,
-                "description": kb.description,
-                "collection_id": kb.collection_id,
-            }
-            set_key(vdb_cache_key, json.dumps({
-                "vdb_config": vdb_config.model_dump(),
-                "embedder_config": embedder_config,
-                "knowledge_base": knowledge_base
-            }), ex=60)
-            config_source = "database"
-        finally:
-            db.close()
+    try:
+        query_vector = _parse_query_vector(req)
+    except ValueError as e:
+        return BaseResponse(code=400, message=f"查询向量无效: {e}", data=None)
+    vdb_config, embedder_config, config_source, error = _load_retrieval_config(req.knowledge_base_id)
+    if error is not None:
+        return error
+    expected_dim = embedder_config.get("embedding_dim")
+    if query_vector is not None and expected_dim and query_vector.size != int(expected_dim):
+        return BaseResponse(
+            code=400, message=f"查询向量维度 {query_vector.size} 与知识库 embedding 模型维度 {expected_dim} 不一致", data=None
+        )
     logger.debug(f"检索配置来源: {config_source}, vdb_config: {vdb_config}, embedder_config: {embedder_config}")
     try:
-        embedder = EmbedderFactory.create(embedder_config)
+        if query_vector is not None:
+            embedder = _QueryVectorEmbedder(query_vector)
+        else:
+            embedder = _TracedEmbedder(_create_embedder(embedder_config))
         vectordb = VectorDBFactory.create_vector_db(vdb_config, embedder)
         vectordb.sync_connect()
-        docs = vectordb.similarity_search_with_relevance_scores(req.query, k=top_k)
-        results = []
-        for doc in docs:
-            results.append({
-                "content": getattr(doc[0], 'page_content', None) or getattr(doc, 'content', None),
-                "score": doc[1],
-                "metadata": getattr(doc[0], 'metadata', {})
-            })
+        with outbound_span("vector_db"):
+            docs = vectordb.similarity_search_with_relevance_scores(req.query if isinstance(req.query, str) else "", k=top_k)
+        if req.stream:
+            return StreamingResponse(
+                _stream_results(docs, req.stream),
+                media_type=STREAM_MEDIA_TYPES[req.stream],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        results = list(_iter_results(docs))
         return BaseResponse(data=results, code=200, message="success")
+    except RateLimitExceeded as e:
+        logger.warning(f"检索查询限流: {e}")
+        return BaseResponse(code=429, message="embedding 服务繁忙，请稍后重试", data=None)
     except Exception as e:
-        return BaseResponse(code=500, message=f"检索异常: {str(e)}", data=None) 
\ No newline at end of file
+        return BaseResponse(code=500, message=f"检索异常: {str(e)}", data=None)
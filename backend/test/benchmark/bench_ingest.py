@@ -0,0 +1,318 @@
+"""
+End-to-end ingest throughput benchmark for the Celery worker pipeline.
+
+Drives ``DocumentProcessor.process_document`` directly (no broker, no API) on
+generated TXT/MD/DOCX corpora, with an in-process fake embedder of
+configurable latency and a local Chroma store. For every document it reports
+chunks/sec, accumulated time per stage (download, parse, split, embed, write,
+progress callback, cancellation check), the peak RSS sampled while the document
+was processed (and its growth over the RSS before it) and the number of Redis
+round-trips.
+
+Requirements: a reachable Redis (task state lives there, REDIS_HOST/REDIS_PORT
+as for the worker). Progress callbacks are answered in-process and never hit
+the web API.
+
+Example (run from the backend directory):
+
+    python -m test.benchmark.bench_ingest --types txt,md,docx --sizes-kb 256,4096 \\
+        --embed-latency-ms 20 --parallel 3 --output bench_results/ingest.json
+"""
+
+import argparse
+import functools
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+from test.benchmark.common import (
+    StubEmbedder, RssSampler, synthetic_text, write_results, compare_results
+)
+
+
+class StageTimer:
+    """
+    Thread-safe accumulator of wall time and call counts per stage.
+
+    Spans nest per thread and book exclusive time: a span opened inside another
+    stage is subtracted from the outer one (e.g. parsing pulled through the
+    chunker), and a span re-entering the stage already open is folded into it
+    (e.g. ``FastRecursiveSplitter.iter_split`` inside ``split_markdown_stream``).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def add(self, stage: str, elapsed: float) -> None:
+        with self._lock:
+            self.seconds[stage] += elapsed
+            self.calls[stage] += 1
+
+    @contextmanager
+    def span(self, stage: str):
+        stack = self._local.__dict__.setdefault("stack", [])
+        if any(frame[0] == stage for frame in stack):
+            yield
+            return
+        frame = [stage, 0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][1] += elapsed
+            self.add(stage, elapsed - frame[1])
+
+    def reset(self) -> None:
+        with self._lock:
+            self.seconds.clear()
+            self.calls.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {k: {"seconds": round(v, 4), "calls": self.calls[k]} for k, v in sorted(self.seconds.items())}
+
+
+class _FakeResponse:
+    status_code = 200
+
+
+class TimedStubEmbedder(StubEmbedder):
+    """Stub embedder that books its time under the ``embed`` stage."""
+
+    def __init__(self, timer: StageTimer, dim: int, latency: float):
+        super().__init__(dim=dim, latency=latency)
+        self.timer = timer
+
+    def embed_documents(self, texts):
+        with self.timer.span("embed"):
+            return super().embed_documents(texts)
+
+
+def generate_corpus(out_dir: str, file_type: str, size_kb: int, seed: int) -> str:
+    """Generate a TXT/MD/DOCX document of roughly ``size_kb`` KB of text."""
+    rng = random.Random(seed)
+    target = size_kb * 1024
+    path = os.path.join(out_dir, f"corpus_{size_kb}kb.{file_type}")
+    if os.path.exists(path):
+        return path
+    if file_type == "docx":
+        from docx import Document
+        doc = Document()
+        written = 0
+        section = 0
+        while written < target:
+            section += 1
+            doc.add_heading(f"Section {section}", level=1 + section % 3)
+            for _ in range(rng.randint(3, 8)):
+                para = synthetic_text(rng, rng.randint(20, 120))
+                doc.add_paragraph(para)
+                written += len(para.encode("utf-8"))
+            if section % 5 == 0:
+                table = doc.add_table(rows=4, cols=3)
+                for row in table.rows:
+                    for cell in row.cells:
+                        cell.text = synthetic_text(rng, 3)
+        doc.save(path)
+        return path
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        section = 0
+        while written < target:
+            section += 1
+            if file_type == "md":
+                block = f"{'#' * (1 + section % 3)} Section {section}\n\n"
+            else:
+                block = ""
+            block += "\n\n".join(synthetic_text(rng, rng.randint(20, 120)) for _ in range(rng.randint(3, 8))) + "\n\n"
+            f.write(block)
+            written += len(block.encode("utf-8"))
+    return path
+
+
+class RedisCounter:
+    """Counts commands sent through redis-py (pipelines count as one round-trip)."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def install(self):
+        import redis
+        counter = self
+
+        original = redis.StrictRedis.execute_command
+
+        @functools.wraps(original)
+        def execute_command(client, *args, **kwargs):
+            with counter._lock:
+                counter.count += 1
+            return original(client, *args, **kwargs)
+
+        redis.StrictRedis.execute_command = execute_command
+
+
+def install_instrumentation(timer: StageTimer, embedder: TimedStubEmbedder) -> None:
+    """Wrap the worker pipeline stages so their time is booked on ``timer``."""
+    import worker.services.document_processor as dp
+    import worker.managers.progress_manager as pm
+    from core.file_parser.text_parser import TextFileParser
+    from core.file_parser.doc_parser import WordFileParser
+    from core.file_parser.chunker import StructuredChunker
+    from core.vdb.chroma import ChromaVectorDB
+    from common.utils.text_splitter import FastRecursiveSplitter
+    from worker.managers.task_state_manager import TaskStateManager
+
+    def timed(stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def timed_generator(stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            iterator = iter(func(*args, **kwargs))
+            while True:
+                with timer.span(stage):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        return wrapper
+
+    dp.DocumentProcessor._download_file = timed("download", dp.DocumentProcessor._download_file)
+    TextFileParser.parse_to_text = timed("parse", TextFileParser.parse_to_text)
+    WordFileParser.parse_blocks_lazy = timed_generator("parse", WordFileParser.parse_blocks_lazy)
+    # the worker imports the stream splitters by name, so patch them where it looks them up;
+    # FastRecursiveSplitter.split_text goes through iter_split
+    FastRecursiveSplitter.iter_split = timed_generator("split", FastRecursiveSplitter.iter_split)
+    dp.split_markdown_stream = timed_generator("split", dp.split_markdown_stream)
+    dp.split_text_stream = timed_generator("split", dp.split_text_stream)
+    StructuredChunker.chunk = timed_generator("split", StructuredChunker.chunk)
+    TaskStateManager.check_task_cancellation = timed("cancellation_check", TaskStateManager.check_task_cancellation)
+
+    # vectors are computed before the write, whichever method the processor uses
+    ChromaVectorDB.add_embeddings = timed("write", ChromaVectorDB.add_embeddings)
+    ChromaVectorDB.add_texts = timed("write", ChromaVectorDB.add_texts)
+
+    def fake_post(*args, **kwargs):
+        with timer.span("progress_callback"):
+            return _FakeResponse()
+
+    pm.requests.post = fake_post
+    dp.ModelFactory.create = staticmethod(lambda config: embedder)
+
+
+def build_params(path: str, file_type: str, persist_dir: str, dim: int, chunk_size: int, overlap: int, parallel: int):
+    from common.schemas.worker import (
+        ParseFileTaskParams, FileInfo, ParseParams, EmbeddingParams, VectorDBCollectionConfig
+    )
+    task_id = f"bench-{uuid.uuid4().hex[:12]}"
+    return ParseFileTaskParams(
+        task_id=task_id,
+        doc_id=str(random.randint(10 ** 6, 10 ** 7)),
+        kb_id="bench",
+        file=FileInfo(path=path, type=file_type, filename=os.path.basename(path)),
+        parse_params=ParseParams(chunk_size=chunk_size, overlap=overlap),
+        embedding=EmbeddingParams(
+            api_base="stub", api_key="", model_name="stub", model_type="embedding",
+            embedding_dim=dim, provider="stub"
+        ),
+        vdb=VectorDBCollectionConfig(
+            collection_name=f"bench_ingest_{file_type}",
+            type="chroma",
+            connection_config={"persist_directory": persist_dir},
+            embedding_dimension=dim,
+        ),
+        parallel=parallel,
+    )
+
+
+def parse_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DocumentProcessor.process_document throughput")
+    parser.add_argument("--types", type=parse_list, default=["txt", "md", "docx"])
+    parser.add_argument("--sizes-kb", type=lambda v: [int(x) for x in parse_list(v)], default=[256, 4096])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--parallel", type=int, default=3, help="ParseFileTaskParams.parallel")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="fake embedder latency per call")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default="./bench_results/ingest")
+    parser.add_argument("--output", default="./bench_results/ingest.json")
+    parser.add_argument("--compare", default=None, help="previous result file to compare against")
+    args = parser.parse_args()
+
+    corpus_dir = os.path.join(args.work_dir, "corpus")
+    persist_dir = os.path.abspath(os.path.join(args.work_dir, "chroma"))
+    os.makedirs(corpus_dir, exist_ok=True)
+    shutil.rmtree(persist_dir, ignore_errors=True)
+
+    timer = StageTimer()
+    embedder = TimedStubEmbedder(timer, dim=args.dim, latency=args.embed_latency_ms / 1000.0)
+    redis_counter = RedisCounter()
+    redis_counter.install()
+    install_instrumentation(timer, embedder)
+
+    from worker.services.document_processor import DocumentProcessor
+
+    results = []
+    for file_type in args.types:
+        for size_kb in args.sizes_kb:
+            path = generate_corpus(corpus_dir, file_type, size_kb, args.seed)
+            params = build_params(path, file_type, persist_dir, args.dim, args.chunk_size, args.overlap, args.parallel)
+            timer.reset()
+            redis_before = redis_counter.count
+            embed_calls_before = embedder.calls
+            start = time.perf_counter()
+            with RssSampler() as rss:
+                result = DocumentProcessor().process_document(params)
+            wall_time = time.perf_counter() - start
+            processed = result.get("processed_chunks", 0)
+            row = {
+                "file_type": file_type,
+                "size_kb": size_kb,
+                "file_bytes": os.path.getsize(path),
+                "chunks": processed,
+                "wall_s": round(wall_time, 4),
+                "chunks_per_s": round(processed / wall_time, 2) if wall_time > 0 else 0.0,
+                "embed_calls": embedder.calls - embed_calls_before,
+                "redis_round_trips": redis_counter.count - redis_before,
+                "peak_rss_mb": rss.peak_mb,
+                "rss_delta_mb": rss.delta_mb,
+                "stages": timer.snapshot(),
+            }
+            results.append(row)
+            stages = ", ".join(f"{k}={v['seconds']:.3f}s" for k, v in row["stages"].items())
+            print(
+                f"{file_type:>4} {size_kb:>6}KB chunks={processed:>6} {row['chunks_per_s']:>9.2f} chunks/s "
+                f"redis={row['redis_round_trips']:>6} rss={row['peak_rss_mb']}MB (+{row['rss_delta_mb']}) | {stages}"
+            )
+
+    report = write_results(args.output, "ingest", vars(args), results)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare_results(args.compare, report, ["file_type", "size_kb"], ["chunks_per_s", "wall_s", "redis_round_trips", "rss_delta_mb"])
+
+
+if __name__ == "__main__":
+    main()
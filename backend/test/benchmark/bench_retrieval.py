@@ -0,0 +1,194 @@
+"""
+Retrieval service load test / latency benchmark.
+
+Seeds a local Chroma collection with a synthetic corpus, serves
+``retrieval_service.main:app`` in-process with a stubbed embedder and measures
+p50/p95/p99 latency and QPS of ``POST /api/v1/retrieve`` for every combination
+of corpus size, top_k and concurrency.
+
+Example (run from the backend directory):
+
+    python -m test.benchmark.bench_retrieval --sizes 10000,100000 \\
+        --top-k 5,50,500 --concurrency 1,8,32 --requests 200 \\
+        --output bench_results/retrieval.json --compare bench_results/retrieval_base.json
+
+Seeded collections are kept under ``--persist-dir`` and reused by later runs,
+so seeding the 1M corpus is paid once. Use ``--url`` to benchmark an already
+running service instead (the knowledge base then has to exist there).
+"""
+
+import argparse
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import httpx
+
+from common.schemas.worker import VectorDBCollectionConfig
+from test.benchmark.common import (
+    StubEmbedder, synthetic_text, latency_summary, write_results, compare_results
+)
+
+BENCH_KB_PREFIX = "bench_retrieval_"
+
+
+def collection_name(size: int) -> str:
+    return f"{BENCH_KB_PREFIX}{size}"
+
+
+def seed_collection(persist_dir: str, size: int, dim: int, seed: int) -> None:
+    """Create (or top up) a Chroma collection holding ``size`` synthetic chunks."""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_dir)
+    collection = client.get_or_create_collection(collection_name(size))
+    existing = collection.count()
+    if existing >= size:
+        print(f"[seed] {collection_name(size)} already has {existing} chunks, reusing")
+        return
+    embedder = StubEmbedder(dim=dim)
+    rng = random.Random(seed + existing)
+    batch_size = min(client.get_max_batch_size(), 5000)
+    start = time.perf_counter()
+    for offset in range(existing, size, batch_size):
+        count = min(batch_size, size - offset)
+        texts = [synthetic_text(rng, rng.randint(40, 200)) for _ in range(count)]
+        collection.add(
+            ids=[f"chunk-{offset + i}" for i in range(count)],
+            documents=texts,
+            embeddings=embedder.embed_documents(texts),
+            metadatas=[{"doc_id": (offset + i) // 100, "chunk_id": (offset + i) % 100} for i in range(count)],
+        )
+        if (offset // batch_size) % 20 == 0:
+            print(f"[seed] {collection_name(size)}: {offset + count}/{size}")
+    print(f"[seed] {collection_name(size)} ready in {time.perf_counter() - start:.1f}s")
+
+
+def install_stubs(persist_dir: str, dim: int) -> None:
+    """
+    Point the retrieval service at the local bench collections: knowledge base
+    ``N`` maps to the collection seeded with ``N`` chunks, and the embedder
+    factory returns the stub embedder.
+    """
+    import retrieval_service.main as service
+
+    def load_config(knowledge_base_id: int):
+        vdb_config = VectorDBCollectionConfig(
+            collection_name=collection_name(knowledge_base_id),
+            type="chroma",
+            connection_config={"persist_directory": persist_dir},
+            embedding_dimension=dim,
+        )
+        return vdb_config, {"provider": "stub"}, "benchmark", None
+
+    service._load_retrieval_config = load_config
+    service.EmbedderFactory.create = staticmethod(lambda config: StubEmbedder(dim=dim))
+
+
+def serve_in_background() -> str:
+    """Start uvicorn serving the retrieval app on a free local port."""
+    import uvicorn
+    import retrieval_service.main as service
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(service.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("retrieval service did not start in time")
+        time.sleep(0.05)
+    return base_url
+
+
+def run_load(base_url: str, kb_id: int, top_k: int, concurrency: int, requests: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    queries = [synthetic_text(rng, rng.randint(3, 12)) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    with httpx.Client(base_url=base_url, timeout=120, limits=limits) as client:
+        def one(query: str) -> Tuple[float, bool]:
+            start = time.perf_counter()
+            try:
+                resp = client.post("/api/v1/retrieve", json={"knowledge_base_id": kb_id, "query": query, "top_k": top_k})
+                ok = resp.status_code == 200 and resp.json().get("code") == 200
+            except Exception:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        # warm-up: opens the collection and fills caches
+        for q in queries[:min(3, len(queries))]:
+            one(q)
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for elapsed, ok in pool.map(one, queries):
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        errors += 1
+        wall_time = time.perf_counter() - wall_start
+
+    row = {"corpus_size": kb_id, "top_k": top_k, "concurrency": concurrency, "requests": requests, "errors": errors}
+    row.update(latency_summary(latencies, wall_time))
+    return row
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/v1/retrieve latency and QPS")
+    parser.add_argument("--sizes", type=parse_int_list, default=[10_000, 100_000, 1_000_000], help="corpus sizes (chunks)")
+    parser.add_argument("--top-k", type=parse_int_list, default=[5, 50, 500])
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per (size, top_k, concurrency)")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension of the stub embedder")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--persist-dir", default="./bench_results/chroma_retrieval")
+    parser.add_argument("--url", default=None, help="benchmark an already running service instead of an in-process one")
+    parser.add_argument("--output", default="./bench_results/retrieval.json")
+    parser.add_argument("--compare", default=None, help="previous result file to compare against")
+    args = parser.parse_args()
+
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        for size in args.sizes:
+            seed_collection(args.persist_dir, size, args.dim, args.seed)
+        install_stubs(os.path.abspath(args.persist_dir), args.dim)
+        base_url = serve_in_background()
+
+    results = []
+    for size in args.sizes:
+        for top_k in args.top_k:
+            for concurrency in args.concurrency:
+                row = run_load(base_url, size, top_k, concurrency, args.requests, args.seed)
+                results.append(row)
+                print(
+                    f"size={size:>8} top_k={top_k:>4} conc={concurrency:>3} "
+                    f"p50={row['p50_ms']:>8.2f}ms p95={row['p95_ms']:>8.2f}ms "
+                    f"p99={row['p99_ms']:>8.2f}ms qps={row['qps']:>8.2f} errors={row['errors']}"
+                )
+
+    report = write_results(args.output, "retrieval", vars(args), results)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare_results(args.compare, report, ["corpus_size", "top_k", "concurrency"], ["p50_ms", "p95_ms", "p99_ms", "qps"])
+
+
+if __name__ == "__main__":
+    main()
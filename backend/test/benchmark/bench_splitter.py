@@ -0,0 +1,112 @@
+"""
+Text splitter throughput benchmark.
+
+Splits generated multi-MB documents with langchain's
+``RecursiveCharacterTextSplitter`` and with ``FastRecursiveSplitter`` from
+``common.utils.text_splitter``, checks that both produce identical chunks and
+reports MB/s and the speedup for every combination of input size, chunk size
+and length unit.
+
+Example (run from the backend directory):
+
+    python -m test.benchmark.bench_splitter --sizes-mb 1,4,16 --chunk-sizes 500,1000 \\
+        --output bench_results/splitter.json --compare bench_results/splitter_base.json
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from common.utils.text_splitter import FastRecursiveSplitter
+from common.utils.tokenizer import get_length_function
+from test.benchmark.common import synthetic_text, write_results, compare_results
+
+
+def build_document(rng: random.Random, size_mb: float) -> str:
+    """Paragraphs of varying length, some with hard line breaks, up to ``size_mb`` characters (in millions)."""
+    target = int(size_mb * 1024 * 1024)
+    paragraphs: List[str] = []
+    total = 0
+    while total < target:
+        paragraph = synthetic_text(rng, rng.randint(10, 400))
+        if rng.random() < 0.2:
+            paragraph = paragraph.replace(" ", "\n", rng.randint(1, 10))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def time_split(split: Callable[[str], List[str]], text: str, repeat: int) -> Tuple[float, List[str]]:
+    best = float("inf")
+    chunks: List[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(text)
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+def run_case(text: str, size_mb: float, chunk_size: int, overlap: int, length_unit: str, repeat: int) -> Dict:
+    length_function = get_length_function(length_unit)
+    kwargs = dict(chunk_size=chunk_size, chunk_overlap=overlap, length_function=length_function)
+    baseline_s, expected = time_split(RecursiveCharacterTextSplitter(**kwargs).split_text, text, repeat)
+    fast_s, chunks = time_split(FastRecursiveSplitter(**kwargs).split_text, text, repeat)
+    mb = len(text) / 1024 / 1024
+    return {
+        "size_mb": size_mb,
+        "chunk_size": chunk_size,
+        "length_unit": length_unit,
+        "chunks": len(chunks),
+        "identical": chunks == expected,
+        "langchain_s": round(baseline_s, 4),
+        "fast_s": round(fast_s, 4),
+        "langchain_mb_s": round(mb / baseline_s, 2),
+        "fast_mb_s": round(mb / fast_s, 2),
+        "speedup": round(baseline_s / fast_s, 2),
+    }
+
+
+def parse_list(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FastRecursiveSplitter against RecursiveCharacterTextSplitter")
+    parser.add_argument("--sizes-mb", type=parse_list(float), default=[1, 4, 16], help="document sizes (millions of characters)")
+    parser.add_argument("--chunk-sizes", type=parse_list(int), default=[500, 1000])
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--length-units", type=parse_list(str), default=["char", "token"])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="./bench_results/splitter.json")
+    parser.add_argument("--compare", default=None, help="previous result file to compare against")
+    args = parser.parse_args()
+
+    # langchain warns for every over-long chunk; keep the output readable
+    logging.getLogger("langchain_text_splitters.base").setLevel(logging.ERROR)
+
+    results = []
+    for size_mb in args.sizes_mb:
+        text = build_document(random.Random(args.seed), size_mb)
+        for chunk_size in args.chunk_sizes:
+            for length_unit in args.length_units:
+                row = run_case(text, size_mb, chunk_size, args.overlap, length_unit, args.repeat)
+                results.append(row)
+                print(
+                    f"size={size_mb:>5}MB chunk={chunk_size:>5} unit={length_unit:<5} chunks={row['chunks']:>7} "
+                    f"langchain={row['langchain_mb_s']:>7.2f}MB/s fast={row['fast_mb_s']:>7.2f}MB/s "
+                    f"speedup={row['speedup']:>5.2f}x identical={row['identical']}"
+                )
+
+    report = write_results(args.output, "splitter", vars(args), results)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare_results(args.compare, report, ["size_mb", "chunk_size", "length_unit"], ["fast_mb_s", "speedup"])
+
+
+if __name__ == "__main__":
+    main()
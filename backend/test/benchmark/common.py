@@ -0,0 +1,181 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+The benchmarks are plain scripts (not collected by pytest); run them from the
+backend directory so the project packages resolve, e.g.:
+
+    python -m test.benchmark.bench_retrieval --help
+"""
+
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.model.embedder.base import Embedder
+
+WORDS = (
+    "knowledge base vector index retrieval document chunk embedding model query "
+    "score latency throughput worker parser splitter metadata collection search "
+    "知识库 向量 检索 文档 分块 模型 查询 解析 性能 延迟 吞吐"
+).split()
+
+
+class StubEmbedder(Embedder):
+    """
+    Deterministic in-process embedder: the vector is derived from a hash of the
+    text, so identical texts always map to identical vectors. ``latency`` adds a
+    fixed sleep per call to emulate a remote provider.
+    """
+
+    def __init__(self, dim: int = 384, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vec = rng.standard_normal(self.dim).astype(np.float32)
+        return vec / np.linalg.norm(vec)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(t).tolist() for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    """Generate a pseudo-random paragraph with the given number of words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; ``values`` does not need to be sorted."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(latencies: List[float], wall_time: float) -> Dict[str, float]:
+    """Summarize per-request latencies (seconds) into milliseconds and QPS."""
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "qps": round(len(latencies) / wall_time, 2) if wall_time > 0 else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def current_rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        import psutil
+        return round(psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024, 1)
+
+
+class RssSampler:
+    """
+    Samples the current RSS on a background thread while the ``with`` block runs.
+
+    ``ru_maxrss`` is a lifetime peak and can only grow, so it cannot attribute
+    memory to one document out of several processed in the same process;
+    ``peak_mb`` here is the highest RSS seen inside the block and ``delta_mb``
+    its growth over the RSS at entry.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def delta_mb(self) -> float:
+        return round(self.peak_mb - self.start_mb, 1)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self) -> "RssSampler":
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def write_results(path: str, benchmark: str, args: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Write a machine-readable result file that can be diffed across commits."""
+    report = {
+        "benchmark": benchmark,
+        "git_commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": args,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def compare_results(baseline_path: str, current: Dict[str, Any], keys: Iterable[str], metrics: Iterable[str]) -> None:
+    """Print the relative change of ``metrics`` for rows matched on ``keys``."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    keys = list(keys)
+    index = {tuple(row.get(k) for k in keys): row for row in baseline.get("results", [])}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    for row in current["results"]:
+        base = index.get(tuple(row.get(k) for k in keys))
+        if not base:
+            continue
+        parts = []
+        for m in metrics:
+            old, new = base.get(m), row.get(m)
+            if not old or new is None:
+                continue
+            parts.append(f"{m} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        label = ", ".join(f"{k}={row.get(k)}" for k in keys)
+        print(f"  [{label}] " + "; ".join(parts))
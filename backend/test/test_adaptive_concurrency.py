@@ -0,0 +1,147 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from common.utils.rate_limiter import RateLimitExceeded
+from worker.utils import adaptive_concurrency
+from worker.utils.adaptive_concurrency import AdaptiveConcurrency, is_overload_error
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.response = SimpleNamespace(status_code=status, headers=headers or {})
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(adaptive_concurrency.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.mark.parametrize("status", [408, 429, 500, 502, 503])
+def test_overload_statuses_are_retryable(status):
+    assert is_overload_error(HTTPError(status))
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 413, 422])
+def test_client_errors_are_not_retryable(status):
+    assert not is_overload_error(HTTPError(status))
+
+
+def test_overload_detection_by_type_name_and_cause():
+    assert is_overload_error(TimeoutError())
+    assert is_overload_error(APITimeoutError())
+    try:
+        try:
+            raise ConnectionError("reset")
+        except ConnectionError as e:
+            raise ValueError("wrapped") from e
+    except ValueError as wrapped:
+        assert is_overload_error(wrapped)
+    assert not is_overload_error(ValueError("bad input"))
+    # 已在共享令牌桶上等到超时，不再重试
+    assert not is_overload_error(RateLimitExceeded())
+
+
+def test_limit_increases_by_one_per_window_of_successes():
+    concurrency = AdaptiveConcurrency(initial=2, max_limit=4)
+    for _ in range(2):
+        concurrency.on_success(0.1)
+    assert concurrency.limit == 3
+    for _ in range(3):
+        concurrency.on_success(0.1)
+    assert concurrency.limit == 4
+    for _ in range(10):
+        concurrency.on_success(0.1)
+    assert concurrency.limit == 4
+
+
+def test_rising_latency_stops_increase():
+    concurrency = AdaptiveConcurrency(initial=2, max_limit=8)
+    concurrency.on_success(0.1)
+    for _ in range(5):
+        concurrency.on_success(1.0)
+    assert concurrency.limit == 2
+
+
+def test_overload_halves_once_per_event():
+    concurrency = AdaptiveConcurrency(initial=8, max_limit=16)
+    started = time.monotonic()
+    concurrency.on_overload(started)
+    assert concurrency.limit == 4
+    # 同一轮过载中、在降并发之前发出的请求再失败时不重复减半
+    concurrency.on_overload(started)
+    assert concurrency.limit == 4
+    concurrency.on_overload(time.monotonic())
+    assert concurrency.limit == 2
+    concurrency.on_overload(time.monotonic())
+    concurrency.on_overload(time.monotonic())
+    assert concurrency.limit == 1
+
+
+def test_call_retries_overload_and_honours_retry_after(sleeps):
+    results = iter([HTTPError(429, {"retry-after": "2"}), HTTPError(503), "ok"])
+
+    def func():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    retries = []
+    concurrency = AdaptiveConcurrency(initial=4)
+    value = concurrency.call(
+        func, max_retries=5, base_delay=0.01, max_delay=30.0, on_retry=lambda e, n, d: retries.append((n, d))
+    )
+    assert value == "ok"
+    assert [n for n, _ in retries] == [1, 2]
+    assert sleeps[0] >= 2.0
+    assert sleeps[1] <= 0.02
+    # 两次过载 4 -> 2 -> 1，最后一次成功后加性增到 2
+    assert concurrency.limit == 2
+
+
+def test_retry_after_is_capped_by_max_delay(sleeps):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            raise HTTPError(429, {"retry-after": "120"})
+        return "ok"
+
+    assert AdaptiveConcurrency(initial=2).call(func, base_delay=0.01, max_delay=1.0) == "ok"
+    assert sleeps == [1.0]
+
+
+def test_call_raises_non_overload_errors_without_retry(sleeps):
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise HTTPError(400)
+
+    concurrency = AdaptiveConcurrency(initial=4)
+    with pytest.raises(HTTPError):
+        concurrency.call(func, max_retries=5)
+    assert len(calls) == 1 and not sleeps
+    assert concurrency.limit == 4
+
+
+def test_call_raises_after_retries_are_exhausted(sleeps):
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise HTTPError(503)
+
+    with pytest.raises(HTTPError):
+        AdaptiveConcurrency(initial=4).call(func, max_retries=2, base_delay=0.01)
+    assert len(calls) == 3 and len(sleeps) == 2
@@ -0,0 +1,52 @@
+from core.file_parser.base_parser import ParsedContent
+from core.file_parser.chunker import StructuredChunker
+
+
+def heading(text: str, level: int = 1) -> ParsedContent:
+    return ParsedContent(content_type="heading", content=text, metadata={"style": f"Heading {level}"})
+
+
+def para(text: str) -> ParsedContent:
+    return ParsedContent(content_type="text", content=text, metadata={})
+
+
+def test_first_chunk_of_each_section_starts_with_heading_path():
+    blocks = [heading("第一章"), para("正文一"), heading("1.1 安装", 2), para("正文二"), para("正文三")]
+    chunks = list(StructuredChunker(chunk_size=100, overlap=0).chunk(blocks))
+    assert [c.content for c in chunks] == ["第一章\n正文一", "第一章 > 1.1 安装\n正文二\n正文三"]
+    assert chunks[1].metadata["heading_path"] == "第一章 > 1.1 安装"
+
+
+def test_headings_without_body_still_produce_chunks():
+    blocks = [heading("第一章"), heading("1.1 概述", 2), heading("第二章")]
+    chunks = list(StructuredChunker(chunk_size=100, overlap=0).chunk(blocks))
+    assert [c.content for c in chunks] == ["第一章", "第一章 > 1.1 概述", "第二章"]
+
+
+def test_heading_is_prefixed_to_oversized_first_paragraph():
+    blocks = [heading("标题"), para("a" * 25)]
+    chunks = list(StructuredChunker(chunk_size=10, overlap=0).chunk(blocks))
+    assert chunks[0].content.startswith("标题\n")
+    assert "".join(c.content for c in chunks) == "标题\n" + "a" * 25
+
+
+def test_heading_prefix_counts_toward_chunk_size():
+    blocks = [heading("标题"), para("a" * 9)]
+    chunks = list(StructuredChunker(chunk_size=10, overlap=0).chunk(blocks))
+    assert all(len(c.content) <= 10 for c in chunks)
+    assert chunks[0].content.startswith("标题\n")
+    assert "".join(c.content for c in chunks) == "标题\n" + "a" * 9
+
+
+def test_large_table_is_grouped_by_rows_even_with_multiline_cells():
+    table_data = [["列1", "列2"]] + [[f"第{i}行\n续", f"值{i}"] for i in range(6)]
+    content = "\n".join(" | ".join(row) for row in table_data)
+    table = ParsedContent(content_type="table", content=content, metadata={"rows": 7, "table_data": table_data})
+    chunks = list(StructuredChunker(chunk_size=40, overlap=0).chunk([heading("表"), table]))
+    assert len(chunks) > 1
+    assert chunks[0].content.startswith("表\n列1 | 列2\n")
+    for chunk in chunks:
+        assert len(chunk.content) <= 40
+        body = chunk.content.split("列1 | 列2\n", 1)[1]
+        # 每组只包含完整的行，单元格内的换行不会把一行拆到两组
+        assert body.count("续") == body.count("第")
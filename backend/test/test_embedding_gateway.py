@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+import numpy as np
+
+from core.model.embedder.base import Embedder
+from worker.embedding_gateway import BatchQueue
+
+
+class RecordingEmbedder(Embedder):
+    """按文本长度返回一维向量，并记录每次上游调用的批次"""
+
+    def __init__(self, delay: float = 0.0, fail: Exception = None, reject: str = None):
+        self.batches: List[List[str]] = []
+        self.delay = delay
+        self.fail = fail
+        self.reject = reject
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail is not None:
+            raise self.fail
+        if self.reject is not None and self.reject in texts:
+            raise ValueError(f"invalid input: {self.reject}")
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_queue(embedder, max_batch_size=64, max_batch_tokens=10000, max_wait=0.05, max_inflight=2):
+    return BatchQueue(embedder, max_batch_size, max_batch_tokens, max_wait, max_inflight, count_tokens=len)
+
+
+def test_requests_from_many_callers_are_merged_and_fanned_out():
+    embedder = RecordingEmbedder()
+
+    async def run():
+        queue = make_queue(embedder)
+        requests = [[f"{i}-{j}" * (i + 1) for j in range(3)] for i in range(10)]
+        results = await asyncio.gather(*(queue.submit(texts) for texts in requests))
+        return requests, results
+
+    requests, results = asyncio.run(run())
+    for texts, vectors in zip(requests, results):
+        assert vectors.dtype == np.float32
+        assert vectors.tolist() == [[float(len(t))] for t in texts]
+    assert len(embedder.batches) == 1
+    assert len(embedder.batches[0]) == 30
+
+
+def test_batches_respect_size_and_token_limits():
+    embedder = RecordingEmbedder()
+
+    async def run():
+        queue = make_queue(embedder, max_batch_size=4, max_batch_tokens=10)
+        return await asyncio.gather(*(queue.submit(["abc", "de"]) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert all(vectors.tolist() == [[3.0], [2.0]] for vectors in results)
+    assert sum(len(b) for b in embedder.batches) == 10
+    assert all(len(b) <= 4 and sum(len(t) for t in b) <= 10 for b in embedder.batches)
+
+
+def test_flush_skips_the_wait_window():
+    embedder = RecordingEmbedder()
+
+    async def run():
+        queue = make_queue(embedder, max_wait=5)
+        start = time.monotonic()
+        vectors = await queue.submit(["query"], flush=True)
+        return vectors, time.monotonic() - start
+
+    vectors, elapsed = asyncio.run(run())
+    assert vectors.tolist() == [[5.0]]
+    assert elapsed < 1
+
+
+def test_upstream_error_fails_every_request_in_the_batch():
+    embedder = RecordingEmbedder(fail=TimeoutError("upstream timeout"))
+
+    async def run():
+        queue = make_queue(embedder)
+        return await asyncio.gather(queue.submit(["a"]), queue.submit(["b", "c"]), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, TimeoutError) for r in results)
+
+
+def test_invalid_input_only_fails_its_own_request():
+    embedder = RecordingEmbedder(reject="bad")
+
+    async def run():
+        queue = make_queue(embedder)
+        return await asyncio.gather(
+            queue.submit(["a", "b"]), queue.submit(["bad"]), queue.submit(["cc"]), return_exceptions=True
+        )
+
+    ok_first, failed, ok_last = asyncio.run(run())
+    assert ok_first.tolist() == [[1.0], [1.0]]
+    assert isinstance(failed, ValueError)
+    assert ok_last.tolist() == [[2.0]]
+    assert embedder.batches[0] == ["a", "b", "bad", "cc"]
+
+
+def test_batches_grow_while_upstream_is_busy():
+    embedder = RecordingEmbedder(delay=0.05)
+
+    async def run():
+        queue = make_queue(embedder, max_wait=0.001, max_inflight=1)
+        tasks = []
+        for i in range(20):
+            tasks.append(asyncio.create_task(queue.submit([f"t{i}"])))
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert len(embedder.batches) < 20
+    assert max(len(b) for b in embedder.batches) > 1
+
+
+
+def test_non_overload_upstream_error_is_not_reported_as_5xx():
+    import json
+    from fastapi.testclient import TestClient
+    from worker import embedding_gateway
+
+    upstream = {"provider": "stub", "model_name": "reject-test"}
+    embedding_gateway._queues[json.dumps(upstream, sort_keys=True)] = make_queue(RecordingEmbedder(reject="bad"), max_wait=0)
+    try:
+        response = TestClient(embedding_gateway.app).post("/embed", json={"upstream": upstream, "texts": ["bad"]})
+    finally:
+        embedding_gateway._queues.clear()
+    assert response.status_code == 422
@@ -0,0 +1,78 @@
+import json
+from typing import List
+
+import numpy as np
+import onnxruntime
+import pytest
+
+from core.model.embedder.local import LocalEmbedder
+
+VOCAB = ["[PAD]", "[UNK]", "查询:", "a", "b", "c", "d", "e", "f", "g"]
+
+
+class StubSession:
+    """替代 ONNX 模型：每个 token 输出 [token_id, 1]，并记录每批的 input_ids"""
+
+    def __init__(self, *args, **kwargs):
+        self.batches: List[np.ndarray] = []
+
+    def get_inputs(self):
+        return [type("Input", (), {"name": name})() for name in ("input_ids", "attention_mask")]
+
+    def run(self, output_names, feeds):
+        input_ids = feeds["input_ids"]
+        self.batches.append(input_ids)
+        return [np.stack([input_ids, np.ones_like(input_ids)], axis=-1).astype(np.float32)]
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    tokenizer = {
+        "version": "1.0",
+        "truncation": None,
+        "padding": None,
+        "added_tokens": [],
+        "normalizer": None,
+        "pre_tokenizer": {"type": "WhitespaceSplit"},
+        "post_processor": None,
+        "decoder": None,
+        "model": {"type": "WordLevel", "vocab": {t: i for i, t in enumerate(VOCAB)}, "unk_token": "[UNK]"},
+    }
+    (tmp_path / "tokenizer.json").write_text(json.dumps(tokenizer), encoding="utf-8")
+    (tmp_path / "model.onnx").write_bytes(b"")
+    monkeypatch.setattr(onnxruntime, "InferenceSession", StubSession)
+    return str(tmp_path)
+
+
+def make_embedder(model_dir: str, **extra) -> LocalEmbedder:
+    extra_config = {"model_path": model_dir, "normalize": False, "num_threads": 1, "max_length": 16, **extra}
+    return LocalEmbedder({"model_name": "stub", "extra_config": extra_config})
+
+
+def token_ids(text: str) -> List[int]:
+    return [VOCAB.index(t) for t in text.split()]
+
+
+def test_batches_are_sorted_by_length_and_results_keep_input_order(model_dir):
+    texts = ["a b c d e", "f", "a b c", "g g", "b c d e f g", "a"]
+    embedder = make_embedder(model_dir, batch_size=2)
+    vectors = embedder.embed_documents_array(texts)
+
+    session = embedder._get_model()._session
+    # 长度接近的文本在同一批，每批只补齐到批内最长
+    assert [batch.shape for batch in session.batches] == [(2, 1), (2, 3), (2, 6)]
+    # 均值池化只统计有效 token，padding 不参与
+    expected = [[np.mean(token_ids(t)), 1.0] for t in texts]
+    np.testing.assert_allclose(vectors, expected, rtol=1e-6)
+
+
+def test_cls_pooling_takes_first_token(model_dir):
+    texts = ["c d e", "g", "b a"]
+    vectors = make_embedder(model_dir, pooling="cls").embed_documents_array(texts)
+    np.testing.assert_allclose(vectors[:, 0], [token_ids(t)[0] for t in texts])
+
+
+def test_query_instruction_is_prefixed_to_queries_only(model_dir):
+    embedder = make_embedder(model_dir, query_instruction="查询: ")
+    np.testing.assert_allclose(embedder.embed_query_array("c"), [np.mean(token_ids("查询: c")), 1.0])
+    np.testing.assert_allclose(embedder.embed_documents_array(["c"]), [[token_ids("c")[0], 1.0]])
@@ -0,0 +1,56 @@
+import multiprocessing
+
+import billiard.pool
+from docx import Document
+
+from core.file_parser.doc_parser import WordFileParser
+from core.file_parser.parallel import resolve_workers
+
+
+def _make_docx(path: str) -> None:
+    doc = Document()
+    for section in range(12):
+        doc.add_heading(f"第{section}节", level=1 + section % 2)
+        for i in range(8):
+            doc.add_paragraph(f"段落 {section}-{i} " + "内容 " * (i + 1))
+        if section % 3 == 0:
+            table = doc.add_table(rows=3, cols=2)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"单元格{r}{c}"
+    doc.save(path)
+
+
+def _dump(contents):
+    return [(c.type, c.content, c.metadata) for c in contents]
+
+
+def _parse_in_child(path: str):
+    """在 Celery prefork 风格的守护子进程中执行：分别按顺序与进程池解析"""
+    sequential = WordFileParser(max_workers=1)
+    parallel = WordFileParser(max_workers=2, parallel_min_elements=1, section_elements=7)
+    return (
+        multiprocessing.current_process().daemon,
+        resolve_workers(2),
+        _dump(sequential.parse_file_lazy(path)),
+        _dump(parallel.parse_file_lazy(path)),
+        _dump(sequential.parse_blocks_lazy(path)),
+        _dump(parallel.parse_blocks_lazy(path)),
+    )
+
+
+def test_parallel_docx_parse_matches_sequential_in_daemonic_child(tmp_path):
+    path = str(tmp_path / "sections.docx")
+    _make_docx(path)
+    pool = billiard.pool.Pool(1)
+    try:
+        daemon, workers, seq_text, par_text, seq_blocks, par_blocks = pool.apply_async(
+            _parse_in_child, (path,)
+        ).get(timeout=120)
+    finally:
+        pool.terminate()
+        pool.join()
+    assert daemon
+    assert workers == 2
+    assert seq_text and par_text == seq_text
+    assert seq_blocks and par_blocks == seq_blocks
@@ -0,0 +1,80 @@
+import pytest
+
+from common.utils.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitExceeded, RedisTokenBucket
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa", reason="fakeredis 执行 Lua 脚本需要 lupa")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def drain(bucket: RedisTokenBucket, priority: str = PRIORITY_BACKGROUND, tokens: int = 0) -> int:
+    """连续取令牌直到需要等待，返回取到的次数"""
+    taken = 0
+    while bucket.try_acquire(tokens, priority) == 0:
+        taken += 1
+        assert taken <= 1000
+    return taken
+
+
+def rewind(redis_client, bucket: RedisTokenBucket, seconds: float) -> None:
+    """把桶的上次更新时间往前拨，模拟经过了 seconds 秒"""
+    ts = int(redis_client.hget(bucket.key, "ts"))
+    redis_client.hset(bucket.key, "ts", ts - int(seconds * 1000))
+
+
+def test_background_requests_leave_reserve_for_interactive(redis_client):
+    bucket = RedisTokenBucket("1", requests_per_minute=60, reserve_ratio=0.2, redis_client=redis_client)
+    assert drain(bucket, PRIORITY_BACKGROUND) == 48
+    wait = bucket.try_acquire(priority=PRIORITY_BACKGROUND)
+    assert 0.9 < wait <= 1.0
+    # 后台请求用完可用预算后，检索查询仍能立即使用保留的部分
+    assert drain(bucket, PRIORITY_INTERACTIVE) == 12
+    assert bucket.try_acquire(priority=PRIORITY_INTERACTIVE) > 0
+
+
+def test_bucket_refills_over_time(redis_client):
+    bucket = RedisTokenBucket("2", requests_per_minute=60, reserve_ratio=0.0, redis_client=redis_client)
+    assert drain(bucket) == 60
+    rewind(redis_client, bucket, 30)
+    assert drain(bucket) == 30
+    # 补充不超过桶容量（一分钟的预算）
+    rewind(redis_client, bucket, 600)
+    assert drain(bucket) == 60
+
+
+def test_token_budget_limits_requests(redis_client):
+    bucket = RedisTokenBucket("3", tokens_per_minute=1000, reserve_ratio=0.0, redis_client=redis_client)
+    assert drain(bucket, tokens=300) == 3
+    # 还差约 200 token，按 TPM 折算约 12 秒
+    assert 11 < bucket.try_acquire(300) <= 12
+
+
+def test_oversized_request_is_clamped_to_available_budget(redis_client):
+    bucket = RedisTokenBucket("4", tokens_per_minute=1000, reserve_ratio=0.2, redis_client=redis_client)
+    # 超过后台可用预算（800）的请求按 800 计，桶满时可以立即取得
+    assert bucket.try_acquire(5000, PRIORITY_BACKGROUND) == 0
+    assert bucket.try_acquire(5000, PRIORITY_BACKGROUND) > 0
+    assert bucket.try_acquire(5000, PRIORITY_INTERACTIVE) > 0
+    rewind(redis_client, bucket, 60)
+    assert bucket.try_acquire(5000, PRIORITY_INTERACTIVE) == 0
+
+
+def test_acquire_raises_when_wait_exceeds_timeout(redis_client):
+    bucket = RedisTokenBucket("5", requests_per_minute=1, reserve_ratio=0.0, redis_client=redis_client)
+    assert bucket.acquire(timeout=1) == pytest.approx(0, abs=0.5)
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(timeout=1)
+
+
+def test_redis_unavailable_lets_requests_through():
+    server = fakeredis.FakeServer()
+    bucket = RedisTokenBucket("6", requests_per_minute=1, redis_client=fakeredis.FakeRedis(server=server))
+    server.connected = False
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
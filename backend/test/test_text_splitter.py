@@ -0,0 +1,100 @@
+import random
+
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from common.utils.text_splitter import FastRecursiveSplitter, split_markdown_stream
+from common.utils.tokenizer import estimate_tokens
+
+# 覆盖连续分隔符、首尾空白、中英文混排等边界情况
+ALPHABET = ["a", "b", "中", "文", " ", "  ", "\n", "\n\n", "\n\n\n", "\t", "。", "word ", "长句子", "\r\n"]
+
+
+def _random_text(rng: random.Random, max_tokens: int = 400) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_tokens)))
+
+
+def _assert_parity(text: str, **kwargs):
+    expected = RecursiveCharacterTextSplitter(**kwargs).split_text(text)
+    assert FastRecursiveSplitter(**kwargs).split_text(text) == expected
+    assert list(FastRecursiveSplitter(**kwargs).iter_split(text)) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    " ",
+    "\n\n\n",
+    "单行文本",
+    "a" * 2500,
+    "para one\n\npara two\n\n\npara three",
+    "\n\n  leading and trailing  \n\n",
+    "word " * 1000,
+    "中文句子。" * 800,
+])
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(1, 0), (10, 3), (100, 20), (1000, 100)])
+def test_parity_fixed_cases(text, chunk_size, chunk_overlap):
+    _assert_parity(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parity_random(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        chunk_size = rng.randint(1, 80)
+        _assert_parity(
+            _random_text(rng),
+            chunk_size=chunk_size,
+            chunk_overlap=rng.randint(0, chunk_size),
+            length_function=rng.choice([len, estimate_tokens]),
+            keep_separator=rng.choice([True, False, "start", "end"]),
+            strip_whitespace=rng.choice([True, False]),
+        )
+
+
+@pytest.mark.parametrize("separators", [["。", "\n"], ["\n\n", "中", ""], [" "], ["\r\n", "\n", ""]])
+def test_parity_custom_separators(separators):
+    rng = random.Random(len(separators))
+    for _ in range(200):
+        _assert_parity(_random_text(rng), chunk_size=rng.randint(5, 60), chunk_overlap=rng.randint(0, 5), separators=separators)
+
+
+def test_parity_large_input():
+    rng = random.Random(42)
+    words = "knowledge base vector 知识库 向量 检索 文档 分块".split()
+    paragraphs = [" ".join(rng.choice(words) for _ in range(rng.randint(5, 400))) for _ in range(2000)]
+    text = "\n\n".join(p if i % 7 else p.replace(" ", "\n", 20) for i, p in enumerate(paragraphs))
+    _assert_parity(text, chunk_size=500, chunk_overlap=50)
+
+
+def test_overlap_larger_than_chunk_size():
+    with pytest.raises(ValueError):
+        FastRecursiveSplitter(chunk_size=10, chunk_overlap=20)
+
+
+def test_markdown_chunks_start_with_header_path():
+    text = "# 安装\n\n先装依赖。\n\n## 依赖\n\n- numpy\n"
+    chunks = list(split_markdown_stream([text], chunk_size=100, chunk_overlap=0))
+    assert [c for c, _ in chunks] == ["安装\n\n先装依赖。", "安装 > 依赖\n\n- numpy"]
+    assert chunks[1][1] == {"header_path": "安装 > 依赖", "block_type": "text"}
+
+
+def test_markdown_headings_only_file_produces_chunks():
+    chunks = list(split_markdown_stream(["# 第一章\n## 1.1\n# 第二章\n"], chunk_size=100, chunk_overlap=0))
+    assert [c for c, _ in chunks] == ["第一章", "第一章 > 1.1", "第二章"]
+    assert all(m["block_type"] == "heading" for _, m in chunks)
+
+
+def test_markdown_crlf_setext_heading_and_table():
+    text = "安装\r\n====\r\n\r\n| a | b |\r\n|---|---|\r\n| 1 | 2 |\r\n"
+    # CRLF 在任意位置被分段切开时结果相同
+    pieces = [text[i:i + 3] for i in range(0, len(text), 3)]
+    chunks = list(split_markdown_stream(pieces, chunk_size=100, chunk_overlap=0))
+    assert chunks == [("安装\n\n| a | b |\n|---|---|\n| 1 | 2 |", {"header_path": "安装", "block_type": "table"})]
+
+
+def test_markdown_heading_prefix_counts_toward_chunk_size():
+    text = "# 标题\n\n" + "a" * 9 + "\n"
+    chunks = list(split_markdown_stream([text], chunk_size=10, chunk_overlap=0))
+    assert all(len(c) <= 10 for c, _ in chunks)
+    assert chunks[0][0].startswith("标题\n\n")
+    assert "".join(c for c, _ in chunks) == "标题\n\n" + "a" * 9
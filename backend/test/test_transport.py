@@ -0,0 +1,29 @@
+from common.schemas.model import ModelConfig
+from core.model import ModelFactory
+from core.model.transport import connection_key, get_http_client
+
+
+def embedding_config(connection_id=None, **extra_config) -> ModelConfig:
+    return ModelConfig(
+        model_name="text-embedding-3-small",
+        model_type="embedding",
+        provider="openai",
+        api_base="https://api.example.com/v1",
+        api_key="sk-test",
+        connection_id=connection_id,
+        extra_config=extra_config or None,
+    )
+
+
+def test_model_config_keeps_connection_id_for_pool_keying():
+    assert connection_key(embedding_config(connection_id=7).model_dump()) == "conn:7"
+    assert connection_key(embedding_config().model_dump()).startswith("https://api.example.com|")
+
+
+def test_embedders_of_one_connection_share_a_pool_with_extra_config_limits():
+    first = ModelFactory.create(embedding_config(connection_id=9001, http_max_connections=5, timeout=12))
+    second = ModelFactory.create(embedding_config(connection_id=9001))
+    client = get_http_client({"connection_id": 9001})
+    assert first.client._client is client and second.client._client is client
+    assert client._transport._pool._max_connections == 5
+    assert first.client.timeout.read == 12
@@ -2,26 +2,26 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query,
 import os
 import json
 from sqlalchemy.orm import Session
-from datetime import datetime
 from common.db.models import Document, DocumentStatus, KnowledgeBase, VDBCollection, VDB, OSSConnection
 from common.core.deps import get_db, get_current_user
-from common.core.config import config
 from common.schemas.response import BaseResponse
 from common.schemas.knowledge_base import DocumentUpdate
 from typing import Any, Optional, List
 from webapi.services.document_service import (
-    create_document, 
     get_documents, 
     get_document as get_document_service, 
     delete_document as delete_document_service, 
-    update_document as update_document_service
+    update_document as update_document_service,
+    count_documents_sharing_file
 )
 from webapi.services.document_task_dispatcher import dispatch_document_parse_task, celery_app
 from pydantic import BaseModel
 from fastapi.responses import FileResponse, StreamingResponse
 from webapi.services.knowledge_base_service import get_kb
+from webapi.services.upload_service import store_uploaded_document, UploadError
+from webapi.services.preview_service import preview_oss_document, preview_local_document, local_index_path
 from loguru import logger
-from common.utils.oss_client import OSSClient
+from common.utils.oss_client import get_oss_client
 from common.core.encryption import decrypt_api_key
 from common.schemas.worker import VectorDBCollectionConfig
 
@@ -41,8 +41,6 @@ def upload_document(
     if not kb:
         return BaseResponse(code=404, message="知识库不存在")
 
-    file_ext = os.path.splitext(file.filename)[1]
-    save_name = f"{int(datetime.utcnow().timestamp())}{file_ext}"
     doc_status = 'pending' if kb.auto_process_on_upload else 'not_started'
     config_dict = None
     if parsing_config:
@@ -51,49 +49,12 @@ def upload_document(
         except json.JSONDecodeError:
             return BaseResponse(code=400, message="Invalid JSON in parsing_config")
 
-    # 判断是否绑定 OSS
-    if kb.oss_connection_id and kb.oss_bucket:
-        oss_conn = db.query(OSSConnection).filter(OSSConnection.id == kb.oss_connection_id).first()
-        if not oss_conn:
-            return BaseResponse(code=400, message="OSS 连接不存在")
-        # 解密 access_key/secret_key
-        ak = decrypt_api_key(oss_conn.access_key)
-        sk = decrypt_api_key(oss_conn.secret_key)
-        uploader = OSSClient(
-            endpoint_url=oss_conn.endpoint,
-            access_key=ak,
-            secret_key=sk,
-            region=oss_conn.region
-        )
-        # 上传到 OSS
-        file.file.seek(0)
-        oss_key = save_name  # 直接用唯一文件名，不再拼接kb_id
-        try:
-            uploader.upload_fileobj(file.file, kb.oss_bucket, oss_key)
-        except Exception as e:
-            return BaseResponse(code=500, message=f"OSS 上传失败: {e}")
-        file_url = f"oss://{kb.oss_bucket}/{oss_key}"
-        doc = create_document(
-            db, kb_id, file.filename, file_ext[1:].lower() if file_ext else '',
-            file_url, current_user.id, parsing_config=config_dict, status=doc_status,
-            oss_connection_id=kb.oss_connection_id, oss_bucket=kb.oss_bucket
-        )
-        storage_type = 'oss'
-    else:
-        # 本地上传
-        upload_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), config.upload['dir'])
-        kb_dir = os.path.join(upload_dir, str(kb_id))
-        os.makedirs(kb_dir, exist_ok=True)
-        save_path = os.path.join(kb_dir, save_name)
-        file.file.seek(0)
-        with open(save_path, "wb") as f:
-            f.write(file.file.read())
-        file_url = f"/static/uploads/{kb_id}/{save_name}"
-        doc = create_document(
-            db, kb_id, file.filename, file_ext[1:].lower() if file_ext else '',
-            save_path, current_user.id, parsing_config=config_dict, status=doc_status
+    try:
+        doc, storage_type, file_url = store_uploaded_document(
+            db, kb, file, current_user.id, parsing_config=config_dict, status=doc_status
         )
-        storage_type = 'local'
+    except UploadError as e:
+        return BaseResponse(code=e.code, message=e.message)
 
     if doc.status == 'pending':
         dispatch_document_parse_task(doc.id)
@@ -131,7 +92,12 @@ def delete_document(doc_id: int, db: Session = Depends(get_db), current_user: An
         return BaseResponse(code=404, message="文档不存在")
     try:
         if doc.filepath and os.path.exists(doc.filepath):
-            os.remove(doc.filepath)
+            if count_documents_sharing_file(db, doc) == 0:
+                os.remove(doc.filepath)
+                if os.path.exists(local_index_path(doc.filepath)):
+                    os.remove(local_index_path(doc.filepath))
+            else:
+                logger.info(f"[Delete] 文件仍被其他文档引用，保留存储文件: {doc.filepath}")
         
         # 获取知识库绑定的 vdb_collection 及其 VDB 配置
         kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == doc.kb_id).first()
@@ -225,12 +191,6 @@ def preview_txt_document(doc_id: int, offset: int = Query(0, ge=0), db: Session
     if not doc:
         raise HTTPException(status_code=404, detail="文档不存在")
     
-    max_lines = 5000
-    max_chars = 50000
-    lines = []
-    total_chars = 0
-    actual_lines = 0
-    has_more = False
     try:
         # 判断是否为 OSS 文件（需全部条件满足）
         is_oss = bool(doc.oss_connection_id and doc.oss_bucket and str(doc.filepath).startswith('oss://'))
@@ -238,7 +198,7 @@ def preview_txt_document(doc_id: int, offset: int = Query(0, ge=0), db: Session
             oss_conn = db.query(OSSConnection).filter(OSSConnection.id == doc.oss_connection_id).first()
             ak = decrypt_api_key(oss_conn.access_key)
             sk = decrypt_api_key(oss_conn.secret_key)
-            uploader = OSSClient(
+            uploader = get_oss_client(
                 endpoint_url=oss_conn.endpoint,
                 access_key=ak,
                 secret_key=sk,
@@ -246,39 +206,10 @@ def preview_txt_document(doc_id: int, offset: int = Query(0, ge=0), db: Session
             )
             # 直接用数据库存储的key，不再拼接kb_id
             oss_key = doc.filepath.replace(f'oss://{doc.oss_bucket}/', '')
-            import io
-            response = uploader.s3.get_object(Bucket=doc.oss_bucket, Key=oss_key)
-            f = io.StringIO(response['Body'].read().decode('utf-8'))
-        else:
-            f = open(doc.filepath, 'r', encoding='utf-8')
-        with f:
-            for _ in range(offset):
-                if f.readline() == '':
-                    break
-            for _ in range(max_lines):
-                line = f.readline()
-                if not line:
-                    break
-                if total_chars + len(line) > max_chars:
-                    line = line[:max_chars - total_chars]
-                    lines.append(line)
-                    total_chars = max_chars
-                    actual_lines += 1
-                    break
-                lines.append(line)
-                total_chars += len(line)
-                actual_lines += 1
-            if f.readline():
-                has_more = True
+            return preview_oss_document(uploader, doc.oss_connection_id, doc.oss_bucket, oss_key, offset)
+        return preview_local_document(doc.filepath, offset)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取文件失败: {e}")
-    return {
-        "content": ''.join(lines),
-        "lines": actual_lines,
-        "chars": total_chars,
-        "has_more": has_more,
-        "next_offset": offset + actual_lines if has_more else None
-    }
 
 @router.get("/{doc_id}/chunks")
 def list_document_chunks(doc_id: int, page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=100), full_text: bool = Query(False), db: Session = Depends(get_db), current_user: Any = Depends(get_current_user)):
@@ -362,7 +293,7 @@ def download_document_file(doc_id: int, db: Session = Depends(get_db), current_u
         oss_conn = db.query(OSSConnection).filter(OSSConnection.id == doc.oss_connection_id).first()
         ak = decrypt_api_key(oss_conn.access_key)
         sk = decrypt_api_key(oss_conn.secret_key)
-        uploader = OSSClient(
+        uploader = get_oss_client(
             endpoint_url=oss_conn.endpoint,
             access_key=ak,
             secret_key=sk,
@@ -5,17 +5,14 @@ from webapi.services.knowledge_base_service import create_kb, get_kbs, get_kb, u
 from webapi.api.user import get_db
 from fastapi.security import OAuth2PasswordBearer
 from common.db import models
-from common.db.models import Document, OSSConnection
+from common.db.models import Document
 from common.core.config import config
 from common.schemas.response import BaseResponse
 from common.core.deps import get_db, get_current_user
-from webapi.services.document_service import create_document, get_documents
+from webapi.services.document_service import get_documents
 from webapi.services.document_task_dispatcher import dispatch_document_parse_task
-from common.utils.oss_client import OSSClient
-from common.core.encryption import decrypt_api_key
-from datetime import datetime
+from webapi.services.upload_service import store_uploaded_document, UploadError
 from typing import Optional, Any
-import os
 import json
 from loguru import logger
 
@@ -96,8 +93,6 @@ def upload_document(
     if not kb:
         return BaseResponse(code=404, message="知识库不存在")
 
-    file_ext = os.path.splitext(file.filename)[1]
-    save_name = f"{int(datetime.utcnow().timestamp())}{file_ext}"
     doc_status = 'pending' if kb.auto_process_on_upload else 'not_started'
     config_dict = None
     if parsing_config:
@@ -106,49 +101,12 @@ def upload_document(
         except json.JSONDecodeError:
             return BaseResponse(code=400, message="Invalid JSON in parsing_config")
 
-    # 判断是否绑定 OSS
-    if kb.oss_connection_id and kb.oss_bucket:
-        oss_conn = db.query(OSSConnection).filter(OSSConnection.id == kb.oss_connection_id).first()
-        if not oss_conn:
-            return BaseResponse(code=400, message="OSS 连接不存在")
-        # 解密 access_key/secret_key
-        ak = decrypt_api_key(oss_conn.access_key)
-        sk = decrypt_api_key(oss_conn.secret_key)
-        uploader = OSSClient(
-            endpoint_url=oss_conn.endpoint,
-            access_key=ak,
-            secret_key=sk,
-            region=oss_conn.region
-        )
-        # 上传到 OSS
-        file.file.seek(0)
-        oss_key = save_name  # 直接用唯一文件名，不再拼接kb_id
-        try:
-            uploader.upload_fileobj(file.file, kb.oss_bucket, oss_key)
-        except Exception as e:
-            return BaseResponse(code=500, message=f"OSS 上传失败: {e}")
-        file_url = f"oss://{kb.oss_bucket}/{oss_key}"
-        doc = create_document(
-            db, kb_id, file.filename, file_ext[1:].lower() if file_ext else '',
-            file_url, current_user.id, parsing_config=config_dict, status=doc_status,
-            oss_connection_id=kb.oss_connection_id, oss_bucket=kb.oss_bucket
-        )
-        storage_type = 'oss'
-    else:
-        # 本地上传
-        upload_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), config.upload['dir'])
-        kb_dir = os.path.join(upload_dir, str(kb_id))
-        os.makedirs(kb_dir, exist_ok=True)
-        save_path = os.path.join(kb_dir, save_name)
-        file.file.seek(0)
-        with open(save_path, "wb") as f:
-            f.write(file.file.read())
-        file_url = f"/static/uploads/{kb_id}/{save_name}"
-        doc = create_document(
-            db, kb_id, file.filename, file_ext[1:].lower() if file_ext else '',
-            save_path, current_user.id, parsing_config=config_dict, status=doc_status
+    try:
+        doc, storage_type, file_url = store_uploaded_document(
+            db, kb, file, current_user.id, parsing_config=config_dict, status=doc_status
         )
-        storage_type = 'local'
+    except UploadError as e:
+        return BaseResponse(code=e.code, message=e.message)
 
     if doc.status == 'pending':
         dispatch_document_parse_task(doc.id)
@@ -14,6 +14,7 @@ from common.core.log import logger
 from common.core.config import config
 from contextlib import asynccontextmanager
 from common.schemas.response import BaseResponse
+from common.core.tracing import TracingMiddleware, metrics_response
 
 @asynccontextmanager
 async def lifespan(app):
@@ -27,13 +28,19 @@ app.add_middleware(
     allow_origins=config.cors['allow_origins'],
     allow_credentials=config.cors['allow_credentials'],
     allow_methods=config.cors['allow_methods'],
-    allow_headers=config.cors['allow_headers']
+    allow_headers=config.cors['allow_headers'],
+    expose_headers=["X-Trace-Id"]
 )
+app.add_middleware(TracingMiddleware, service="webapi", slow_request_ms=config.tracing.get('slow_request_ms', 1000))
 
 @app.get("/")
 def read_root():
     return {"msg": "Welcome to Knowra!"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 app.include_router(user.router, prefix="/api")
 app.include_router(knowledge_base.router, prefix="/api")
 app.include_router(document.router, prefix="/api")
@@ -20,6 +20,8 @@ def create_connection(db: Session, conn_in: ConnectionCreate, maintainer_id: int
         provider=conn_in.provider,
         api_base=conn_in.api_base,
         description=conn_in.description,
+        rate_limit_rpm=conn_in.rate_limit_rpm,
+        rate_limit_tpm=conn_in.rate_limit_tpm,
         api_key=encrypted_api_key,
         maintainer_id=maintainer_id,
         created_at=datetime.utcnow(),
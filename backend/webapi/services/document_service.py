@@ -5,7 +5,7 @@ from datetime import datetime
 from webapi.services.knowledge_base_service import get_kb
 
 # 创建文档
-def create_document(db: Session, kb_id: int, filename: str, filetype: str, filepath: str, uploader_id: int, parsing_config: Optional[Dict[str, Any]] = None, status: Optional[str] = None, oss_connection_id: Optional[int] = None, oss_bucket: Optional[str] = None) -> Document:
+def create_document(db: Session, kb_id: int, filename: str, filetype: str, filepath: str, uploader_id: int, parsing_config: Optional[Dict[str, Any]] = None, status: Optional[str] = None, oss_connection_id: Optional[int] = None, oss_bucket: Optional[str] = None, content_hash: Optional[str] = None, file_size: Optional[int] = None) -> Document:
     # 校验知识库是否绑定 collection
     kb = get_kb(db, kb_id)
     if not kb or not kb.collection_id:
@@ -23,7 +23,9 @@ def create_document(db: Session, kb_id: int, filename: str, filetype: str, filep
         fail_reason="",
         parsing_config=parsing_config,
         oss_connection_id=oss_connection_id,
-        oss_bucket=oss_bucket
+        oss_bucket=oss_bucket,
+        content_hash=content_hash,
+        file_size=file_size
     )
     db.add(doc)
     db.commit()
@@ -43,6 +45,12 @@ def delete_document(db: Session, doc: Document):
     db.delete(doc)
     db.commit()
 
+# 与该文档共用同一存储文件的其他文档数（内容去重后多个文档引用同一文件）
+def count_documents_sharing_file(db: Session, doc: Document) -> int:
+    if not doc.filepath:
+        return 0
+    return db.query(Document).filter(Document.filepath == doc.filepath, Document.id != doc.id).count()
+
 # 更新文档
 def update_document(db: Session, doc: Document, data: Dict[str, Any]):
     for key, value in data.items():
@@ -3,12 +3,13 @@ from common.core.config import config
 from common.db.session import SessionLocal
 from common.db.models import Document, DocumentStatus, KnowledgeBase, Model, Connection, VDBCollection, VDB
 from loguru import logger
+from common.core.tracing import get_trace_id
 from webapi.services.oss_connection_service import get_oss_connection
 from common.core.encryption import decrypt_api_key, encrypt_api_key
 import json
 import ast
 import os
-from common.schemas.worker import ParseFileTaskParams, FileInfo, OSSParams, EmbeddingParams, ParseParams, VectorDBCollectionConfig
+from common.schemas.worker import ParseFileTaskParams, FileInfo, OSSParams, EmbeddingParams, ParseParams, VectorDBCollectionConfig, CopySourceParams
 
 # 创建 Celery 实例（与 worker 保持一致）
 celery_app = Celery('knowra_app')
@@ -16,6 +17,70 @@ celery_app.conf.broker_url = 'redis://127.0.0.1:6379/0'
 celery_app.conf.result_backend = 'redis://127.0.0.1:6379/1'
 
 
+def _build_vdb_params(db, collection_id: int):
+    """根据 VDBCollection 组装 worker 使用的向量库参数（敏感字段加密传递）"""
+    collection = db.query(VDBCollection).filter(VDBCollection.id == collection_id).first() if collection_id else None
+    if not collection:
+        return None
+    vdb = db.query(VDB).filter(VDB.id == collection.vdb_id).first() if collection.vdb_id else None
+    if not vdb:
+        return None
+    # 兼容 connection_config 为 str 或 dict
+    vdb_config = vdb.connection_config
+    if isinstance(vdb_config, str):
+        try:
+            vdb_config = json.loads(vdb_config)
+        except json.JSONDecodeError:
+            try:
+                vdb_config = ast.literal_eval(vdb_config)
+            except Exception:
+                logger.error(f"[Dispatcher] vdb.connection_config 解析失败: {vdb_config}")
+                vdb_config = {}
+    vdb_config = dict(vdb_config or {})
+    for k in vdb_config:
+        if k in ('password', 'api_key', 'secret_key') and vdb_config[k]:
+            vdb_config[k] = encrypt_api_key(vdb_config[k])
+    return VectorDBCollectionConfig(
+        type=vdb.type,
+        collection_name=collection.name,
+        connection_config=vdb_config
+    )
+
+
+def _resolve_parse_params(doc: Document, kb: KnowledgeBase) -> ParseParams:
+    """文档自身解析配置优先，否则使用知识库默认分块参数"""
+    return ParseParams(
+        chunk_size=(doc.parsing_config or {}).get('chunk_size') or (kb.chunk_size if kb and hasattr(kb, 'chunk_size') else 1000),
+        overlap=(doc.parsing_config or {}).get('overlap') or (kb.overlap if kb and hasattr(kb, 'overlap') else 100),
+        length_unit=(doc.parsing_config or {}).get('length_unit') or 'char'
+    )
+
+
+def _find_vector_source(db, doc: Document, kb: KnowledgeBase, parse_params: ParseParams):
+    """
+    内容去重（upload.dedupe=vectors）：查找内容哈希相同、已解析完成，
+    且分块参数与向量模型一致的文档，返回可供 worker 复制向量的 CopySourceParams
+    """
+    if str(config.upload.get('dedupe', 'off')).lower() != 'vectors' or not doc.content_hash or not kb:
+        return None
+    candidates = db.query(Document).filter(
+        Document.content_hash == doc.content_hash,
+        Document.id != doc.id,
+        Document.status == DocumentStatus.PROCESSED,
+        Document.chunk_count > 0
+    ).order_by(Document.id.desc()).limit(20).all()
+    for source in candidates:
+        source_kb = db.query(KnowledgeBase).filter(KnowledgeBase.id == source.kb_id).first() if source.kb_id else None
+        if not source_kb or source_kb.embedding_model_id != kb.embedding_model_id:
+            continue
+        if _resolve_parse_params(source, source_kb) != parse_params:
+            continue
+        source_vdb = _build_vdb_params(db, source_kb.collection_id)
+        if source_vdb:
+            return CopySourceParams(doc_id=str(source.id), vdb=source_vdb)
+    return None
+
+
 def dispatch_document_parse_task(doc_id: int):
     """
     分发文档解析任务到 Celery worker。
@@ -37,39 +102,25 @@ def dispatch_document_parse_task(doc_id: int):
                     embedding_dim = getattr(model, 'embedding_dim', None)
                     if embedding_dim is None:
                         embedding_dim = -1
+                    # 模型 extra_config 原样传给 worker 的 embedder（dimensions、本地模型参数、连接池等），
+                    # 单条/单次请求的 token 上限未配置时 worker 按模型名与服务商推断
+                    extra_config = model.extra_config_dict
                     embedding_params = EmbeddingParams(
                         api_base=conn.api_base,
                         api_key=encrypt_api_key(conn.api_key),
                         model_name=model.model_name,
                         model_type='embedding',
                         embedding_dim=embedding_dim,
-                        provider=conn.provider
+                        provider=conn.provider,
+                        max_input_tokens=extra_config.get('max_input_tokens'),
+                        max_batch_tokens=extra_config.get('max_batch_tokens'),
+                        extra_config=extra_config or None,
+                        connection_id=conn.id,
+                        rate_limit_rpm=conn.rate_limit_rpm,
+                        rate_limit_tpm=conn.rate_limit_tpm
                     )
                 # vdb 配置
-                collection = db.query(VDBCollection).filter(VDBCollection.id == kb.collection_id).first() if kb.collection_id else None
-                if collection:
-                    vdb = db.query(VDB).filter(VDB.id == collection.vdb_id).first() if collection.vdb_id else None
-                    if vdb:
-                        # 兼容 connection_config 为 str 或 dict
-                        vdb_config = vdb.connection_config
-                        if isinstance(vdb_config, str):
-                            try:
-                                vdb_config = json.loads(vdb_config)
-                            except json.JSONDecodeError:
-                                try:
-                                    vdb_config = ast.literal_eval(vdb_config)
-                                except Exception:
-                                    logger.error(f"[Dispatcher] vdb.connection_config 解析失败: {vdb_config}")
-                                    vdb_config = {}
-                        vdb_config = dict(vdb_config or {})
-                        for k in vdb_config:
-                            if k in ('password', 'api_key', 'secret_key') and vdb_config[k]:
-                                vdb_config[k] = encrypt_api_key(vdb_config[k])
-                        vdb_params = VectorDBCollectionConfig(
-                            type=vdb.type,
-                            collection_name=collection.name,
-                            connection_config=vdb_config
-                        )
+                vdb_params = _build_vdb_params(db, kb.collection_id)
             # 如果是 OSS 文件，查出连接信息并加密传递
             oss_params = None
             if doc.oss_connection_id and doc.oss_bucket and str(doc.filepath).startswith('oss://'):
@@ -85,10 +136,10 @@ def dispatch_document_parse_task(doc_id: int):
                         bucket=doc.oss_bucket
                     )
             # 组装解析参数
-            parse_params = ParseParams(
-                chunk_size=(doc.parsing_config or {}).get('chunk_size') or (kb.chunk_size if kb and hasattr(kb, 'chunk_size') else 1000),
-                overlap=(doc.parsing_config or {}).get('overlap') or (kb.overlap if kb and hasattr(kb, 'overlap') else 100)
-            )
+            parse_params = _resolve_parse_params(doc, kb)
+            copy_from = _find_vector_source(db, doc, kb, parse_params)
+            if copy_from:
+                logger.info(f"[Dispatcher] 文档ID={doc_id} 内容与文档 {copy_from.doc_id} 相同，worker 将直接复制其向量")
             # 组装文件参数
             file_info = FileInfo(
                 path=doc.filepath,
@@ -105,12 +156,14 @@ def dispatch_document_parse_task(doc_id: int):
                 oss=oss_params,
                 embedding=embedding_params,
                 vdb=vdb_params,
-                parse_offset=0
+                parse_offset=0,
+                trace_id=get_trace_id(),
+                copy_from=copy_from
             )
             try:
                 logger.info(f"[Celery] 准备分发任务到 worker，params={params}")
                 celery_app.send_task('backend.worker.tasks.parse_file_task', args=[params.model_dump()])
-                logger.info(f"[Celery] 任务已成功分发到 worker，doc_id={doc_id}")
+                logger.info(f"[Celery] 任务已成功分发到 worker，doc_id={doc_id}, trace_id={params.trace_id}")
             except Exception as e:
                 logger.error(f"[Celery] 任务分发异常：{e}")
     finally:
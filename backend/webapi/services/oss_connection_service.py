@@ -4,7 +4,7 @@ from common.schemas.oss_connection import OSSConnectionCreate, OSSConnectionUpda
 from typing import List, Optional
 from datetime import datetime
 from common.core.encryption import encrypt_api_key, decrypt_api_key
-from common.utils.oss_client import OSSClient
+from common.utils.oss_client import OSSClient, get_oss_client, invalidate_oss_client
 
 
 def create_oss_connection(db: Session, conn_in: OSSConnectionCreate) -> OSSConnection:
@@ -52,6 +52,8 @@ def update_oss_connection(db: Session, conn_id: int, conn_in: OSSConnectionUpdat
     db_conn = get_oss_connection(db, conn_id)
     if not db_conn:
         return None
+    # 凭证或 endpoint 可能变更，使旧客户端缓存失效
+    invalidate_oss_client(db_conn.endpoint, decrypt_api_key(db_conn.access_key))
     update_data = conn_in.dict(exclude_unset=True)
     if 'access_key' in update_data and update_data['access_key'] is not None:
         update_data['access_key'] = encrypt_api_key(update_data['access_key'].get_secret_value())
@@ -72,6 +74,7 @@ def delete_oss_connection(db: Session, conn_id: int) -> bool:
     db_conn = get_oss_connection(db, conn_id)
     if not db_conn:
         return False
+    invalidate_oss_client(db_conn.endpoint, decrypt_api_key(db_conn.access_key))
     db.delete(db_conn)
     db.commit()
     return True
@@ -105,7 +108,7 @@ def test_oss_connection(endpoint: str, access_key: str, secret_key: str, region:
         return False, "连接失败"
 
 def list_buckets(endpoint: str, access_key: str, secret_key: str, region: Optional[str] = None):
-    client = OSSClient(endpoint, access_key, secret_key, region)
+    client = get_oss_client(endpoint, access_key, secret_key, region)
     return client.list_buckets()
 
 def get_buckets_by_connection(db: Session, conn_id: int):
@@ -0,0 +1,176 @@
+"""
+文本文档分页预览：通过稀疏行偏移索引定位页起点，开销与展示的页大小成正比
+- OSS 文件：索引存 Redis，按页发起 Range GET
+- 本地文件：索引按文件路径存到单独的缓存目录（upload.preview_index_dir），通过 mmap 读取
+"""
+
+import hashlib
+import mmap
+import os
+from typing import Dict
+
+from loguru import logger
+
+from common.core.config import config
+from common.utils.line_index import LineIndex, read_lines_page
+from common.utils.oss_client import OSSClient
+from common.utils.redis_client import get_key, set_key
+
+PREVIEW_MAX_LINES = 5000
+PREVIEW_MAX_CHARS = 50000
+STREAM_CHUNK_SIZE = 64 * 1024
+INDEX_TTL_SECONDS = 7 * 24 * 3600
+LOCAL_INDEX_SUFFIX = ".lineidx"
+
+
+class _BodyStream:
+    """把 botocore StreamingBody 包装为字节块迭代器，读取结束后可提前关闭连接"""
+
+    def __init__(self, body, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._body = body
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        return self._body.iter_chunks(self._chunk_size)
+
+    def close(self):
+        self._body.close()
+
+
+def _oss_index_key(oss_connection_id: int, bucket: str, key: str) -> str:
+    # 按存储对象而非文档建索引：内容去重后多个文档可共用同一个索引
+    return f"doc:preview:lineidx:oss:{oss_connection_id}:{bucket}:{key}"
+
+
+def _load_index(redis_key: str, version: str) -> LineIndex:
+    try:
+        raw = get_key(redis_key)
+        if raw:
+            index = LineIndex.from_json(raw)
+            if index.version == version:
+                return index
+    except Exception as e:
+        logger.warning(f"读取预览行索引失败 {redis_key}: {e}")
+    return LineIndex(version=version)
+
+
+def _save_index(redis_key: str, index: LineIndex) -> None:
+    try:
+        set_key(redis_key, index.to_json(), ex=INDEX_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"保存预览行索引失败 {redis_key}: {e}")
+
+
+def preview_oss_document(
+    client: OSSClient,
+    oss_connection_id: int,
+    bucket: str,
+    key: str,
+    offset: int,
+    max_lines: int = PREVIEW_MAX_LINES,
+    max_chars: int = PREVIEW_MAX_CHARS
+) -> Dict:
+    """
+    从 offset 行开始预览 OSS 上的文本文件。
+    首次访问时从文件头流式读取并建立索引，之后从最近的检查点发起 Range GET，
+    对象 ETag 变化时索引自动作废。
+    """
+    head = client.head_object(bucket, key)
+    size = int(head.get('ContentLength') or 0)
+    redis_key = _oss_index_key(oss_connection_id, bucket, key)
+    index = _load_index(redis_key, str(head.get('ETag', '')))
+
+    def open_stream(start: int):
+        if start >= size:
+            return iter(())
+        return _BodyStream(client.get_object_range(bucket, key, start)['Body'])
+
+    page, updated = read_lines_page(open_stream, index, offset, max_lines, max_chars)
+    if updated:
+        _save_index(redis_key, index)
+    return page
+
+
+def local_index_path(filepath: str) -> str:
+    """本地文件的行索引路径：不放在上传目录（静态托管）中，按文件绝对路径的哈希命名"""
+    index_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        config.upload.get('preview_index_dir', 'cache/preview_index')
+    )
+    name = hashlib.sha256(os.path.abspath(filepath).encode("utf-8")).hexdigest()
+    return os.path.join(index_dir, f"{name}{LOCAL_INDEX_SUFFIX}")
+
+
+def _load_local_index(index_path: str, version: str) -> LineIndex:
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = LineIndex.from_json(f.read())
+        if index.version == version:
+            return index
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"读取预览行索引失败 {index_path}: {e}")
+    return LineIndex(version=version)
+
+
+def _save_local_index(index_path: str, index: LineIndex) -> None:
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(index.to_json())
+        os.replace(tmp_path, index_path)
+    except Exception as e:
+        logger.warning(f"保存预览行索引失败 {index_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class _MmapStream:
+    """从指定偏移开始按块迭代内存映射文件"""
+
+    def __init__(self, f, mm: mmap.mmap, start: int, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._f = f
+        self._mm = mm
+        self._start = start
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        for pos in range(self._start, len(self._mm), self._chunk_size):
+            yield self._mm[pos:pos + self._chunk_size]
+
+    def close(self):
+        self._mm.close()
+        self._f.close()
+
+
+def preview_local_document(
+    filepath: str,
+    offset: int,
+    max_lines: int = PREVIEW_MAX_LINES,
+    max_chars: int = PREVIEW_MAX_CHARS
+) -> Dict:
+    """
+    从 offset 行开始预览本地文本文件。
+    行偏移索引首次访问时惰性建立并持久化到缓存目录（见 local_index_path），文件修改时间或大小变化时重建。
+    """
+    stat = os.stat(filepath)
+    index_path = local_index_path(filepath)
+    index = _load_local_index(index_path, f"{stat.st_mtime_ns}:{stat.st_size}")
+
+    def open_stream(start: int):
+        if start >= stat.st_size:
+            return iter(())
+        f = open(filepath, "rb")
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        return _MmapStream(f, mm, start)
+
+    page, updated = read_lines_page(open_stream, index, offset, max_lines, max_chars, translate_crlf=True)
+    if updated:
+        _save_local_index(index_path, index)
+    return page
@@ -0,0 +1,228 @@
+"""文档上传：本地流式落盘 / OSS 分片上传，边传边计算内容 sha256，单个请求内存占用恒定"""
+
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from fastapi import UploadFile
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from common.core.config import config
+from common.core.encryption import decrypt_api_key
+from common.db.models import Document, KnowledgeBase, OSSConnection
+from common.utils.oss_client import OSSClient, build_transfer_config, get_oss_client
+from webapi.services.document_service import create_document
+
+
+class UploadError(Exception):
+    """上传失败，code 对应接口返回的业务码"""
+
+    def __init__(self, message: str, code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class HashingReader:
+    """
+    边读边计算 sha256 的只读包装。
+    只暴露 read，boto3 会按不可 seek 的流顺序读取各分片，保证哈希与上传内容一致。
+    """
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        if data:
+            self._hash.update(data)
+            self.size += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+DEDUPE_POLICIES = ('off', 'storage', 'vectors')
+
+
+def get_upload_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), config.upload['dir'])
+
+
+def get_dedupe_policy() -> str:
+    """内容去重策略：off / storage（复用存储文件）/ vectors（另复制已有向量）"""
+    policy = str(config.upload.get('dedupe', 'off')).lower()
+    if policy not in DEDUPE_POLICIES:
+        logger.warning(f"未知的去重策略 upload.dedupe={policy}，按 off 处理")
+        return 'off'
+    return policy
+
+
+def hash_fileobj(fileobj: BinaryIO, chunk_size: Optional[int] = None) -> Tuple[str, int]:
+    """
+    分块计算可 seek 文件的 sha256，完成后回到文件开头
+
+    Returns:
+        (sha256, 文件字节数)
+    """
+    chunk_size = chunk_size or int(config.upload.get('stream_chunk_kb', 1024)) * 1024
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def find_stored_duplicate(db: Session, kb: KnowledgeBase, content_hash: str) -> Optional[Document]:
+    """
+    查找内容相同且存储位置可复用的文档：
+    知识库绑定 OSS 时要求同一连接与 bucket，本地存储时要求文件仍然存在
+    """
+    query = db.query(Document).filter(Document.content_hash == content_hash)
+    use_oss = bool(kb.oss_connection_id and kb.oss_bucket)
+    if use_oss:
+        query = query.filter(Document.oss_connection_id == kb.oss_connection_id, Document.oss_bucket == kb.oss_bucket)
+    else:
+        query = query.filter(Document.oss_connection_id.is_(None))
+    for doc in query.order_by(Document.id.desc()).limit(20):
+        if not doc.filepath:
+            continue
+        if use_oss and str(doc.filepath).startswith('oss://'):
+            return doc
+        if not use_oss and os.path.exists(doc.filepath):
+            return doc
+    return None
+
+
+def save_local_upload(fileobj: BinaryIO, save_path: str, chunk_size: Optional[int] = None) -> Tuple[str, int]:
+    """
+    分块写入本地文件，先写临时文件再原子重命名，避免中断时留下半截文件
+
+    Returns:
+        (sha256, 文件字节数)
+    """
+    chunk_size = chunk_size or int(config.upload.get('stream_chunk_kb', 1024)) * 1024
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = f"{save_path}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, save_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), size
+
+
+def upload_to_oss(client: OSSClient, fileobj: BinaryIO, bucket: str, key: str) -> Tuple[str, int]:
+    """
+    分片上传到 OSS（分片大小、并发数见 upload 配置）
+
+    Returns:
+        (sha256, 文件字节数)
+    """
+    reader = HashingReader(fileobj)
+    client.upload_fileobj(reader, bucket, key, transfer_config=build_transfer_config(config.upload))
+    return reader.hexdigest(), reader.size
+
+
+def store_uploaded_document(
+    db: Session,
+    kb: KnowledgeBase,
+    file: UploadFile,
+    uploader_id: int,
+    parsing_config: Optional[Dict[str, Any]] = None,
+    status: Optional[str] = None
+) -> Tuple[Document, str, str]:
+    """
+    保存上传文件（本地或知识库绑定的 OSS）并创建文档记录
+
+    Returns:
+        (文档, 存储类型 local/oss, 文件访问地址)
+    Raises:
+        UploadError
+    """
+    file_ext = os.path.splitext(file.filename)[1]
+    filetype = file_ext[1:].lower() if file_ext else ''
+    save_name = f"{int(datetime.utcnow().timestamp())}{file_ext}"
+    file.file.seek(0)
+
+    # 内容去重：先在本地临时文件上计算哈希，命中则直接引用已存储的文件
+    if get_dedupe_policy() != 'off':
+        content_hash, file_size = hash_fileobj(file.file)
+        existing = find_stored_duplicate(db, kb, content_hash)
+        if existing:
+            doc = create_document(
+                db, kb.id, file.filename, filetype, existing.filepath, uploader_id,
+                parsing_config=parsing_config, status=status,
+                oss_connection_id=existing.oss_connection_id, oss_bucket=existing.oss_bucket,
+                content_hash=content_hash, file_size=file_size
+            )
+            if existing.oss_connection_id:
+                storage_type, file_url = 'oss', existing.filepath
+            else:
+                rel_path = os.path.relpath(existing.filepath, get_upload_dir()).replace(os.sep, '/')
+                storage_type, file_url = 'local', f"/static/uploads/{rel_path}"
+            logger.info(f"内容去重命中: kb_id={kb.id}, doc_id={doc.id} 复用文档 {existing.id} 的存储文件 {existing.filepath}")
+            return doc, storage_type, file_url
+
+    if kb.oss_connection_id and kb.oss_bucket:
+        oss_conn = db.query(OSSConnection).filter(OSSConnection.id == kb.oss_connection_id).first()
+        if not oss_conn:
+            raise UploadError("OSS 连接不存在", code=400)
+        uploader = get_oss_client(
+            endpoint_url=oss_conn.endpoint,
+            access_key=decrypt_api_key(oss_conn.access_key),
+            secret_key=decrypt_api_key(oss_conn.secret_key),
+            region=oss_conn.region
+        )
+        oss_key = save_name  # 直接用唯一文件名，不再拼接kb_id
+        try:
+            content_hash, file_size = upload_to_oss(uploader, file.file, kb.oss_bucket, oss_key)
+        except Exception as e:
+            raise UploadError(f"OSS 上传失败: {e}")
+        file_url = f"oss://{kb.oss_bucket}/{oss_key}"
+        doc = create_document(
+            db, kb.id, file.filename, filetype, file_url, uploader_id,
+            parsing_config=parsing_config, status=status,
+            oss_connection_id=kb.oss_connection_id, oss_bucket=kb.oss_bucket,
+            content_hash=content_hash, file_size=file_size
+        )
+        storage_type = 'oss'
+    else:
+        kb_dir = os.path.join(get_upload_dir(), str(kb.id))
+        os.makedirs(kb_dir, exist_ok=True)
+        save_path = os.path.join(kb_dir, save_name)
+        try:
+            content_hash, file_size = save_local_upload(file.file, save_path)
+        except OSError as e:
+            raise UploadError(f"文件保存失败: {e}")
+        file_url = f"/static/uploads/{kb.id}/{save_name}"
+        doc = create_document(
+            db, kb.id, file.filename, filetype, save_path, uploader_id,
+            parsing_config=parsing_config, status=status,
+            content_hash=content_hash, file_size=file_size
+        )
+        storage_type = 'local'
+
+    logger.debug(f"文件已保存: kb_id={kb.id}, storage={storage_type}, size={file_size}, sha256={content_hash}")
+    return doc, storage_type, file_url
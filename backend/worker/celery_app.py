@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 import os
 
 # 创建Celery应用实例
@@ -45,5 +46,23 @@ app.conf.update(
 # 自动发现任务模块
 app.autodiscover_tasks(['worker'])
 
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    """worker 主进程启动时暴露 Prometheus 指标（含队列积压）"""
+    from worker.config.worker_config import worker_config
+    if not worker_config.metrics_enabled:
+        return
+    from worker.utils.metrics import start_metrics_server
+    queues = [q.strip() for q in worker_config.metrics_queues.split(',') if q.strip()]
+    start_metrics_server(worker_config.metrics_port, broker_url=app.conf.broker_url, queues=queues)
+
+
+@worker_process_shutdown.connect
+def cleanup_worker_metrics(pid=None, **kwargs):
+    """prefork 子进程退出时清理多进程指标文件"""
+    from worker.utils.metrics import mark_process_dead
+    mark_process_dead(pid or os.getpid())
+
 if __name__ == '__main__':
     app.start() 
\ No newline at end of file
@@ -34,6 +34,44 @@ class WorkerConfig(BaseModel):
     auto_cleanup_temp_files: bool = Field(default=True, description="是否自动清理临时文件")
     max_temp_file_size: int = Field(default=100 * 1024 * 1024, description="最大临时文件大小(字节)")
     
+    # OSS分段下载
+    download_part_size: int = Field(default=8 * 1024 * 1024, description="OSS分段下载的分段大小(字节)")
+    download_concurrency: int = Field(default=4, description="OSS分段下载并发数")
+    download_part_retries: int = Field(default=3, description="OSS单个分段失败后的续传重试次数")
+    stream_parse_enabled: bool = Field(default=True, description="TXT/MD 是否边下载边解析")
+    
+    # 进程池解析（PDF页范围、DOCX正文区段）
+    parse_workers: int = Field(default=0, description="进程池解析的进程数(0为按CPU核数，最多4；1为不启用)")
+    pdf_parallel_min_pages: int = Field(default=200, description="页数达到该值时启用PDF并行解析")
+    docx_parallel_min_elements: int = Field(default=5000, description="正文元素数达到该值时启用DOCX并行解析")
+    
+    # embedding 请求
+    embedding_batch_size: int = Field(default=16, description="每次embedding请求的最大分块数")
+    embedding_max_input_tokens: int = Field(default=512, description="未知模型的单条输入token上限")
+    embedding_max_concurrency: int = Field(default=16, description="单个任务embedding并发上限（自适应并发的上界）")
+    embedding_max_retries: int = Field(default=5, description="embedding过载/超时失败的最大重试次数")
+    embedding_retry_base_delay: float = Field(default=0.5, description="embedding重试退避的基础时间(秒)")
+    embedding_retry_max_delay: float = Field(default=30.0, description="embedding重试退避的最长时间(秒)")
+    rate_limit_reserve_ratio: float = Field(default=0.2, description="Connection限流预算中保留给检索查询的比例")
+    rate_limit_wait_timeout: float = Field(default=600.0, description="等待限流令牌的最长时间(秒)")
+    
+    # 本机 embedding 网关（worker 侧通过 EMBEDDING_GATEWAY_URL 启用）
+    embedding_gateway_host: str = Field(default="127.0.0.1", description="embedding网关监听地址")
+    embedding_gateway_port: int = Field(default=8090, description="embedding网关监听端口")
+    embedding_gateway_max_batch_size: int = Field(default=64, description="网关合并后每批最大条数")
+    embedding_gateway_max_batch_tokens: int = Field(default=0, description="网关合并后每批最大token数(0为按服务商上限)")
+    embedding_gateway_max_wait_ms: int = Field(default=20, description="网关等待合并的最长时间(毫秒)")
+    embedding_gateway_max_inflight: int = Field(default=4, description="每个上游模型同时执行的批次数")
+    
+    # 源文件缓存（重试、重新解析时复用已下载的OSS文件）
+    source_cache_enabled: bool = Field(default=True, description="是否缓存已下载的OSS源文件")
+    source_cache_max_bytes: int = Field(default=2 * 1024 * 1024 * 1024, description="源文件缓存总大小上限(字节)")
+    
+    # 监控指标
+    metrics_enabled: bool = Field(default=True, description="是否暴露Prometheus指标")
+    metrics_port: int = Field(default=9808, description="Prometheus指标端口")
+    metrics_queues: str = Field(default="file_parsing", description="上报积压长度的Celery队列，逗号分隔")
+    
     @classmethod
     def from_env(cls) -> "WorkerConfig":
         """从环境变量创建配置"""
@@ -59,6 +97,34 @@ class WorkerConfig(BaseModel):
             
             auto_cleanup_temp_files=os.getenv("AUTO_CLEANUP_TEMP_FILES", "true").lower() == "true",
             max_temp_file_size=int(os.getenv("MAX_TEMP_FILE_SIZE", str(100 * 1024 * 1024))),
+            
+            download_part_size=int(os.getenv("WORKER_DOWNLOAD_PART_SIZE_MB", "8")) * 1024 * 1024,
+            download_concurrency=int(os.getenv("WORKER_DOWNLOAD_CONCURRENCY", "4")),
+            download_part_retries=int(os.getenv("WORKER_DOWNLOAD_PART_RETRIES", "3")),
+            stream_parse_enabled=os.getenv("WORKER_STREAM_PARSE", "true").lower() == "true",
+            parse_workers=int(os.getenv("WORKER_PARSE_WORKERS", "0")),
+            pdf_parallel_min_pages=int(os.getenv("WORKER_PDF_PARALLEL_MIN_PAGES", "200")),
+            docx_parallel_min_elements=int(os.getenv("WORKER_DOCX_PARALLEL_MIN_ELEMENTS", "5000")),
+            embedding_batch_size=int(os.getenv("WORKER_EMBEDDING_BATCH_SIZE", "16")),
+            embedding_max_input_tokens=int(os.getenv("WORKER_EMBEDDING_MAX_INPUT_TOKENS", "512")),
+            embedding_max_concurrency=int(os.getenv("WORKER_EMBEDDING_MAX_CONCURRENCY", "16")),
+            embedding_max_retries=int(os.getenv("WORKER_EMBEDDING_MAX_RETRIES", "5")),
+            embedding_retry_base_delay=float(os.getenv("WORKER_EMBEDDING_RETRY_BASE_DELAY", "0.5")),
+            embedding_retry_max_delay=float(os.getenv("WORKER_EMBEDDING_RETRY_MAX_DELAY", "30")),
+            rate_limit_reserve_ratio=float(os.getenv("WORKER_RATE_LIMIT_RESERVE_RATIO", "0.2")),
+            rate_limit_wait_timeout=float(os.getenv("WORKER_RATE_LIMIT_WAIT_TIMEOUT", "600")),
+            embedding_gateway_host=os.getenv("WORKER_EMBEDDING_GATEWAY_HOST", "127.0.0.1"),
+            embedding_gateway_port=int(os.getenv("WORKER_EMBEDDING_GATEWAY_PORT", "8090")),
+            embedding_gateway_max_batch_size=int(os.getenv("WORKER_EMBEDDING_GATEWAY_MAX_BATCH_SIZE", "64")),
+            embedding_gateway_max_batch_tokens=int(os.getenv("WORKER_EMBEDDING_GATEWAY_MAX_BATCH_TOKENS", "0")),
+            embedding_gateway_max_wait_ms=int(os.getenv("WORKER_EMBEDDING_GATEWAY_MAX_WAIT_MS", "20")),
+            embedding_gateway_max_inflight=int(os.getenv("WORKER_EMBEDDING_GATEWAY_MAX_INFLIGHT", "4")),
+            source_cache_enabled=os.getenv("WORKER_SOURCE_CACHE_ENABLED", "true").lower() == "true",
+            source_cache_max_bytes=int(os.getenv("WORKER_SOURCE_CACHE_MAX_MB", "2048")) * 1024 * 1024,
+            
+            metrics_enabled=os.getenv("WORKER_METRICS_ENABLED", "true").lower() == "true",
+            metrics_port=int(os.getenv("WORKER_METRICS_PORT", "9808")),
+            metrics_queues=os.getenv("WORKER_METRICS_QUEUES", "file_parsing"),
         )
 
 
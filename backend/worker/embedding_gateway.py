@@ -0,0 +1,280 @@
+"""
+本机 embedding 网关（每个节点一个进程）
+
+worker 各子进程/线程通过 GatewayEmbedder 把分块提交到网关，网关按上游模型配置分队列，
+在 max_wait 时间窗口内把不同任务的请求合并成批次（条数、token 数不超过上限）再调用模型服务，
+结果按请求拆回。所有上游批次都在执行时，新请求继续累积，下一批自然变大。
+
+- 检索查询（flush=True）到达时立即发出当前队列中的批次，不等待时间窗口
+- 上游过载（429/5xx/超时）时返回 429/503 并透传 Retry-After，由 worker 的自适应并发退避重试；
+  其他上游错误返回 422，worker 不重试
+- 合并批次因非过载错误失败时按请求拆分重试，只有出错的请求失败
+
+启动（backend 目录下）：
+    python -m worker.embedding_gateway
+worker 侧设置 EMBEDDING_GATEWAY_URL=http://127.0.0.1:8090 后，EmbedderFactory 创建的 embedder 即经网关发送。
+"""
+
+import asyncio
+import json
+import math
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Literal, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from common.utils.tokenizer import get_max_batch_tokens, get_token_counter
+from common.utils.vector_codec import encode_float32_base64
+from core.model.embedder.base import Embedder
+from core.model.embedder.factory import EmbedderFactory
+from worker.config.worker_config import worker_config
+from worker.utils.adaptive_concurrency import is_overload_error, retry_after_seconds
+
+
+class _Request:
+    """一次客户端请求，所有文本的向量都返回后完成"""
+
+    __slots__ = ("future", "size", "results", "remaining")
+
+    def __init__(self, future: asyncio.Future, size: int):
+        self.future = future
+        self.size = size
+        self.results: Optional[np.ndarray] = None
+        self.remaining = size
+
+
+class _Item:
+    __slots__ = ("request", "index", "text", "tokens", "flush", "enqueued_at")
+
+    def __init__(self, request: _Request, index: int, text: str, tokens: int, flush: bool, enqueued_at: float):
+        self.request = request
+        self.index = index
+        self.text = text
+        self.tokens = tokens
+        self.flush = flush
+        self.enqueued_at = enqueued_at
+
+
+class BatchQueue:
+    """
+    单个上游模型的合并队列
+
+    Args:
+        embedder: 上游 embedder（直连模型服务）
+        max_batch_size: 每批最大条数
+        max_batch_tokens: 每批最大 token 数（单条超过时单独成批）
+        max_wait: 第一条入队后最多等待的秒数
+        max_inflight: 同时执行的上游批次数
+        count_tokens: token 计数函数
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_batch_size: int,
+        max_batch_tokens: int,
+        max_wait: float,
+        max_inflight: int,
+        count_tokens: Callable[[str], int]
+    ):
+        self.embedder = embedder
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_batch_tokens = max(max_batch_tokens, 1)
+        self.max_wait = max_wait
+        self.count_tokens = count_tokens
+        self._items: Deque[_Item] = deque()
+        self._pending_tokens = 0
+        self._pending_flush = 0
+        self._changed = asyncio.Event()
+        self._slots = asyncio.Semaphore(max(max_inflight, 1))
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def submit(self, texts: List[str], flush: bool = False) -> np.ndarray:
+        """返回 (len(texts), dim) 的 float32 数组"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        loop = asyncio.get_running_loop()
+        request = _Request(loop.create_future(), len(texts))
+        now = loop.time()
+        for index, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            self._items.append(_Item(request, index, text, tokens, flush, now))
+            self._pending_tokens += tokens
+        if flush:
+            self._pending_flush += len(texts)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._changed.set()
+        return await request.future
+
+    def _ready(self) -> bool:
+        return (
+            len(self._items) >= self.max_batch_size
+            or self._pending_tokens >= self.max_batch_tokens
+            or self._pending_flush > 0
+        )
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self._items:
+                self._changed.clear()
+                await self._changed.wait()
+            deadline = self._items[0].enqueued_at + self.max_wait
+            while not self._ready():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            # 等待上游名额期间继续累积请求，上游越忙批次越大
+            await self._slots.acquire()
+            batch = self._take_batch()
+            if not batch:
+                self._slots.release()
+                continue
+            asyncio.create_task(self._run(batch))
+
+    def _take_batch(self) -> List[_Item]:
+        batch: List[_Item] = []
+        tokens = 0
+        while self._items and len(batch) < self.max_batch_size:
+            item = self._items[0]
+            if item.request.future.done():
+                # 客户端已断开或同一请求的其他批次已失败
+                self._pop()
+                continue
+            if batch and tokens + item.tokens > self.max_batch_tokens:
+                break
+            batch.append(self._pop())
+            tokens += item.tokens
+        return batch
+
+    def _pop(self) -> _Item:
+        item = self._items.popleft()
+        self._pending_tokens -= item.tokens
+        if item.flush:
+            self._pending_flush -= 1
+        return item
+
+    async def _embed(self, items: List[_Item]) -> np.ndarray:
+        vectors = await asyncio.get_running_loop().run_in_executor(
+            None, self.embedder.embed_documents_array, [item.text for item in items]
+        )
+        if len(vectors) != len(items):
+            raise ValueError(f"上游返回向量数 {len(vectors)} 与输入条数 {len(items)} 不一致")
+        return vectors
+
+    async def _run(self, batch: List[_Item]) -> None:
+        try:
+            vectors = await self._embed(batch)
+        except Exception as e:
+            groups: Dict[int, List[_Item]] = {}
+            for item in batch:
+                groups.setdefault(id(item.request), []).append(item)
+            if len(groups) == 1 or is_overload_error(e):
+                logger.warning(f"embedding 网关批次失败: 条数={len(batch)}, 错误={e}")
+                self._fail(batch, e)
+                return
+            # 非过载错误（如某条输入非法）：按请求拆开重试，只让出错的请求失败，不牵连合并进来的其他任务
+            logger.warning(f"embedding 网关批次失败，按请求拆分重试: 请求数={len(groups)}, 错误={e}")
+            for items in groups.values():
+                try:
+                    self._deliver(items, await self._embed(items))
+                except Exception as request_error:
+                    self._fail(items, request_error)
+            return
+        finally:
+            self._slots.release()
+        logger.debug(f"embedding 网关批次完成: 条数={len(batch)}, 请求数={len({id(item.request) for item in batch})}")
+        self._deliver(batch, vectors)
+
+    @staticmethod
+    def _fail(items: List[_Item], error: Exception) -> None:
+        for item in items:
+            if not item.request.future.done():
+                item.request.future.set_exception(error)
+
+    @staticmethod
+    def _deliver(items: List[_Item], vectors: np.ndarray) -> None:
+        for item, vector in zip(items, vectors):
+            request = item.request
+            if request.future.done():
+                continue
+            if request.results is None:
+                request.results = np.empty((request.size, vectors.shape[1]), dtype=np.float32)
+            request.results[item.index] = vector
+            request.remaining -= 1
+            if request.remaining == 0:
+                request.future.set_result(request.results)
+
+
+class EmbedRequest(BaseModel):
+    upstream: Dict[str, Any] = Field(..., description="上游模型配置（provider、model_name、api_base、api_key 等）")
+    texts: List[str]
+    flush: bool = Field(default=False, description="是否立即发出当前批次（检索查询）")
+    encoding: Literal["float", "base64"] = Field(default="float", description="返回格式：float 列表或 base64（小端 float32）")
+
+
+app = FastAPI(title="Embedding Gateway")
+_queues: Dict[str, BatchQueue] = {}
+
+
+def _get_queue(upstream: Dict[str, Any]) -> BatchQueue:
+    key = json.dumps(upstream, sort_keys=True, ensure_ascii=False)
+    queue = _queues.get(key)
+    if queue is None:
+        # direct=True：网关进程即使设置了 EMBEDDING_GATEWAY_URL 也直连模型服务
+        embedder = EmbedderFactory.create(dict(upstream, direct=True))
+        queue = BatchQueue(
+            embedder,
+            max_batch_size=worker_config.embedding_gateway_max_batch_size,
+            max_batch_tokens=worker_config.embedding_gateway_max_batch_tokens
+            or get_max_batch_tokens(upstream.get("provider")),
+            max_wait=worker_config.embedding_gateway_max_wait_ms / 1000.0,
+            max_inflight=worker_config.embedding_gateway_max_inflight,
+            count_tokens=get_token_counter(upstream.get("model_name")).count
+        )
+        _queues[key] = queue
+        logger.info(f"embedding 网关新建队列: provider={upstream.get('provider')}, model={upstream.get('model_name')}")
+    return queue
+
+
+@app.post("/embed")
+async def embed(req: EmbedRequest):
+    try:
+        queue = _get_queue(req.upstream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        embeddings = await queue.submit(req.texts, req.flush)
+    except Exception as e:
+        if not is_overload_error(e):
+            # 确定性失败（输入非法、鉴权失败等）不能用 5xx，否则 worker 会当作过载重试并降低并发
+            raise HTTPException(status_code=422, detail=f"上游 embedding 失败: {e}")
+        upstream_status = getattr(getattr(e, "response", None), "status_code", None)
+        retry_after = retry_after_seconds(e)
+        raise HTTPException(
+            status_code=429 if upstream_status == 429 else 503,
+            detail=f"上游 embedding 过载: {e}",
+            headers={"Retry-After": str(math.ceil(retry_after))} if retry_after else None
+        )
+    if req.encoding == "base64":
+        return {"embeddings": encode_float32_base64(embeddings), "dim": int(embeddings.shape[1]) if embeddings.size else 0}
+    return {"embeddings": embeddings.tolist()}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "queues": len(_queues)}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=worker_config.embedding_gateway_host, port=worker_config.embedding_gateway_port)
@@ -3,9 +3,11 @@
 from .task_state_manager import TaskStateManager
 from .progress_manager import ProgressManager
 from .resource_manager import ResourceManager
+from .source_cache import SourceCache
 
 __all__ = [
     "TaskStateManager",
     "ProgressManager", 
-    "ResourceManager"
+    "ResourceManager",
+    "SourceCache"
 ] 
\ No newline at end of file
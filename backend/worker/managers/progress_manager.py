@@ -6,6 +6,7 @@ from loguru import logger
 
 from worker.config.worker_config import worker_config
 from worker.utils.worker_utils import format_progress_message
+from worker.utils.metrics import stage_span
 
 
 class ProgressManager:
@@ -26,8 +27,12 @@ class ProgressManager:
     
     def send_progress_callback(self, doc_id: int, status: str, current_offset: Optional[int] = None, retry_count: int = 0, chunk_count: Optional[int] = None, fail_reason: Optional[str] = None) -> bool:
         """
-        发送进度回调到API服务
+        发送进度回调到API服务（含重试，整体计入 progress_callback 阶段耗时）
         """
+        with stage_span("progress_callback"):
+            return self._send_progress_callback(doc_id, status, current_offset, retry_count, chunk_count, fail_reason)
+    
+    def _send_progress_callback(self, doc_id: int, status: str, current_offset: Optional[int] = None, retry_count: int = 0, chunk_count: Optional[int] = None, fail_reason: Optional[str] = None) -> bool:
         if not doc_id:
             logger.warning("doc_id为空，跳过进度回调")
             return False
@@ -68,7 +73,7 @@ class ProgressManager:
         logger.info(f"准备重试进度回调: doc_id={doc_id}, 重试次数={retry_count + 1}")
         import time
         time.sleep(min(2 ** retry_count, 10))
-        return self.send_progress_callback(doc_id, status, current_offset, retry_count + 1)
+        return self._send_progress_callback(doc_id, status, current_offset, retry_count + 1)
     
     def send_status_callback(self, doc_id: int, status: str) -> bool:
         """
@@ -0,0 +1,143 @@
+"""源文件缓存：按 (bucket, key, ETag) 缓存已下载的 OSS 对象，按总字节数 LRU 淘汰"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+from loguru import logger
+
+from worker.config.worker_config import worker_config
+from worker.utils.worker_utils import ensure_directory, format_file_size
+
+LOCK_FILE = ".lock"
+
+
+class SourceCache:
+    """
+    Worker 本地源文件缓存，目录位于 temp_dir/source_cache
+
+    - 条目以硬链接方式交给任务：任务拿到的是自己的临时文件（照常由 ResourceManager 清理），
+      缓存淘汰只删除缓存中的链接，不影响正在使用该文件的任务
+    - 最近使用时间记录在文件 mtime 上，按总字节数从最久未使用的条目开始淘汰
+    - 写入、命中、淘汰都在目录级 flock 内进行，Celery prefork 的多个子进程可以安全共享
+    """
+
+    def __init__(self, config=None):
+        self.config = config or worker_config
+        self.cache_dir = os.path.join(self.config.temp_dir, "source_cache")
+        self.max_bytes = self.config.source_cache_max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.source_cache_enabled and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(endpoint: str, bucket: str, key: str, etag: str) -> str:
+        raw = "\n".join([endpoint or "", bucket, key, etag.strip('"')])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, cache_key: str) -> str:
+        return os.path.join(self.cache_dir, cache_key)
+
+    @contextmanager
+    def _locked(self):
+        ensure_directory(self.cache_dir)
+        with open(os.path.join(self.cache_dir, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _link_or_copy(src: str, dst: str) -> None:
+        """把 src 原子地放到 dst（覆盖），优先硬链接，跨文件系统时复制"""
+        tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+        try:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+            os.replace(tmp, dst)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def fetch(self, cache_key: str, dest_path: str) -> bool:
+        """
+        命中时把缓存文件放到 dest_path 并刷新最近使用时间
+
+        Returns:
+            是否命中
+        """
+        if not self.enabled:
+            return False
+        try:
+            with self._locked():
+                entry = self._entry_path(cache_key)
+                if not os.path.exists(entry):
+                    return False
+                self._link_or_copy(entry, dest_path)
+                os.utime(entry)
+            logger.info(f"源文件缓存命中: {cache_key[:12]} -> {dest_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"读取源文件缓存失败 {cache_key[:12]}: {e}")
+            return False
+
+    def store(self, cache_key: str, src_path: str) -> bool:
+        """把下载完成的文件加入缓存（超过缓存上限的文件不缓存），之后按需淘汰"""
+        if not self.enabled:
+            return False
+        try:
+            size = os.path.getsize(src_path)
+            if size > self.max_bytes:
+                return False
+            with self._locked():
+                self._link_or_copy(src_path, self._entry_path(cache_key))
+                self._evict()
+            logger.debug(f"源文件已加入缓存: {cache_key[:12]} ({format_file_size(size)})")
+            return True
+        except Exception as e:
+            logger.warning(f"写入源文件缓存失败 {cache_key[:12]}: {e}")
+            return False
+
+    def _evict(self) -> int:
+        """在锁内调用：按 mtime 从旧到新删除条目，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name == LOCK_FILE or name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.debug(f"源文件缓存淘汰 {removed} 个条目，当前 {format_file_size(total)}")
+        return removed
+
+    def clear(self) -> None:
+        if not os.path.isdir(self.cache_dir):
+            return
+        with self._locked():
+            for name in os.listdir(self.cache_dir):
+                if name != LOCK_FILE:
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -1,10 +1,10 @@
 """文档处理器 - 主要的任务编排器"""
 
 import asyncio
-from typing import Dict, Any, Optional, Iterator, Tuple
+import time
+from typing import Dict, Any, List, Optional, Iterator, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from loguru import logger
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from common.schemas.worker import ParseFileTaskParams, ChunkMetadata, VectorDBCollectionConfig
 from core.model import ModelFactory
@@ -17,9 +17,21 @@ from worker.managers.resource_manager import ResourceManager
 from worker.exceptions.worker_exceptions import (
     WorkerBaseException, ValidationException, TaskCancelledException
 )
-from worker.utils.worker_utils import performance_monitor, validate_task_params
-from core.file_parser import TextFileParser, WordFileParser
-from core.file_parser.base_parser import ChunkParams
+from worker.utils.worker_utils import performance_monitor, validate_task_params, get_file_size, is_oss_path
+from worker.services.ranged_download import RangedDownload
+from common.utils.text_splitter import CHUNKER_VERSION, FastRecursiveSplitter, split_markdown_stream, split_text_stream
+from common.utils.tokenizer import get_length_function, get_max_batch_tokens, get_max_input_tokens, get_token_counter
+from common.utils.rate_limiter import get_connection_limiter, PRIORITY_BACKGROUND
+from common.utils.vector_codec import to_float32_array
+from core.model.embedder.precomputed import PrecomputedEmbedder
+from core.model.embedder.rate_limited import RateLimitedEmbedder
+from worker.utils.adaptive_concurrency import AdaptiveConcurrency
+from worker.utils.metrics import (
+    stage_span, timed_iter, InstrumentedEmbedder, record_error, CHUNKS_PROCESSED, BYTES_PARSED, STAGE_DURATION,
+    EMBEDDING_RETRIES
+)
+from core.file_parser import TextFileParser, WordFileParser, PdfFileParser
+from core.file_parser.chunker import StructuredChunker
 from common.schemas.model import ModelConfig
 from common.core.encryption import decrypt_api_key
 
@@ -61,13 +73,20 @@ class DocumentProcessor:
                 self.task_state_manager.set_task_state(task_id, TaskState.PROCESSING)
                 self.progress_manager.notify_task_start(task_id, doc_id)
                 
-                # 3. 文件下载
-                logger.info(f"[{task_id}] 开始下载文件: {params.file.path}")
-                local_file_path = self._download_file(params)
-                
-                # 4. 流式处理：边切块边embedding边入库
-                logger.info(f"[{task_id}] 开始流式处理：分块->向量化->存储")
-                total_chunks, processed_chunks = self._stream_process_chunks(params, local_file_path)
+                # 3. 内容去重：存在相同内容的已解析文档时直接复制向量
+                copied_chunks = self._copy_vectors_from_source(params) if params.copy_from else 0
+                if copied_chunks:
+                    local_file_path = None
+                    total_chunks = processed_chunks = copied_chunks
+                else:
+                    # 4. 文件下载（OSS 上的 TXT/MD 不等待下载完成，边下载边解析）
+                    logger.info(f"[{task_id}] 开始下载文件: {params.file.path}")
+                    download = self._start_streaming_download(params)
+                    local_file_path = download.dest_path if download else self._download_file(params)
+                    
+                    # 5. 流式处理：边切块边embedding边入库
+                    logger.info(f"[{task_id}] 开始流式处理：分块->向量化->存储")
+                    total_chunks, processed_chunks = self._stream_process_chunks(params, local_file_path, download)
                 
                 # 6. 完成处理
                 result = self._finalize_processing(params, local_file_path, total_chunks, processed_chunks)
@@ -79,13 +98,15 @@ class DocumentProcessor:
                 logger.info(f"[{task_id}] 文档处理完成: {result}")
                 return result
                 
-            except TaskCancelledException:
+            except TaskCancelledException as e:
+                record_error(e)
                 logger.warning(f"[{task_id}] 任务已被取消")
                 self.task_state_manager.set_task_state(task_id, TaskState.CANCELLED)
                 self.progress_manager.notify_task_failed(task_id, doc_id, "任务被取消", chunk_count=0, cancelled=True)
                 raise
                 
             except Exception as e:
+                record_error(e)
                 logger.error(f"[{task_id}] 文档处理失败: {e}")
                 self.task_state_manager.set_task_state(task_id, TaskState.FAILED, {"error": str(e)})
                 self.progress_manager.notify_task_failed(task_id, doc_id, str(e), chunk_count=0, cancelled=False)
@@ -97,7 +118,7 @@ class DocumentProcessor:
             raise ValidationException("参数验证失败")
         # 文件类型验证
         file_type = params.file.type.lower().strip()
-        if file_type not in ["txt", "md", "docx"]:
+        if file_type not in ["txt", "md", "docx", "pdf"]:
             raise ValidationException(f"不支持的文件类型: {params.file.type}")
         # 分块参数验证
         chunk_size = params.parse_params.chunk_size
@@ -106,17 +127,24 @@ class DocumentProcessor:
             raise ValidationException("分块参数无效")
         logger.debug(f"[{params.task_id}] 参数验证通过")
     
+    def _check_cancellation(self, task_id: str) -> None:
+        """检查任务是否被取消（带耗时埋点）"""
+        with stage_span("cancellation_check", task_id):
+            self.task_state_manager.check_task_cancellation(task_id)
+    
     def _download_file(self, params: ParseFileTaskParams) -> str:
         """下载文件"""
         try:
             # 检查任务是否被取消
-            self.task_state_manager.check_task_cancellation(params.task_id)
+            self._check_cancellation(params.task_id)
             
             # 准备OSS参数
             oss_params = params.oss.model_dump() if params.oss else None
             
             # 下载文件
-            local_file_path = self.file_manager.download_file(params.file.path, oss_params)
+            with stage_span("download", params.task_id):
+                local_file_path = self.file_manager.download_file(params.file.path, oss_params)
+            BYTES_PARSED.labels(file_type=params.file.type.lower().strip()).inc(get_file_size(local_file_path))
             
             logger.info(f"[{params.task_id}] 文件下载完成: {local_file_path}")
             return local_file_path
@@ -125,23 +153,147 @@ class DocumentProcessor:
             logger.error(f"[{params.task_id}] 文件下载失败: {e}")
             raise
     
-    def _stream_process_chunks(self, params: ParseFileTaskParams, local_file_path: str) -> tuple:
+    def _start_streaming_download(self, params: ParseFileTaskParams) -> Optional[RangedDownload]:
+        """OSS 上的 TXT/MD 文件：开始分段下载后立即返回，解析从已到达的字节开始；其他情况返回 None"""
+        file_type = params.file.type.lower().strip()
+        if not (self.file_manager.config.stream_parse_enabled and params.oss
+                and is_oss_path(params.file.path) and file_type in ["txt", "md"]):
+            return None
         try:
-            self.task_state_manager.check_task_cancellation(params.task_id)
-            embedder_config = params.embedding.model_dump()
-            embedder_config['model_type'] = 'embedding'
-            embedder = ModelFactory.create(ModelConfig(**embedder_config))
-            vdb_config = VectorDBCollectionConfig(
-                collection_name=params.vdb.collection_name,
-                type=params.vdb.type,
-                connection_config=params.vdb.connection_config,
-                embedding_dimension=params.vdb.embedding_dimension,
-                index_type=params.vdb.index_type or "hnsw"
+            self._check_cancellation(params.task_id)
+            download = self.file_manager.start_oss_download(params.file.path, params.oss.model_dump())
+            BYTES_PARSED.labels(file_type=file_type).inc(download.size)
+            logger.info(f"[{params.task_id}] 开始分段下载: {params.file.path} -> {download.dest_path} ({download.size} bytes)")
+            return download
+        except Exception as e:
+            logger.error(f"[{params.task_id}] 文件下载失败: {e}")
+            raise
+
+    def _create_embedder(self, params: ParseFileTaskParams) -> InstrumentedEmbedder:
+        embedder_config = params.embedding.model_dump()
+        embedder_config['model_type'] = 'embedding'
+        # 过载/超时由自适应并发统一退避重试，客户端自身不再重试，避免重试次数相乘
+        embedder_config['extra_config'] = {**(params.embedding.extra_config or {}), 'max_retries': 0}
+        embedder = ModelFactory.create(ModelConfig(**embedder_config))
+        limiter = get_connection_limiter(
+            params.embedding.connection_id,
+            params.embedding.rate_limit_rpm,
+            params.embedding.rate_limit_tpm,
+            reserve_ratio=self.file_manager.config.rate_limit_reserve_ratio
+        )
+        if limiter is not None:
+            # 所有 worker 共享 Connection 的 RPM/TPM 预算，入库请求为后台优先级
+            embedder = RateLimitedEmbedder(
+                embedder, limiter,
+                priority=PRIORITY_BACKGROUND,
+                count_tokens=get_token_counter(params.embedding.model_name).count,
+                timeout=self.file_manager.config.rate_limit_wait_timeout
             )
-            vdb = VectorDBFactory.create_vector_db(vdb_config, embedder)
+        return InstrumentedEmbedder(embedder)
+
+    def _connect_vdb(self, vdb_params: VectorDBCollectionConfig, embedder):
+        vdb_config = VectorDBCollectionConfig(
+            collection_name=vdb_params.collection_name,
+            type=vdb_params.type,
+            connection_config=vdb_params.connection_config,
+            embedding_dimension=vdb_params.embedding_dimension,
+            index_type=vdb_params.index_type or "hnsw"
+        )
+        # 只支持 add_texts 的向量库通过 PrecomputedEmbedder 使用已算好的向量
+        vdb = VectorDBFactory.create_vector_db(vdb_config, PrecomputedEmbedder(embedder))
+        if not vdb.is_connected:
+            asyncio.run(vdb.connect())
+        return vdb
+
+    def _copy_vectors_from_source(self, params: ParseFileTaskParams) -> int:
+        """
+        复制内容相同文档的已有分块向量到目标集合，跳过下载、解析与 embedding。
+        源分块的分块参数或向量模型与本次任务不一致、向量库不支持或复制失败时返回0，回退到完整解析。
+        """
+        task_id = params.task_id
+        source = params.copy_from
+        doc_id = int(params.doc_id) if params.doc_id else 0
+        try:
+            self._check_cancellation(task_id)
+            embedder = self._create_embedder(params)
+            with stage_span("vector_copy", task_id):
+                source_vdb = self._connect_vdb(source.vdb, embedder)
+                chunks = source_vdb.get_chunks_with_embeddings({"doc_id": int(source.doc_id)})
+            documents = chunks.get("documents") or []
+            metadatas = chunks.get("metadatas") or []
+            embeddings = chunks.get("embeddings")
+            embeddings = [] if embeddings is None else embeddings
+            if not documents or len(documents) != len(metadatas) or len(documents) != len(embeddings):
+                logger.info(f"[{task_id}] 源文档 {source.doc_id} 无可复制的分块，回退到完整解析")
+                return 0
+            # 未记录分块算法版本的旧分块视为不一致
+            expected = (
+                params.parse_params.chunk_size, params.parse_params.overlap, params.parse_params.length_unit,
+                params.embedding.model_name, CHUNKER_VERSION
+            )
+            actual = (
+                metadatas[0].get("chunk_size"), metadatas[0].get("overlap"),
+                metadatas[0].get("length_unit", "char"), metadatas[0].get("embedding_model_name"),
+                metadatas[0].get("chunker_version")
+            )
+            if actual != expected:
+                logger.info(f"[{task_id}] 源文档 {source.doc_id} 解析参数不一致 {actual} != {expected}，回退到完整解析")
+                return 0
+
+            vdb = self._connect_vdb(params.vdb, embedder)
+            self.last_vdb = vdb
+            self._delete_existing_chunks(doc_id, vdb)
+            overrides = {
+                "doc_id": doc_id,
+                "kb_id": params.kb_id,
+                "filename": params.file.filename or params.file.path,
+                "upload_time": params.upload_time,
+                "uploader_id": params.uploader_id,
+                "source": "oss" if str(params.file.path).startswith("oss://") else "local",
+            }
+            order = sorted(range(len(documents)), key=lambda i: metadatas[i].get("chunk_id", 0))
+            embeddings = to_float32_array(embeddings)
+            batch_size = 256
+            for start in range(0, len(order), batch_size):
+                self._check_cancellation(task_id)
+                batch = order[start:start + batch_size]
+                with stage_span("vector_copy", task_id):
+                    vdb.add_embeddings(
+                        [documents[i] for i in batch],
+                        embeddings[batch],
+                        metadatas=[{**{k: v for k, v in metadatas[i].items() if v is not None}, **{k: v for k, v in overrides.items() if v is not None}} for i in batch]
+                    )
+                CHUNKS_PROCESSED.inc(len(batch))
+                done = start + len(batch)
+                self.progress_manager.update_progress(task_id, done, len(order))
+                if doc_id:
+                    self.progress_manager.send_progress_callback(doc_id, "processing", current_offset=done, chunk_count=len(order))
+            logger.info(f"[{task_id}] 已从文档 {source.doc_id} 复制 {len(order)} 个分块向量")
+            return len(order)
+        except TaskCancelledException:
+            raise
+        except Exception as e:
+            record_error(e)
+            logger.warning(f"[{task_id}] 复制向量失败，回退到完整解析: {e}")
+            return 0
+
+    def _stream_process_chunks(self, params: ParseFileTaskParams, local_file_path: str, download: Optional[RangedDownload] = None) -> tuple:
+        try:
+            if download is not None:
+                try:
+                    return self._stream_process_downloading_text(params, download)
+                except UnicodeDecodeError as e:
+                    # 非 UTF-8 文本：等待下载完成后按整文件解析（含 GBK 回退），已写入的分块会先被删除
+                    logger.warning(f"[{params.task_id}] 边下载边解析失败（{e}），等待下载完成后整文件解析")
+                    with stage_span("download", params.task_id):
+                        download.wait()
+                finally:
+                    download.cancel()
+
+            self._check_cancellation(params.task_id)
+            embedder = self._create_embedder(params)
+            vdb = self._connect_vdb(params.vdb, embedder)
             self.last_vdb = vdb
-            if not vdb.is_connected:
-                asyncio.run(vdb.connect())
             self._delete_existing_chunks(int(params.doc_id) if params.doc_id else 0, vdb)
 
             file_type = params.file.type.lower().strip()
@@ -151,28 +303,72 @@ class DocumentProcessor:
             if doc_id is not None:
                 self.progress_manager.send_progress_callback(doc_id, "processing", current_offset=0, chunk_count=estimated_chunks)
 
-            if file_type in ["txt", "md"]:
+            length_function = get_length_function(params.parse_params.length_unit, params.embedding.model_name)
+            if file_type == "md":
                 parser = TextFileParser()
-                chunk_params = ChunkParams(chunk_size=params.parse_params.chunk_size, overlap=params.parse_params.overlap)
-                chunk_iter = parser.parse_to_text_chunks_lazy(file_path=local_file_path, chunk_params=chunk_params)
+                with stage_span("parse", params.task_id):
+                    text = parser.parse_to_text(file_path=local_file_path)
+                # 按标题/代码块/表格结构切块，元数据带标题路径
+                md_chunk_iter = self._split_markdown(params, [text], length_function)
+                del text
+                def chunk_with_index():
+                    for idx, (chunk, metadata) in enumerate(md_chunk_iter):
+                        yield idx, chunk, "text", metadata
+            elif file_type == "txt":
+                parser = TextFileParser()
+                with stage_span("parse", params.task_id):
+                    text = parser.parse_to_text(file_path=local_file_path)
+                with stage_span("split", params.task_id):
+                    text_splitter = FastRecursiveSplitter(
+                        chunk_size=params.parse_params.chunk_size,
+                        chunk_overlap=params.parse_params.overlap,
+                        length_function=length_function
+                    )
+                    chunk_iter = text_splitter.split_text(text)
+                del text
                 def chunk_with_index():
                     for idx, chunk in enumerate(chunk_iter):
                         yield idx, chunk, "text", {}
             elif file_type == "docx":
-                parser = WordFileParser(vision_model=None)
-                parsed_iter = parser.parse_file_lazy(file_path=local_file_path)
+                parser = WordFileParser(
+                    vision_model=None,
+                    max_workers=self.file_manager.config.parse_workers,
+                    parallel_min_elements=self.file_manager.config.docx_parallel_min_elements
+                )
+                blocks_iter = timed_iter(parser.parse_blocks_lazy(file_path=local_file_path), "parse", params.task_id)
+                # 按段落/章节合并到 chunk_size，表格整体成块，元数据带标题路径
+                chunker = StructuredChunker(
+                    chunk_size=params.parse_params.chunk_size,
+                    overlap=params.parse_params.overlap,
+                    length_function=length_function
+                )
+                def chunk_with_index():
+                    for idx, parsed in enumerate(chunker.chunk(blocks_iter)):
+                        # 图片描述文本也embedding+入库，元数据一并存储
+                        yield idx, parsed.content, parsed.type, parsed.metadata
+            elif file_type == "pdf":
+                parser = PdfFileParser(
+                    max_workers=self.file_manager.config.parse_workers,
+                    parallel_min_pages=self.file_manager.config.pdf_parallel_min_pages
+                )
+                pages_iter = timed_iter(parser.parse_file_lazy(file_path=local_file_path), "parse", params.task_id)
+                text_splitter = FastRecursiveSplitter(
+                    chunk_size=params.parse_params.chunk_size,
+                    chunk_overlap=params.parse_params.overlap,
+                    length_function=length_function
+                )
                 def chunk_with_index():
-                    for idx, parsed in enumerate(parsed_iter):
-                        if hasattr(parsed, "type") and parsed.type == "image":
-                            # 图片描述文本也embedding+入库，元数据一并存储
-                            yield idx, parsed.content, "image", parsed.metadata
-                        else:
-                            yield idx, parsed.content, "text", getattr(parsed, "metadata", {})
+                    # 逐页切块，分块不跨页，页码写入分块元数据
+                    idx = 0
+                    for page in pages_iter:
+                        for chunk in text_splitter.iter_split(page.content):
+                            yield idx, chunk, "text", page.metadata
+                            idx += 1
             else:
                 raise ValidationException(f"Unsupported file type: {file_type}")
 
             total_chunks, processed_chunks = self._process_chunks_streaming_v2(
-                params, chunk_with_index(), embedder, vdb, estimated_chunks, doc_id
+                params, self._guard_input_tokens(params, chunk_with_index()), embedder, vdb, estimated_chunks, doc_id
             )
             logger.info(f"[{params.task_id}] 流式处理完成: {processed_chunks}/{total_chunks}")
             return total_chunks, processed_chunks
@@ -180,6 +376,53 @@ class DocumentProcessor:
             logger.error(f"[{params.task_id}] 流式处理失败: {e}")
             raise
 
+    def _stream_process_downloading_text(self, params: ParseFileTaskParams, download: RangedDownload) -> tuple:
+        """TXT/MD 边下载边解析：按 UTF-8 增量解码已到达的字节，窗口化（MD 按结构）切块后立即进入 embedding"""
+        self._check_cancellation(params.task_id)
+        embedder = self._create_embedder(params)
+        vdb = self._connect_vdb(params.vdb, embedder)
+        self.last_vdb = vdb
+        self._delete_existing_chunks(int(params.doc_id) if params.doc_id else 0, vdb)
+
+        doc_id = int(params.doc_id) if params.doc_id else None
+        if doc_id is not None:
+            self.progress_manager.send_progress_callback(doc_id, "processing", current_offset=0, chunk_count=0)
+
+        text_iter = timed_iter(TextFileParser.iter_text(download.iter_bytes()), "parse", params.task_id)
+        length_function = get_length_function(params.parse_params.length_unit, params.embedding.model_name)
+        if params.file.type.lower().strip() == "md":
+            chunk_iter = self._split_markdown(params, text_iter, length_function)
+        else:
+            chunk_iter = (
+                (chunk, {}) for chunk in split_text_stream(
+                    text_iter,
+                    chunk_size=params.parse_params.chunk_size,
+                    chunk_overlap=params.parse_params.overlap,
+                    length_function=length_function
+                )
+            )
+        def chunk_with_index():
+            for idx, (chunk, metadata) in enumerate(chunk_iter):
+                yield idx, chunk, "text", metadata
+
+        total_chunks, processed_chunks = self._process_chunks_streaming_v2(
+            params, self._guard_input_tokens(params, chunk_with_index()), embedder, vdb, 0, doc_id
+        )
+        download.wait()
+        if download.elapsed is not None:
+            STAGE_DURATION.labels(stage="download").observe(download.elapsed)
+        logger.info(f"[{params.task_id}] 边下载边解析完成: {processed_chunks}/{total_chunks}, 下载耗时 {download.elapsed or 0:.2f}s")
+        return total_chunks, processed_chunks
+
+    def _split_markdown(self, params: ParseFileTaskParams, text_iter, length_function) -> Iterator[Tuple[str, dict]]:
+        """Markdown 结构化流式切块，产出 (chunk, metadata)"""
+        return split_markdown_stream(
+            text_iter,
+            chunk_size=params.parse_params.chunk_size,
+            chunk_overlap=params.parse_params.overlap,
+            length_function=length_function
+        )
+
     def _process_chunks_streaming_v2(
         self, 
         params: ParseFileTaskParams, 
@@ -192,14 +435,31 @@ class DocumentProcessor:
         total_chunks = 0
         processed_chunks = 0
         start_offset = params.parse_offset or 0
-        parallel_workers = params.parallel or 3
-        batch_size = parallel_workers * 2
+        # 从任务的 parallel 起步，按 embedding 服务的延迟与过载信号自适应调整并发
+        concurrency = self._create_concurrency(params)
+        max_in_flight = concurrency.max_limit
+        write_precomputed = vdb.get_supported_features().get("add_embeddings", False)
+        # 按 token 数打包批次：每批一次 embedding 请求，不超过模型/服务商单次请求的 token 上限
+        max_batch_tokens, max_batch_items = self._embedding_batch_limits(params)
+        count_tokens = get_token_counter(params.embedding.model_name).count
+        batch_texts, batch_metadatas, batch_tokens = [], [], 0
         from concurrent.futures import ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=parallel_workers) as executor:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
             futures = []
+
+            def submit_batch():
+                nonlocal batch_texts, batch_metadatas, batch_tokens
+                if batch_texts:
+                    future = executor.submit(
+                        self._process_chunk_batch,
+                        batch_texts, batch_metadatas, embedder, vdb, concurrency, write_precomputed
+                    )
+                    futures.append((batch_metadatas[0]["chunk_id"], len(batch_texts), future))
+                batch_texts, batch_metadatas, batch_tokens = [], [], 0
+
             try:
                 for chunk_idx, chunk_text, chunk_type, metadata in chunk_iterator:
-                    self.task_state_manager.check_task_cancellation(params.task_id)
+                    self._check_cancellation(params.task_id)
                     total_chunks += 1
                     if chunk_idx < start_offset:
                         continue
@@ -207,21 +467,23 @@ class DocumentProcessor:
                     chunk_metadata = self._create_chunk_metadata(params, chunk_idx, chunk_text)
                     if metadata:
                         chunk_metadata.update(metadata)
-                    future = executor.submit(
-                        self._process_single_chunk,
-                        chunk_text, chunk_metadata, embedder, vdb
-                    )
-                    futures.append((chunk_idx, future))
-                    if len(futures) >= batch_size:
+                    tokens = count_tokens(chunk_text)
+                    if batch_texts and (batch_tokens + tokens > max_batch_tokens or len(batch_texts) >= max_batch_items):
+                        submit_batch()
+                    batch_texts.append(chunk_text)
+                    batch_metadatas.append(chunk_metadata)
+                    batch_tokens += tokens
+                    if len(futures) >= max_in_flight * 2:
                         processed_count = self._process_batch_futures(
-                            futures[:parallel_workers], 
+                            futures[:max_in_flight], 
                             params.task_id,
                             processed_chunks,
                             estimated_chunks,
                             doc_id
                         )
                         processed_chunks += processed_count
-                        futures = futures[parallel_workers:]
+                        futures = futures[max_in_flight:]
+                submit_batch()
                 if futures:
                     processed_count = self._process_batch_futures(
                         futures, 
@@ -233,13 +495,54 @@ class DocumentProcessor:
                     processed_chunks += processed_count
             except Exception as e:
                 logger.error(f"[{params.task_id}] 流式处理异常: {e}")
-                for idx, future in futures:
+                for _, _, future in futures:
                     try:
                         future.result(timeout=1.0)
                     except:
                         pass
                 raise
+        logger.info(f"[{params.task_id}] embedding 并发上限最终为 {concurrency.limit}（初始 {params.parallel or 3}）")
         return total_chunks, processed_chunks
+
+    def _create_concurrency(self, params: ParseFileTaskParams) -> AdaptiveConcurrency:
+        initial = params.parallel or 3
+        return AdaptiveConcurrency(
+            initial=initial,
+            max_limit=max(self.file_manager.config.embedding_max_concurrency, initial)
+        )
+
+    def _embedding_batch_limits(self, params: ParseFileTaskParams) -> Tuple[int, int]:
+        """单次 embedding 请求的 (token 上限, 条数上限)"""
+        max_tokens = params.embedding.max_batch_tokens or get_max_batch_tokens(params.embedding.provider)
+        return max_tokens, self.file_manager.config.embedding_batch_size
+
+    def _guard_input_tokens(self, params: ParseFileTaskParams, chunk_iterator) -> Iterator[tuple]:
+        """
+        embedding 输入保护：超过模型单条输入 token 上限的分块按 token 再切分，避免请求被拒后重试。
+        重新编号分块序号。
+        """
+        max_input = params.embedding.max_input_tokens or get_max_input_tokens(
+            params.embedding.model_name, default=self.file_manager.config.embedding_max_input_tokens
+        )
+        counter = get_token_counter(params.embedding.model_name)
+        splitter = None
+        idx = 0
+        for _, chunk_text, chunk_type, metadata in chunk_iterator:
+            if counter.count(chunk_text) <= max_input:
+                yield idx, chunk_text, chunk_type, metadata
+                idx += 1
+                continue
+            if splitter is None:
+                splitter = FastRecursiveSplitter(
+                    chunk_size=max_input,
+                    chunk_overlap=min(params.parse_params.overlap, max_input // 10),
+                    length_function=counter.count
+                )
+            pieces = splitter.split_text(chunk_text)
+            logger.debug(f"[{params.task_id}] 分块超过 {max_input} tokens，再切分为 {len(pieces)} 块")
+            for piece in pieces:
+                yield idx, piece, chunk_type, metadata
+                idx += 1
     
     def _process_batch_futures(
         self, 
@@ -249,12 +552,18 @@ class DocumentProcessor:
         total_chunks: int,
         doc_id: int
     ) -> int:
+        """
+        等待一组批次完成并上报进度，返回成功写入的分块数。
+        有批次在重试后仍失败时，等待其余批次结束后抛出异常，任务标记为失败，不会缺块完成
+        """
         completed = 0
-        for idx, future in futures:
+        failed: List[Tuple[int, int]] = []
+        for first_idx, count, future in futures:
             try:
-                self.task_state_manager.check_task_cancellation(task_id)
+                self._check_cancellation(task_id)
                 future.result()
-                completed += 1
+                completed += count
+                CHUNKS_PROCESSED.inc(count)
                 # 直接上报进度
                 self.progress_manager.update_progress(task_id, current_processed + completed, total_chunks)
                 if doc_id is not None:
@@ -263,18 +572,58 @@ class DocumentProcessor:
                 raise
             except Exception as e:
                 import traceback
-                logger.error(f"[分块处理异常] 任务ID={task_id}, idx={idx}, 错误={e}\n堆栈={traceback.format_exc()}")
+                record_error(e)
+                logger.error(f"[分块处理异常] 任务ID={task_id}, idx={first_idx}~{first_idx + count - 1}, 错误={e}\n堆栈={traceback.format_exc()}")
+                failed.append((first_idx, first_idx + count - 1))
+        if failed:
+            ranges = ", ".join(f"{start}~{end}" for start, end in failed)
+            raise WorkerBaseException(f"{len(failed)} 批分块 embedding/入库失败（分块序号 {ranges}）")
         return completed
     
-    def _process_single_chunk(self, chunk_text: str, metadata: dict, embedder, vdb) -> None:
-        """处理单个分块"""
+    def _process_chunk_batch(
+        self,
+        texts: List[str],
+        metadatas: List[dict],
+        embedder,
+        vdb,
+        concurrency: AdaptiveConcurrency,
+        write_precomputed: bool = False
+    ) -> None:
+        """
+        处理一批分块：一次 embedding 请求后写入向量库。
+        embedding 在自适应并发名额内执行，过载/超时失败按退避重试，限流等待在占用名额之前；
+        向量算好后只写入一次，写入失败不会重复请求 embedding，也不会重复写入
+        """
+        config = self.file_manager.config
+        # 限流令牌在占用并发名额之前取，等待时间不计入 AIMD 的延迟
+        acquire = getattr(embedder, "acquire", None)
         try:
-            vdb.add_texts([chunk_text], metadatas=[metadata])
+            embeddings = concurrency.call(
+                lambda: embedder.embed_documents_array(texts),
+                max_retries=config.embedding_max_retries,
+                base_delay=config.embedding_retry_base_delay,
+                max_delay=config.embedding_retry_max_delay,
+                on_retry=self._on_embedding_retry,
+                before=(lambda: acquire(texts)) if acquire is not None else None
+            )
+            start = time.perf_counter()
+            if write_precomputed:
+                vdb.add_embeddings(texts, embeddings, metadatas=metadatas)
+            else:
+                # 向量库在 add_texts 内部调用 embedding_function（PrecomputedEmbedder），直接返回上面算好的向量
+                with vdb.embedding_function.precomputed(texts, embeddings):
+                    vdb.add_texts(texts, metadatas=metadatas)
+            STAGE_DURATION.labels(stage="vector_write").observe(time.perf_counter() - start)
         except Exception as e:
             import traceback
-            logger.error(f"[分块入库异常] chunk元数据={metadata}, 错误={e}\n堆栈={traceback.format_exc()}")
+            logger.error(f"[分块入库异常] chunk_id={metadatas[0].get('chunk_id')}~{metadatas[-1].get('chunk_id')}, 错误={e}\n堆栈={traceback.format_exc()}")
             raise
     
+    @staticmethod
+    def _on_embedding_retry(error: BaseException, attempt: int, delay: float) -> None:
+        EMBEDDING_RETRIES.labels(error_type=type(error).__name__).inc()
+        logger.warning(f"embedding 请求失败，{delay:.2f}s 后第 {attempt} 次重试: {type(error).__name__}: {error}")
+
     def _delete_existing_chunks(self, doc_id: int, vdb) -> None:
         """删除历史分块（只依赖doc_id和vdb）"""
         try:
@@ -302,7 +651,9 @@ class DocumentProcessor:
             chunk_size=params.parse_params.chunk_size,
             overlap=params.parse_params.overlap,
             embedding_model_name=params.embedding.model_name,
-            embedding_dim=params.embedding.embedding_dim
+            embedding_dim=params.embedding.embedding_dim,
+            length_unit=params.parse_params.length_unit,
+            chunker_version=CHUNKER_VERSION
         )
         
         return metadata.model_dump()
@@ -5,12 +5,14 @@ import tempfile
 from typing import Optional, Dict, Any
 from loguru import logger
 
-from common.utils.oss_client import OSSClient
+from common.utils.oss_client import get_oss_client
 from common.core.encryption import decrypt_api_key
 from worker.config.worker_config import worker_config
 from worker.utils.worker_utils import is_oss_path, get_file_extension, ensure_directory, create_temp_file
 from worker.exceptions.worker_exceptions import FileDownloadException, FileHandleException
 from worker.managers.resource_manager import ResourceManager
+from worker.managers.source_cache import SourceCache
+from worker.services.ranged_download import RangedDownload
 
 
 class FileManager:
@@ -19,6 +21,7 @@ class FileManager:
     def __init__(self, resource_manager: ResourceManager = None, config=None):
         self.config = config or worker_config
         self.resource_manager = resource_manager or ResourceManager(config)
+        self.source_cache = SourceCache(self.config)
     
     def download_file(self, file_path: str, oss_params: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -45,50 +48,15 @@ class FileManager:
             raise FileDownloadException(f"文件下载失败: {e}")
     
     def _download_oss_file(self, file_path: str, oss_params: Dict[str, Any]) -> str:
-        """从OSS下载文件"""
-        if not oss_params:
-            raise FileDownloadException("缺少OSS连接参数")
-        
+        """从OSS下载文件（分段并行下载，等待全部完成）"""
         try:
-            # 解析OSS路径
-            oss_bucket = oss_params.get('bucket')
-            if not oss_bucket:
-                raise FileDownloadException("缺少OSS bucket信息")
-            
-            oss_key = file_path.replace(f'oss://{oss_bucket}/', '')
-            
-            # 准备临时目录
-            temp_dir = self.resource_manager.ensure_temp_directory()
-            
-            # 创建临时文件
-            file_ext = get_file_extension(oss_key)
-            temp_file_path = create_temp_file(
-                suffix=f".{file_ext}" if file_ext else "",
-                dir=temp_dir
-            )
-            
-            # 解密API密钥
-            access_key = decrypt_api_key(oss_params['access_key'])
-            secret_key = decrypt_api_key(oss_params['secret_key'])
-            
-            # 创建OSS客户端并下载
-            oss_client = OSSClient(
-                endpoint_url=oss_params['endpoint'],
-                access_key=access_key,
-                secret_key=secret_key,
-                region=oss_params.get('region')
-            )
-            
-            oss_client.download_file(oss_bucket, oss_key, temp_file_path)
-            
-            # 注册临时文件
-            self.resource_manager.register_temp_file(temp_file_path)
-            
-            # 检查文件大小
-            if not self.resource_manager.check_temp_file_size(temp_file_path):
-                self.resource_manager.cleanup_temp_file(temp_file_path)
-                raise FileDownloadException("下载的文件超出大小限制")
-            
+            download = self.start_oss_download(file_path, oss_params)
+            try:
+                temp_file_path = download.wait()
+            except Exception:
+                download.cancel()
+                self.resource_manager.cleanup_temp_file(download.dest_path)
+                raise
             logger.info(f"OSS文件下载成功: {file_path} -> {temp_file_path}")
             return temp_file_path
             
@@ -96,6 +64,72 @@ class FileManager:
             logger.error(f"OSS文件下载失败 {file_path}: {e}")
             raise FileDownloadException(f"OSS文件下载失败: {e}")
     
+    def start_oss_download(self, file_path: str, oss_params: Dict[str, Any]) -> RangedDownload:
+        """
+        开始分段并行下载OSS文件，立即返回；可通过 iter_bytes 边下载边读取，或 wait 等待完成
+        
+        Args:
+            file_path: OSS路径（oss://bucket/key）
+            oss_params: OSS连接参数
+            
+        Returns:
+            进行中的下载（临时文件已注册，由资源管理器清理）
+            
+        Raises:
+            FileDownloadException: 参数缺失、文件超出大小限制或请求失败
+        """
+        if not oss_params:
+            raise FileDownloadException("缺少OSS连接参数")
+        
+        # 解析OSS路径
+        oss_bucket = oss_params.get('bucket')
+        if not oss_bucket:
+            raise FileDownloadException("缺少OSS bucket信息")
+        
+        oss_key = file_path.replace(f'oss://{oss_bucket}/', '')
+        
+        # 解密API密钥
+        access_key = decrypt_api_key(oss_params['access_key'])
+        secret_key = decrypt_api_key(oss_params['secret_key'])
+        
+        oss_client = get_oss_client(
+            endpoint_url=oss_params['endpoint'],
+            access_key=access_key,
+            secret_key=secret_key,
+            region=oss_params.get('region')
+        )
+        
+        # 下载前按对象大小检查限制，避免下载完才发现超限
+        head = oss_client.head_object(oss_bucket, oss_key)
+        size = int(head.get('ContentLength', 0))
+        if size > self.config.max_temp_file_size:
+            raise FileDownloadException(f"文件超出大小限制 ({size} > {self.config.max_temp_file_size})")
+        
+        # 准备临时目录并创建临时文件
+        temp_dir = self.resource_manager.ensure_temp_directory()
+        file_ext = get_file_extension(oss_key)
+        temp_file_path = create_temp_file(
+            suffix=f".{file_ext}" if file_ext else "",
+            dir=temp_dir
+        )
+        self.resource_manager.register_temp_file(temp_file_path)
+        
+        # 源文件缓存：同一对象（ETag 未变）重试或重新解析时不再访问OSS
+        etag = head.get('ETag')
+        cache_key = SourceCache.make_key(oss_params['endpoint'], oss_bucket, oss_key, etag) if etag else None
+        if cache_key and self.source_cache.fetch(cache_key, temp_file_path):
+            return RangedDownload.from_local_file(temp_file_path, size, oss_bucket, oss_key)
+        
+        download = RangedDownload(
+            oss_client, oss_bucket, oss_key, temp_file_path, size,
+            part_size=self.config.download_part_size,
+            concurrency=self.config.download_concurrency,
+            max_retries=self.config.download_part_retries,
+            etag=etag,
+            on_complete=(lambda path: self.source_cache.store(cache_key, path)) if cache_key else None
+        )
+        return download.start()
+    
     def _handle_local_file(self, file_path: str) -> str:
         """处理本地文件"""
         try:
@@ -0,0 +1,216 @@
+"""OSS 对象并行分段下载：按 Range GET 并发拉取各分段，已连续到达的前缀可边下载边读取"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+from loguru import logger
+
+from common.utils.oss_client import OSSClient
+from worker.exceptions.worker_exceptions import FileDownloadException
+
+READ_CHUNK_SIZE = 1024 * 1024
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 5.0
+
+
+def _is_precondition_failed(exc: BaseException) -> bool:
+    """If-Match 不满足（HTTP 412）：对象在下载途中被覆盖，重试也无法得到一致的内容"""
+    while exc is not None:
+        response = getattr(exc, "response", None)
+        if isinstance(response, dict) and response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 412:
+            return True
+        exc = exc.__cause__
+    return False
+
+
+class RangedDownload:
+    """
+    并行分段下载 OSS 对象到本地文件
+
+    分段按顺序提交到线程池，各分段按偏移写入预分配的本地文件；
+    iter_bytes 按文件顺序读取已连续写完的部分，解析可在下载完成前开始。
+    分段请求或读取失败时最多重试 max_retries 次，从该分段已写入的位置续传。
+    传入 etag 时各分段请求带 If-Match，下载途中对象被覆盖则整体失败，不重试。
+    """
+
+    def __init__(
+        self,
+        client: OSSClient,
+        bucket: str,
+        key: str,
+        dest_path: str,
+        size: int,
+        part_size: int,
+        concurrency: int,
+        on_complete: Optional[Callable[[str], None]] = None,
+        max_retries: int = 3,
+        etag: Optional[str] = None
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.dest_path = dest_path
+        self.size = size
+        self.part_size = max(part_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.max_retries = max(max_retries, 0)
+        self.etag = etag  # HEAD 得到的 ETag，各分段以 If-Match 请求同一版本
+        self.on_complete = on_complete  # 全部分段成功写入后以本地路径调用（在下载线程中）
+        self._parts = [(start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)]
+        self._written: List[int] = [0] * len(self._parts)
+        self._contiguous = 0
+        self._error: Optional[BaseException] = None
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._fd: Optional[int] = None
+        self._finished = threading.Event()  # 所有分段结束且完成回调已执行
+        self._started_at = 0.0
+        self.elapsed: Optional[float] = None  # 全部分段完成的耗时（秒）
+
+    @classmethod
+    def from_local_file(cls, dest_path: str, size: int, bucket: str = "", key: str = "") -> "RangedDownload":
+        """已在本地的完整文件（如命中源文件缓存），iter_bytes / wait 直接读取"""
+        download = cls(None, bucket, key, dest_path, size, part_size=max(size, 1), concurrency=1)
+        download._written = [end - start + 1 for start, end in download._parts]
+        download._contiguous = size
+        download.elapsed = 0.0
+        download._finished.set()
+        return download
+
+    def start(self) -> "RangedDownload":
+        self._started_at = time.perf_counter()
+        with open(self.dest_path, "wb") as f:
+            f.truncate(self.size)
+        self._fd = os.open(self.dest_path, os.O_WRONLY)
+        self._executor = ThreadPoolExecutor(max_workers=min(self.concurrency, max(len(self._parts), 1)), thread_name_prefix="oss-range")
+        futures = [self._executor.submit(self._download_part, i) for i in range(len(self._parts))]
+        self._executor.shutdown(wait=False)
+        threading.Thread(target=self._close_when_done, args=(futures,), daemon=True).start()
+        logger.debug(f"开始分段下载 {self.bucket}/{self.key}: size={self.size}, parts={len(self._parts)}, concurrency={self.concurrency}")
+        return self
+
+    def _close_when_done(self, futures) -> None:
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self.on_complete and self.completed and self._error is None:
+            try:
+                self.on_complete(self.dest_path)
+            except Exception as e:
+                logger.warning(f"下载完成回调失败 {self.bucket}/{self.key}: {e}")
+        self._finished.set()
+
+    def _download_part(self, index: int) -> None:
+        start, end = self._parts[index]
+        attempt = 0
+        try:
+            while True:
+                if self._cancelled or self._error is not None:
+                    return
+                # 从已写入的位置续传
+                offset = start + self._written[index]
+                try:
+                    self._fetch_range(index, offset, end)
+                    return
+                except Exception as e:
+                    if self._cancelled or attempt >= self.max_retries or _is_precondition_failed(e):
+                        raise
+                    attempt += 1
+                    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+                    logger.warning(
+                        f"分段下载失败 {self.bucket}/{self.key} bytes={start + self._written[index]}-{end}，"
+                        f"{delay:.1f}s 后第 {attempt} 次重试: {e}"
+                    )
+                    time.sleep(delay)
+        except BaseException as e:
+            with self._cond:
+                if self._error is None:
+                    self._error = e
+                self._cond.notify_all()
+
+    def _fetch_range(self, index: int, offset: int, end: int) -> None:
+        """请求 [offset, end] 并按偏移写入，读到的数据不足时抛出异常"""
+        start = self._parts[index][0]
+        body = self.client.get_object_range(self.bucket, self.key, offset, end, if_match=self.etag)["Body"]
+        try:
+            for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                if self._cancelled:
+                    return
+                os.pwrite(self._fd, chunk, offset)
+                offset += len(chunk)
+                self._advance(index, offset - start)
+        finally:
+            body.close()
+        if offset != end + 1:
+            raise FileDownloadException(f"分段数据不完整: bytes={start}-{end}, 实际到 {offset - 1}")
+
+    def _advance(self, index: int, written: int) -> None:
+        with self._cond:
+            self._written[index] = written
+            contiguous = 0
+            for (start, end), done in zip(self._parts, self._written):
+                contiguous = start + done
+                if done < end - start + 1:
+                    break
+            self._contiguous = contiguous
+            if contiguous >= self.size and self.elapsed is None:
+                self.elapsed = time.perf_counter() - self._started_at
+            self._cond.notify_all()
+
+    @property
+    def completed(self) -> bool:
+        return self._contiguous >= self.size
+
+    def _wait_for(self, position: int) -> int:
+        """阻塞直到 position 之后有新数据可读，返回当前连续可读的字节数"""
+        with self._cond:
+            while self._contiguous <= position and self._contiguous < self.size:
+                if self._error is not None:
+                    raise FileDownloadException(f"OSS分段下载失败: {self._error}")
+                if self._cancelled:
+                    raise FileDownloadException("OSS分段下载已取消")
+                self._cond.wait(timeout=1.0)
+            if self._error is not None:
+                raise FileDownloadException(f"OSS分段下载失败: {self._error}")
+            return self._contiguous
+
+    def iter_bytes(self, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """按文件顺序产出已下载的字节，读到文件末尾结束"""
+        position = 0
+        # 不使用带缓冲的读取：预读会把尚未写入的空洞（0字节）读进缓冲区
+        fd = os.open(self.dest_path, os.O_RDONLY)
+        try:
+            while position < self.size:
+                available = self._wait_for(position)
+                while position < available:
+                    data = os.pread(fd, min(chunk_size, available - position), position)
+                    if not data:
+                        break
+                    position += len(data)
+                    yield data
+        finally:
+            os.close(fd)
+
+    def wait(self) -> str:
+        """等待下载完成（含完成回调），返回本地文件路径"""
+        if self.size:
+            self._wait_for(self.size - 1)
+        self._finished.wait()
+        return self.dest_path
+
+    def cancel(self) -> None:
+        """停止未完成的分段（已完成的下载不受影响）"""
+        with self._cond:
+            if self.completed:
+                return
+            self._cancelled = True
+            self._cond.notify_all()
@@ -18,6 +18,7 @@ from worker.exceptions.worker_exceptions import (
     WorkerBaseException, ValidationException, TaskCancelledException
 )
 from common.schemas.worker import ParseFileTaskParams
+from common.core.tracing import set_trace_id, reset_trace_id
 
 
 # 全局管理器实例
@@ -49,8 +50,10 @@ def parse_file_task(self, params: dict) -> Dict[str, Any]:
     
     task_id = task_params.task_id
     celery_task_id = self.request.id
+    # 沿用 webapi 请求的 trace id，使 worker 日志可与上传/解析请求关联
+    trace_token = set_trace_id(task_params.trace_id or task_id)
     
-    logger.info(f"[Worker] 收到解析任务: task_id={task_id}, celery_id={celery_task_id}")
+    logger.info(f"[Worker] 收到解析任务: task_id={task_id}, celery_id={celery_task_id}, trace_id={task_params.trace_id}")
     
     # 设置Redis key用于任务状态管理
     redis_key = f"doc:parse:{task_id}"
@@ -177,6 +180,7 @@ def parse_file_task(self, params: dict) -> Dict[str, Any]:
         # 清理任务状态
         task_state_manager.cleanup_task_state(task_id)
         logger.info(f"[Worker] 任务清理完成: task_id={task_id}")
+        reset_trace_id(trace_token)
 
 
 @app.task(bind=True, name='backend.worker.tasks.terminate_task')
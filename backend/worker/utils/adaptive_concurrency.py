@@ -0,0 +1,176 @@
+"""
+embedding 请求的自适应并发控制（AIMD）与失败重试
+
+- 延迟稳定时，每完成约一个并发窗口（limit 个）的请求，并发上限加 1（加性增）
+- 遇到 429 / 5xx / 超时等过载信号时并发上限减半（乘性减），降低之前已发出的请求再失败时不重复减
+- 过载类失败按带抖动的指数退避重试，优先遵循服务端返回的 Retry-After
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+from loguru import logger
+
+from common.utils.rate_limiter import RateLimitExceeded
+
+T = TypeVar("T")
+
+_OVERLOAD_NAME_HINTS = ("timeout", "ratelimit", "connection", "serviceunavailable", "internalserver", "overloaded")
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for candidate in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "status", "code"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    return None
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """是否为可重试的过载/瞬时错误：HTTP 408/429/5xx、超时、连接错误（沿异常链查找）"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, RateLimitExceeded):
+            # 已在共享令牌桶上等待到超时，不再重试
+            return False
+        status = _status_code(exc)
+        if status is not None:
+            return status in (408, 429) or status >= 500
+        if isinstance(exc, (TimeoutError, ConnectionError)):
+            return True
+        name = type(exc).__name__.lower()
+        if any(hint in name for hint in _OVERLOAD_NAME_HINTS):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """读取响应头中的 Retry-After（秒），没有时返回 None"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 并发控制器，一个任务内所有 embedding 批次共享
+
+    Args:
+        initial: 初始并发上限（任务的 parallel）
+        min_limit / max_limit: 并发上限的范围
+        latency_tolerance: 平滑延迟超过基线的该倍数时视为延迟上升，不再加并发
+        decrease_factor: 过载时并发上限乘以该系数
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_tolerance: float = 2.0,
+        decrease_factor: float = 0.5
+    ):
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._successes = 0
+        self._last_decrease = float("-inf")
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self):
+        """占用一个并发名额，超过当前上限时阻塞"""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def on_success(self, latency: float) -> None:
+        with self._cond:
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            # 基线取平滑延迟的最小值，并缓慢上浮，后端整体变慢后能重新稳定
+            self._baseline = self._latency if self._baseline is None else min(self._baseline * 1.01, self._latency)
+            if self._latency > self._baseline * self.latency_tolerance:
+                self._successes = 0
+                return
+            self._successes += 1
+            if self._successes >= int(self._limit) and self._limit < self.max_limit:
+                self._limit = min(self._limit + 1, self.max_limit)
+                self._successes = 0
+                logger.debug(f"embedding 并发上限提高到 {self.limit}（平滑延迟 {self._latency:.3f}s）")
+                self._cond.notify_all()
+
+    def on_overload(self, started_at: Optional[float] = None) -> None:
+        """started_at 为失败请求的发出时间（time.monotonic），上次降并发之前发出的请求失败不再重复降"""
+        with self._cond:
+            if started_at is not None and started_at < self._last_decrease:
+                return
+            self._last_decrease = time.monotonic()
+            self._successes = 0
+            self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+            logger.info(f"embedding 服务过载，并发上限降为 {self.limit}")
+
+    def call(
+        self,
+        func: Callable[[], T],
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+        before: Optional[Callable[[], None]] = None
+    ) -> T:
+        """
+        在并发名额内执行 func，成功时反馈延迟；过载类失败时降低并发并按带抖动的指数退避重试，
+        其他异常或重试用尽时抛出最后一次的异常。
+        before 在每次占用名额之前执行（如等待限流令牌），其耗时不占名额、不计入延迟
+        """
+        attempt = 0
+        while True:
+            if before is not None:
+                before()
+            with self.slot():
+                start = time.monotonic()
+                try:
+                    result = func()
+                except Exception as e:
+                    if not is_overload_error(e):
+                        raise
+                    self.on_overload(start)
+                    if attempt >= max_retries:
+                        raise
+                    error = e
+                else:
+                    self.on_success(time.monotonic() - start)
+                    return result
+            # 退避期间不占用并发名额
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            delay = max(delay, min(retry_after_seconds(error) or 0.0, max_delay))
+            attempt += 1
+            if on_retry is not None:
+                on_retry(error, attempt, delay)
+            time.sleep(delay)
@@ -0,0 +1,208 @@
+"""Worker指标与阶段耗时埋点（Prometheus）
+
+Celery prefork 模式下指标由各子进程产生，需在启动 worker 前设置
+PROMETHEUS_MULTIPROC_DIR 环境变量（指向一个空目录），由主进程聚合后统一暴露。
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, TypeVar
+
+import numpy as np
+from loguru import logger
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, multiprocess, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from common.utils.tokenizer import estimate_tokens
+from core.model.embedder.base import Embedder
+
+T = TypeVar("T")
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_DURATION = Histogram(
+    "knowra_worker_stage_duration_seconds",
+    "文档处理各阶段耗时",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+TASK_DURATION = Histogram(
+    "knowra_worker_task_duration_seconds",
+    "被 performance_monitor 装饰的函数总耗时",
+    ["func", "status"],
+    buckets=STAGE_BUCKETS,
+)
+CHUNKS_PROCESSED = Counter(
+    "knowra_worker_chunks_processed_total",
+    "成功写入向量库的分块数",
+)
+BYTES_PARSED = Counter(
+    "knowra_worker_bytes_parsed_total",
+    "送入解析器的文件字节数",
+    ["file_type"],
+)
+EMBEDDING_TOKENS = Counter(
+    "knowra_worker_embedding_tokens_total",
+    "送入 embedding 模型的 token 数（估算）",
+)
+EMBEDDING_RETRIES = Counter(
+    "knowra_worker_embedding_retries_total",
+    "embedding 过载/超时后的重试次数",
+    ["error_type"],
+)
+ERRORS = Counter(
+    "knowra_worker_errors_total",
+    "按异常类型统计的处理错误数",
+    ["error_type"],
+)
+
+STAGES = (
+    "download", "parse", "split", "embed", "vector_write",
+    "cancellation_check", "progress_callback", "vector_copy",
+)
+
+
+def record_error(exc: BaseException) -> None:
+    """按异常类型累计错误数"""
+    ERRORS.labels(error_type=type(exc).__name__).inc()
+
+
+@contextmanager
+def stage_span(stage: str, task_id: Optional[str] = None):
+    """
+    阶段耗时埋点：结束时写入直方图并输出结构化DEBUG日志
+
+    Args:
+        stage: 阶段名，见 STAGES
+        task_id: 任务ID（仅用于日志）
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.labels(stage=stage).observe(elapsed)
+        logger.bind(span=stage, task_id=task_id, duration=elapsed).debug(
+            f"[span] task_id={task_id} stage={stage} duration={elapsed * 1000:.2f}ms"
+        )
+
+
+def timed_iter(iterable: Iterable[T], stage: str, task_id: Optional[str] = None) -> Iterator[T]:
+    """
+    对惰性迭代器计时：累计每次取下一个元素的耗时，迭代结束（或中断）时记录一次
+    """
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                total += time.perf_counter() - start
+                return
+            total += time.perf_counter() - start
+            yield item
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(total)
+        logger.bind(span=stage, task_id=task_id, duration=total).debug(
+            f"[span] task_id={task_id} stage={stage} duration={total * 1000:.2f}ms"
+        )
+
+
+class InstrumentedEmbedder(Embedder):
+    """embedding 调用埋点包装：记录 embed 阶段耗时与 token 数"""
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+
+    def _observe(self, start: float, texts: List[str]) -> None:
+        STAGE_DURATION.labels(stage="embed").observe(time.perf_counter() - start)
+        EMBEDDING_TOKENS.inc(sum(estimate_tokens(t) for t in texts))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            return self.embedder.embed_documents(texts)
+        finally:
+            self._observe(start, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        try:
+            return self.embedder.embed_query(text)
+        finally:
+            self._observe(start, [text])
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        try:
+            return self.embedder.embed_documents_array(texts)
+        finally:
+            self._observe(start, texts)
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        start = time.perf_counter()
+        try:
+            return self.embedder.embed_query_array(text)
+        finally:
+            self._observe(start, [text])
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
+
+
+class CeleryQueueCollector:
+    """抓取时实时查询 Redis broker 中各队列的积压长度"""
+
+    def __init__(self, broker_url: str, queues: List[str]):
+        self.broker_url = broker_url
+        self.queues = queues
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.broker_url)
+        return self._client
+
+    def collect(self):
+        gauge = GaugeMetricFamily("knowra_celery_queue_depth", "Celery 队列中待处理的任务数", labels=["queue"])
+        for queue in self.queues:
+            try:
+                gauge.add_metric([queue], self._get_client().llen(queue))
+            except Exception as e:
+                logger.warning(f"获取队列长度失败 {queue}: {e}")
+        yield gauge
+
+
+def start_metrics_server(port: int, broker_url: Optional[str] = None, queues: Optional[List[str]] = None) -> bool:
+    """
+    启动 Prometheus 指标HTTP服务（每个 worker 节点一个）
+
+    Returns:
+        是否启动成功
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    if broker_url and queues:
+        registry.register(CeleryQueueCollector(broker_url, queues))
+    try:
+        start_http_server(port, registry=registry)
+        logger.info(f"Worker指标服务已启动: port={port}")
+        return True
+    except OSError as e:
+        logger.warning(f"Worker指标服务启动失败 port={port}: {e}")
+        return False
+
+
+def mark_process_dead(pid: int) -> None:
+    """prefork 子进程退出时清理其多进程指标文件"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
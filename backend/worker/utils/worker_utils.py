@@ -76,17 +76,21 @@ def format_file_size(size_bytes: int) -> str:
 
 
 def performance_monitor(func: Callable) -> Callable:
-    """性能监控装饰器"""
+    """性能监控装饰器（耗时同时写入 knowra_worker_task_duration_seconds）"""
+    from worker.utils.metrics import TASK_DURATION
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.time()
         try:
             result = func(*args, **kwargs)
             elapsed_time = time.time() - start_time
+            TASK_DURATION.labels(func=func.__name__, status="success").observe(elapsed_time)
             logger.debug(f"{func.__name__} 执行时间: {elapsed_time:.2f}秒")
             return result
         except Exception as e:
             elapsed_time = time.time() - start_time
+            TASK_DURATION.labels(func=func.__name__, status="error").observe(elapsed_time)
             logger.error(f"{func.__name__} 执行失败 ({elapsed_time:.2f}秒): {e}")
             raise
     return wrapper
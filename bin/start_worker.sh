@@ -25,9 +25,12 @@ cd "$(dirname "$0")/.."
 # 设置 PYTHONPATH，确保 worker 包可被正确导入
 export PYTHONPATH=backend
 
+# worker 子进程数；本地 embedding 模型按 CPU 核数 / 子进程数 分配推理线程
+export WORKER_CONCURRENCY=${WORKER_CONCURRENCY:-2}
+
 # 启动 Celery worker
 if [[ "$(uname)" == "Darwin" ]]; then
-  OBJC_DISABLE_INITIALIZE_FORK_SAFETY=YES celery -A worker.celery_app worker --loglevel=info --concurrency=2
+  OBJC_DISABLE_INITIALIZE_FORK_SAFETY=YES celery -A worker.celery_app worker --loglevel=info --concurrency=$WORKER_CONCURRENCY
 else
-  celery -A worker.celery_app worker --loglevel=info --concurrency=2
+  celery -A worker.celery_app worker --loglevel=info --concurrency=$WORKER_CONCURRENCY
 fi 
\ No newline at end of file